@@ -1,32 +1,66 @@
 from fastapi import APIRouter, Request, HTTPException, Depends
-from fastapi.responses import PlainTextResponse
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from sse_starlette.sse import EventSourceResponse
-from openai import APITimeoutError, APIConnectionError, APIStatusError, RateLimitError
 
+from app.core.answer_cache import SemanticAnswerCache
 from app.core.config import settings
-from app.core.retrieval import hybrid_retrieve
-from app.core.rate_limit import rate_limiter
+from app.core.context import count_tokens, pack_context
+from app.core.index_store import index_store
+from app.core.lazy import lazy_import
+from app.core.llm_client import get_openai_client
+from app.core import metrics
+from app.core.rerank import score_cache as rerank_cache
+from app.core.streaming import chat_deltas, coalesce, dumps
+from app.core.retrieval import (
+    embed_batcher,
+    embed_cache,
+    embed_queries,
+    embed_query_async,
+    hybrid_retrieve,
+    hybrid_retrieve_batch,
+)
+from app.core.rate_limit import rate_limiter_async
 from app.core.logger import make_request_id, log_request
 from app.api import auth
 
-import openai
-import tiktoken
+import asyncio
+import contextlib
 import time
 import json
 import re
 import random
-import httpx
 import os
 
+# Only needed once a request reaches the upstream; importing the SDK costs ~0.5 s
+httpx = lazy_import("httpx")
+openai = lazy_import("openai")
+
 router = APIRouter()
 
+# Paraphrased questions against the same index are answered without an LLM call
+answer_cache = SemanticAnswerCache(
+    settings.answer_cache_size, settings.answer_cache_threshold, settings.answer_cache_ttl_s
+)
+
+# Hit/miss counts live in the caches themselves; /metrics reads them at scrape time
+metrics.registry.counter(
+    "minirag_cache_hits_total",
+    "Cache hits",
+    ["cache"],
+    fn=lambda: {"answer": answer_cache.hits, "embed": embed_cache.hits, "rerank": rerank_cache.hits},
+)
+metrics.registry.counter(
+    "minirag_cache_misses_total",
+    "Cache misses",
+    ["cache"],
+    fn=lambda: {"answer": answer_cache.misses, "embed": embed_cache.misses, "rerank": rerank_cache.misses},
+)
+
 
 def estimate_tokens(text, model: str = "gpt-3.5-turbo") -> int:
-    try:
-        enc = tiktoken.encoding_for_model(model)
-        return len(enc.encode(text))
-    except Exception:
-        return max(1, len(text) // 4)
+    # Encoder is loaded once per model, not per request
+    return count_tokens(text, model)
 
 
 def get_openai_price(model: str) -> float:
@@ -66,7 +100,21 @@ def maybe_answer_filenames(question: str, context_chunks):
     return None
 
 
-def tokens_from_openai(context_chunks, question, max_tokens, model, api_key, budget_usd):
+class EarlyDone(str):
+    """
+    Done event that ends a stream early (budget stop, upstream or stream
+    error): the serialised line, ready to send, with its payload as `data`.
+    Completed answers arrive as a tuple instead and are cached.
+    """
+
+    def __new__(cls, data):
+        line = super().__new__(cls, dumps({"event": "done", "data": data}))
+        line.data = data
+        return line
+
+
+async def tokens_from_openai(context_chunks, question, max_tokens, model, api_key, budget_usd):
+    t0 = time.perf_counter()
     context_text = "\n---\n".join([f"[{i+1}] {c['chunk']}" for i, c in enumerate(context_chunks)])
     sources_map = "\n".join([f"[{i+1}] -> {c['source']}" for i, c in enumerate(context_chunks)])
 
@@ -83,7 +131,9 @@ def tokens_from_openai(context_chunks, question, max_tokens, model, api_key, bud
     prompt_tokens = estimate_tokens(prompt, model)
     price_per_1k = get_openai_price(model)
     est_prompt_cost = prompt_tokens * price_per_1k / 1000
+    metrics.PROMPT_BUILD_SECONDS.observe(time.perf_counter() - t0)
     if est_prompt_cost > budget_usd:
+        metrics.BUDGET_ABORTS.labels("prompt").inc()
         done_payload = {
             "answer": "[Budget Exceeded] Prompt cost exceeds provided budget.",
             "citations": [],
@@ -94,30 +144,36 @@ def tokens_from_openai(context_chunks, question, max_tokens, model, api_key, bud
                 "latency_ms": 0,
             },
         }
-        yield json.dumps({"event": "done", "data": done_payload})
+        yield EarlyDone(done_payload)
         return
 
-    client = openai.OpenAI(api_key=api_key)
+    client = get_openai_client(api_key)
+    # Owns the upstream response once the stream is open
+    upstream = contextlib.AsyncExitStack()
     start = time.time()
     total_tokens = prompt_tokens
     cost_so_far = est_prompt_cost
-    answer = ""
     streamed_tokens = 0
 
     # --- robust stream setup with backoff ---
-    MAX_RETRIES = 3
+    MAX_RETRIES = settings.openai_max_retries
     attempt = 0
     while True:
         try:
-            response = client.chat.completions.create(
-                model=model,
-                messages=[{"role": "user", "content": prompt}],
-                max_tokens=max_tokens,
-                stream=True,
+            # Raw SSE lines instead of parsed SDK chunk objects (see chat_deltas)
+            response = await upstream.enter_async_context(
+                client.chat.completions.with_streaming_response.create(
+                    model=model,
+                    messages=[{"role": "user", "content": prompt}],
+                    max_tokens=max_tokens,
+                    stream=True,
+                )
             )
             break
-        except (RateLimitError, APIStatusError) as e:
+        except (openai.RateLimitError, openai.APIStatusError) as e:
             status_code = getattr(e, "status_code", 429)
+            if status_code == 429:
+                metrics.RATE_LIMITED.labels("upstream").inc()
             if status_code != 429 or attempt >= MAX_RETRIES:
                 done_payload = {
                     "answer": "[Upstream Error] Rate limited / API error while contacting the model.",
@@ -129,11 +185,12 @@ def tokens_from_openai(context_chunks, question, max_tokens, model, api_key, bud
                         "latency_ms": int((time.time() - start) * 1000),
                     },
                 }
-                yield json.dumps({"event": "done", "data": done_payload})
+                yield EarlyDone(done_payload)
                 return
-            time.sleep(min(2**attempt, 8) + random.random())
+            metrics.UPSTREAM_RETRIES.labels("429").inc()
+            await asyncio.sleep(min(2**attempt, 8) + random.random())
             attempt += 1
-        except (APITimeoutError, APIConnectionError, httpx.ConnectTimeout):
+        except (openai.APITimeoutError, openai.APIConnectionError, httpx.ConnectTimeout):
             if attempt >= MAX_RETRIES:
                 done_payload = {
                     "answer": "[Upstream Error] Request to model timed out.",
@@ -145,9 +202,10 @@ def tokens_from_openai(context_chunks, question, max_tokens, model, api_key, bud
                         "latency_ms": int((time.time() - start) * 1000),
                     },
                 }
-                yield json.dumps({"event": "done", "data": done_payload})
+                yield EarlyDone(done_payload)
                 return
-            time.sleep(min(2**attempt, 8) + random.random())
+            metrics.UPSTREAM_RETRIES.labels("timeout").inc()
+            await asyncio.sleep(min(2**attempt, 8) + random.random())
             attempt += 1
         except Exception as e:
             done_payload = {
@@ -160,32 +218,46 @@ def tokens_from_openai(context_chunks, question, max_tokens, model, api_key, bud
                     "latency_ms": int((time.time() - start) * 1000),
                 },
             }
-            yield json.dumps({"event": "done", "data": done_payload})
+            yield EarlyDone(done_payload)
             return
 
     # --- consume the stream safely ---
-    try:
-        for chunk in response:
-            token = chunk.choices[0].delta.content
+    answer_parts = []
+    over_budget = False
+
+    async def deltas():
+        nonlocal streamed_tokens, total_tokens, cost_so_far, over_budget
+        async for token in chat_deltas(response.iter_lines()):
             if token:
-                answer += token
+                if not streamed_tokens:
+                    metrics.TTFT_SECONDS.observe(time.time() - start)
                 streamed_tokens += 1
                 total_tokens += 1
                 cost_so_far = total_tokens * price_per_1k / 1000
                 if cost_so_far > budget_usd:
-                    done_payload = {
-                        "answer": "[Budget Exceeded] Stopped mid-generation.",
-                        "citations": [],
-                        "usage": {
-                            "prompt_tokens": prompt_tokens,
-                            "completion_tokens": streamed_tokens,
-                            "cost_usd": cost_so_far,
-                            "latency_ms": int((time.time() - start) * 1000),
-                        },
-                    }
-                    yield json.dumps({"event": "done", "data": done_payload})
+                    over_budget = True
                     return
-                yield json.dumps({"event": "token", "data": token})
+                answer_parts.append(token)
+                yield token
+
+    try:
+        # Optionally merge deltas into fewer frames (SSE_COALESCE_MS / SSE_COALESCE_CHARS)
+        async for text in coalesce(deltas(), settings.sse_coalesce_ms, settings.sse_coalesce_chars):
+            yield dumps({"event": "token", "data": text})
+        if over_budget:
+            metrics.BUDGET_ABORTS.labels("stream").inc()
+            done_payload = {
+                "answer": "[Budget Exceeded] Stopped mid-generation.",
+                "citations": [],
+                "usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": streamed_tokens,
+                    "cost_usd": cost_so_far,
+                    "latency_ms": int((time.time() - start) * 1000),
+                },
+            }
+            yield EarlyDone(done_payload)
+            return
     except Exception as e:
         done_payload = {
             "answer": f"[Stream Error] {type(e).__name__}: {str(e)[:120]}",
@@ -197,8 +269,13 @@ def tokens_from_openai(context_chunks, question, max_tokens, model, api_key, bud
                 "latency_ms": int((time.time() - start) * 1000),
             },
         }
-        yield json.dumps({"event": "done", "data": done_payload})
+        yield EarlyDone(done_payload)
         return
+    finally:
+        # Also runs when the client disconnects (generator closed / task cancelled):
+        # stop reading and hand the connection back to the pool
+        await upstream.aclose()
+        metrics.STREAM_SECONDS.observe(time.time() - start)
 
     latency = int((time.time() - start) * 1000)
 
@@ -207,7 +284,7 @@ def tokens_from_openai(context_chunks, question, max_tokens, model, api_key, bud
         citations.append({"source_id": f"{chunk['source']}#{i}", "snippet": chunk["chunk"][:120]})
 
     # Force at least one inline ref
-    answer = ensure_inline_citation(answer, citations)
+    answer = ensure_inline_citation("".join(answer_parts), citations)
 
     done_payload = {
         "answer": answer.strip(),
@@ -220,8 +297,126 @@ def tokens_from_openai(context_chunks, question, max_tokens, model, api_key, bud
         },
     }
 
-    # Return final SSE done event (plus stats for logging)
-    yield json.dumps({"event": "done", "data": done_payload}), streamed_tokens, cost_so_far, latency
+    # Final done event, still as a dict: the endpoint serialises it exactly once
+    # (plus stats for logging)
+    yield {"event": "done", "data": done_payload}, streamed_tokens, cost_so_far, latency
+
+
+def _as_async_iter(results):
+    """Accept both async and plain generators (e.g. test doubles) as a token stream."""
+    if hasattr(results, "__aiter__"):
+        return results
+
+    async def _gen():
+        for r in results:
+            yield r
+
+    return _gen()
+
+
+def _finish_answer(final, query_vector, generation, cache_scope):
+    """
+    Serialise a completed answer's done event and cache it. `tokens_from_openai`
+    hands over a dict that already has its citations in place and is encoded
+    once here; a pre-serialised line (older generators, test doubles) is parsed
+    and gets the citation safety net.
+    """
+    if isinstance(final, dict):
+        data = final["data"]
+        answer_cache.put(
+            query_vector, generation, {"answer": data["answer"], "citations": data["citations"]}, cache_scope
+        )
+        return dumps(final), data
+    final_line = final
+    data = None
+    try:
+        obj = json.loads(final_line)
+        if isinstance(obj, dict) and obj.get("event") == "done":
+            data = obj.get("data", {})
+            # safety net: ensure done has at least one [n]
+            fixed = ensure_inline_citation(data.get("answer", ""), data.get("citations", []))
+            if fixed != data.get("answer", ""):
+                data["answer"] = fixed
+                obj["data"] = data
+                final_line = json.dumps(obj)
+            # Only completed answers reach here (errors and budget stops are EarlyDone lines)
+            answer_cache.put(
+                query_vector,
+                generation,
+                {"answer": data.get("answer", ""), "citations": data.get("citations", [])},
+                cache_scope,
+            )
+    except Exception:
+        pass
+    return final_line, data
+
+
+def _search_knob(body, name, limit, request_id, route):
+    """Optional ANN knob from the request body: None, or an int in [1, limit] (400 otherwise)."""
+    value = body.get(name)
+    if value is None:
+        return None
+    if isinstance(value, bool) or not isinstance(value, int) or not 1 <= value <= limit:
+        log_request(request_id, route=route, status="error")
+        raise HTTPException(status_code=400, detail=f"{name} must be an integer between 1 and {limit}")
+    return value
+
+
+def _index_generation():
+    return index_store.get().generation
+
+
+def _cache_scope(max_tokens):
+    # Everything besides the question and index that shapes an answer
+    return (
+        settings.model_name,
+        settings.top_k,
+        settings.hybrid_lexical_weight,
+        settings.rerank_model,
+        settings.context_token_budget,
+        max_tokens,
+    )
+
+
+def _replay_events(request_id, words, answer, citations, cached=None):
+    """Stream a ready answer as token events + done; no model call, so no cost."""
+
+    async def event_generator_list():
+        start = time.time()
+        for w in words:
+            yield dumps({"event": "token", "data": w})
+        final = {
+            "answer": answer,
+            "citations": citations,
+            "usage": {
+                "prompt_tokens": 0,
+                "completion_tokens": len(words),
+                "cost_usd": 0.0,
+                "latency_ms": int((time.time() - start) * 1000),
+            },
+        }
+        if cached is not None:
+            final["cache"] = {"hit": True, "similarity": round(cached, 4)}
+        log_request(
+            request_id,
+            route="/ask",
+            status="ok",
+            tokens=len(words),
+            cost=0.0,
+            latency=final["usage"]["latency_ms"],
+        )
+        yield dumps({"event": "done", "data": final})
+
+    return event_generator_list()
+
+
+@router.get("/ask/stats")
+def ask_stats(_: None = Depends(auth.check_service_api_key)):
+    return {
+        "answer_cache": answer_cache.stats(),
+        "embed_cache": embed_cache.stats(),
+        "embed_batcher": embed_batcher.stats(),
+    }
 
 
 @router.post("/ask")
@@ -230,17 +425,42 @@ async def ask_endpoint(
     _: None = Depends(auth.check_service_api_key),
 ):
     request_id = make_request_id()
-    rate_limiter("service", settings.rate_limit_rpm)
+    limit_headers = await rate_limiter_async("service", settings.rate_limit_rpm)
 
     body = await request.json()
     question = body.get("question")
     max_tokens = body.get("max_tokens", 400)
     budget_usd = body.get("budget_usd", 0.01)
+    # Optional ANN knobs: trade recall for latency per request
+    nprobe = _search_knob(body, "nprobe", settings.ivf_max_nprobe, request_id, "/ask")
+    ef_search = _search_knob(body, "ef_search", settings.hnsw_max_ef_search, request_id, "/ask")
     if not question:
         log_request(request_id, route="/ask", status="error")
         raise HTTPException(status_code=400, detail="Missing question")
 
-    context_chunks = hybrid_retrieve(question, top_k=settings.top_k)
+    query_vector = await embed_query_async(question)
+
+    # Generation is read before retrieval: an answer built on a snapshot that is
+    # swapped out meanwhile gets the old generation and is simply never matched.
+    # get() may stat files or reload the index, so it runs in the threadpool.
+    generation = await run_in_threadpool(_index_generation)
+    cache_scope = _cache_scope(max_tokens)
+    cached = answer_cache.get(query_vector, generation, cache_scope)
+    if cached is not None:
+        entry, similarity = cached
+        words = re.findall(r"\S+\s*", entry["answer"])
+        return EventSourceResponse(
+            _replay_events(request_id, words, entry["answer"], entry["citations"], cached=similarity),
+            headers=limit_headers,
+        )
+
+    # FAISS releases the GIL and the optional reranker is CPU-bound: keep both off the loop
+    hits = await run_in_threadpool(
+        hybrid_retrieve, question, settings.top_k, nprobe, ef_search, query_vector
+    )
+    # Merge overlapping neighbours and cap the context at the prompt-token budget
+    with metrics.CONTEXT_PACK_SECONDS.time():
+        context_chunks = pack_context(hits, settings.context_token_budget, settings.model_name)
 
     # Deterministic fast paths
     special = maybe_answer_filenames(question, context_chunks)
@@ -248,58 +468,183 @@ async def ask_endpoint(
     if special is not None:
         answer_str, citations = special
         words = re.findall(r"\S+\s*", answer_str)
+        final_answer = ensure_inline_citation(answer_str, citations).strip()
+        return EventSourceResponse(_replay_events(request_id, words, final_answer, citations), headers=limit_headers)
 
-        async def event_generator_list():
-            start = time.time()
-            for w in words:
-                yield json.dumps({"event": "token", "data": w})
-            final = {
-                "answer": ensure_inline_citation(answer_str, citations).strip(),
-                "citations": citations,
-                "usage": {
-                    "prompt_tokens": 0,
-                    "completion_tokens": len(words),
-                    "cost_usd": 0.0,
-                    "latency_ms": int((time.time() - start) * 1000),
-                },
+    async def event_generator():
+        stream = tokens_from_openai(
+            context_chunks, question, max_tokens, settings.model_name, settings.openai_api_key, budget_usd
+        )
+        with metrics.INFLIGHT_STREAMS.track_inprogress():
+            # aclosing: leaving early (disconnect) closes the upstream stream right away
+            async with contextlib.aclosing(_as_async_iter(stream)) as results:
+                async for result in results:
+                    if await request.is_disconnected():
+                        break
+
+                    if isinstance(result, tuple):
+                        final_line, tokens, cost, latency = result
+                        final_line, _ = _finish_answer(final_line, query_vector, generation, cache_scope)
+                        log_request(request_id, route="/ask", status="ok", tokens=tokens, cost=cost, latency=latency)
+                        yield final_line
+                    else:
+                        yield result
+
+    return EventSourceResponse(event_generator(), headers=limit_headers)
+
+
+async def _answer_for_batch(question, hits, query_vector, generation, cache_scope, max_tokens, budget_usd):
+    """Full answer (done payload) for one batch question; token events are not forwarded."""
+    with metrics.CONTEXT_PACK_SECONDS.time():
+        context_chunks = pack_context(hits, settings.context_token_budget, settings.model_name)
+    special = maybe_answer_filenames(question, context_chunks)
+    if special is not None:
+        answer_str, citations = special
+        return {
+            "answer": ensure_inline_citation(answer_str, citations).strip(),
+            "citations": citations,
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "cost_usd": 0.0, "latency_ms": 0},
+        }
+
+    data = None
+    stream = tokens_from_openai(
+        context_chunks, question, max_tokens, settings.model_name, settings.openai_api_key, budget_usd
+    )
+    with metrics.INFLIGHT_STREAMS.track_inprogress():
+        async with contextlib.aclosing(_as_async_iter(stream)) as results:
+            async for result in results:
+                if isinstance(result, tuple):
+                    _, data = _finish_answer(result[0], query_vector, generation, cache_scope)
+                elif isinstance(result, EarlyDone):
+                    data = result.data
+    return data
+
+
+@router.post("/ask/batch")
+async def ask_batch_endpoint(
+    request: Request,
+    _: None = Depends(auth.check_service_api_key),
+):
+    """
+    Answer many questions in one call. All questions are embedded in one
+    encode call and searched with a single (n, d) FAISS query; generation
+    runs concurrently (at most ASK_BATCH_CONCURRENCY at a time). Each answer
+    is emitted as soon as it is done, as one NDJSON line (default) or SSE
+    event ({"index": i, "event": "done", "data": ...}), followed by a final
+    "batch_done" summary.
+    """
+    request_id = make_request_id()
+
+    body = await request.json()
+    questions = body.get("questions")
+    max_tokens = body.get("max_tokens", 400)
+    budget_usd = body.get("budget_usd", 0.01)  # per question
+    nprobe = _search_knob(body, "nprobe", settings.ivf_max_nprobe, request_id, "/ask/batch")
+    ef_search = _search_knob(body, "ef_search", settings.hnsw_max_ef_search, request_id, "/ask/batch")
+    use_sse = body.get("format") == "sse" or "text/event-stream" in request.headers.get("accept", "")
+    if (
+        not isinstance(questions, list)
+        or not questions
+        or not all(isinstance(q, str) and q.strip() for q in questions)
+    ):
+        log_request(request_id, route="/ask/batch", status="error")
+        raise HTTPException(status_code=400, detail="questions must be a non-empty list of strings")
+    if len(questions) > settings.ask_batch_max_questions:
+        log_request(request_id, route="/ask/batch", status="error")
+        raise HTTPException(status_code=400, detail=f"At most {settings.ask_batch_max_questions} questions per batch")
+    if 0 < settings.rate_limit_rpm < len(questions):
+        log_request(request_id, route="/ask/batch", status="error")
+        raise HTTPException(
+            status_code=400, detail=f"At most {settings.rate_limit_rpm} questions per batch (RATE_LIMIT_RPM)"
+        )
+    # Every question is an LLM call: charge one rate-limit token each, all or nothing
+    limit_headers = await rate_limiter_async("service", settings.rate_limit_rpm, cost=len(questions))
+
+    start = time.time()
+    # Embedding and FAISS are CPU-bound: keep them off the event loop
+    vectors = await run_in_threadpool(embed_queries, questions)
+    generation = await run_in_threadpool(_index_generation)
+    cache_scope = _cache_scope(max_tokens)
+
+    done = {}
+    for i in range(len(questions)):
+        cached = answer_cache.get(vectors[i : i + 1], generation, cache_scope)
+        if cached is not None:
+            entry, similarity = cached
+            done[i] = {
+                "answer": entry["answer"],
+                "citations": entry["citations"],
+                "usage": {"prompt_tokens": 0, "completion_tokens": 0, "cost_usd": 0.0, "latency_ms": 0},
+                "cache": {"hit": True, "similarity": round(similarity, 4)},
             }
-            log_request(
-                request_id,
-                route="/ask",
-                status="ok",
-                tokens=len(words),
-                cost=0.0,
-                latency=final["usage"]["latency_ms"],
-            )
-            yield json.dumps({"event": "done", "data": final})
+    todo = [i for i in range(len(questions)) if i not in done]
+    hits = {}
+    if todo:
+        results = await run_in_threadpool(
+            hybrid_retrieve_batch,
+            [questions[i] for i in todo],
+            settings.top_k,
+            nprobe,
+            ef_search,
+            vectors[todo],
+        )
+        hits = dict(zip(todo, results))
+
+    sem = asyncio.Semaphore(max(1, settings.ask_batch_concurrency))
+
+    async def answer(i):
+        async with sem:
+            try:
+                data = await _answer_for_batch(
+                    questions[i], hits[i], vectors[i : i + 1], generation, cache_scope, max_tokens, budget_usd
+                )
+                error = "[Upstream Error] No answer produced."
+            except Exception as e:
+                data, error = None, f"[Upstream Error] {type(e).__name__}: {str(e)[:120]}"
+            if data is None:
+                data = {
+                    "answer": error,
+                    "citations": [],
+                    "usage": {"prompt_tokens": 0, "completion_tokens": 0, "cost_usd": 0.0, "latency_ms": 0},
+                }
+            return i, data
 
-        return EventSourceResponse(event_generator_list())
+    def line(obj):
+        return dumps(obj) if use_sse else dumps(obj) + "\n"
 
     async def event_generator():
-        for result in tokens_from_openai(
-            context_chunks, question, max_tokens, settings.model_name, settings.openai_api_key, budget_usd
-        ):
-            if await request.is_disconnected():
-                break
-
-            if isinstance(result, tuple):
-                final_line, tokens, cost, latency = result
-                # safety net: ensure done has at least one [n]
-                try:
-                    obj = json.loads(final_line)
-                    if isinstance(obj, dict) and obj.get("event") == "done":
-                        data = obj.get("data", {})
-                        fixed = ensure_inline_citation(data.get("answer", ""), data.get("citations", []))
-                        if fixed != data.get("answer", ""):
-                            data["answer"] = fixed
-                            obj["data"] = data
-                            final_line = json.dumps(obj)
-                except Exception:
-                    pass
-
-                log_request(request_id, route="/ask", status="ok", tokens=tokens, cost=cost, latency=latency)
-                yield final_line
-            else:
-                yield result
-
-    return EventSourceResponse(event_generator())
+        total_cost = 0.0
+        tasks = [asyncio.ensure_future(answer(i)) for i in todo]
+        try:
+            for i, data in done.items():
+                yield line({"index": i, "event": "done", "data": data})
+            for fut in asyncio.as_completed(tasks):
+                i, data = await fut
+                usage = data.get("usage", {})
+                total_cost += usage.get("cost_usd", 0.0) or 0.0
+                log_request(
+                    request_id,
+                    route="/ask/batch",
+                    status="ok",
+                    tokens=usage.get("completion_tokens"),
+                    cost=usage.get("cost_usd"),
+                    latency=usage.get("latency_ms"),
+                )
+                yield line({"index": i, "event": "done", "data": data})
+            yield line({
+                "event": "batch_done",
+                "data": {
+                    "questions": len(questions),
+                    "cache_hits": len(done),
+                    "cost_usd": total_cost,
+                    "latency_ms": int((time.time() - start) * 1000),
+                },
+            })
+        finally:
+            # Client went away: stop generating the remaining answers
+            for t in tasks:
+                t.cancel()
+
+    if use_sse:
+        return EventSourceResponse(event_generator(), headers=limit_headers)
+    return StreamingResponse(event_generator(), media_type="application/x-ndjson", headers=limit_headers)
@@ -13,7 +13,7 @@ def check_service_api_key(x_api_key: str = Header(None)) -> None:
             return
 
     # Normal enforcement
-    if not x_api_key or x_api_key != settings.API_KEY:
+    if not x_api_key or x_api_key != settings.api_key:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid or missing API key",
@@ -4,10 +4,12 @@ import os
 import shutil
 import time
 
+from starlette.concurrency import run_in_threadpool
+
 from app.core.config import settings
 from app.core.logger import make_request_id, log_request
 from app.api import auth
-from app.core.chunk_manager import build_index
+from app.core.chunk_manager import build_index, IngestResult
 
 router = APIRouter()
 
@@ -57,11 +59,10 @@ async def ingest_endpoint(
         log_request(request_id, route="/ingest", status=status_code, tokens=0, cost=None, latency=latency)
         return {"error": "No documents found in docs folder."}
 
-    # 3) Chunk, deduplicate, embed, index
-    chunk_count = 0
-    est_tokens = 0
+    # 3) Chunk, deduplicate, embed only new/changed chunks, index. In a worker
+    # thread: a large build must not stall /ask streams and /ready probes
     try:
-        chunk_count, est_tokens = build_index(doc_files)
+        result = IngestResult(*await run_in_threadpool(build_index, doc_files))
     except Exception as e:
         status_code = "error"
         latency = int((time.time() - start_time) * 1000)
@@ -73,12 +74,15 @@ async def ingest_endpoint(
         request_id,
         route="/ingest",
         status=status_code,
-        tokens=chunk_count,
+        tokens=result.chunks,
         cost=None,
         latency=latency,
     )
     return {
         "docs": len(doc_files),
-        "chunks": chunk_count,
-        "est_tokens": est_tokens,
+        "chunks": result.chunks,
+        "est_tokens": result.est_tokens,
+        "reused": result.reused,
+        "added": result.added,
+        "removed": result.removed,
     }
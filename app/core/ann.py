@@ -0,0 +1,230 @@
+from __future__ import annotations
+
+import math
+import os
+
+import numpy as np
+
+from app.core.config import settings
+from app.core.lazy import lazy_import
+
+faiss = lazy_import("faiss")
+
+INDEX_TYPES = ("flat", "ivf_flat", "ivf_pq", "hnsw")
+
+# Auto-selection thresholds (chunk count)
+FLAT_MAX = 20_000
+IVF_FLAT_MAX = 1_000_000
+
+
+def choose_index_type(n_vectors: int) -> str:
+    """Pick an index type for the corpus size when INDEX_TYPE=auto."""
+    if n_vectors < FLAT_MAX:
+        return "flat"
+    if n_vectors < IVF_FLAT_MAX:
+        return "ivf_flat"
+    return "ivf_pq"
+
+
+def resolve_index_type(n_vectors: int) -> str:
+    index_type = settings.index_type.lower()
+    if index_type == "auto":
+        return choose_index_type(n_vectors)
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown INDEX_TYPE {settings.index_type!r}, expected auto or one of {INDEX_TYPES}")
+    return index_type
+
+
+def _nlist(n_vectors: int) -> int:
+    if settings.ivf_nlist > 0:
+        return settings.ivf_nlist
+    # ~4*sqrt(n) lists, but keep >= 39 training points per centroid
+    return max(1, min(int(4 * math.sqrt(n_vectors)), n_vectors // 39))
+
+
+def _pq_m(dim: int) -> int:
+    if settings.pq_m > 0:
+        return settings.pq_m
+    # Largest sub-quantizer count <= dim/8 that divides dim
+    m = max(1, dim // 8)
+    while dim % m:
+        m -= 1
+    return m
+
+
+def make_index(index_type: str, dim: int, n_vectors: int) -> faiss.Index:
+    """Create an empty (possibly untrained) inner-product index."""
+    ip = faiss.METRIC_INNER_PRODUCT
+    if index_type == "flat":
+        return faiss.IndexFlatIP(dim)
+    if index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, settings.hnsw_m, ip)
+        index.hnsw.efConstruction = settings.hnsw_ef_construction
+        index.hnsw.efSearch = settings.hnsw_ef_search
+        return index
+
+    nlist = _nlist(n_vectors)
+    quantizer = faiss.IndexFlatIP(dim)
+    if index_type == "ivf_flat":
+        index = faiss.IndexIVFFlat(quantizer, dim, nlist, ip)
+    elif index_type == "ivf_pq":
+        # PQ needs 2^nbits points per sub-quantizer codebook; shrink bits on small corpora
+        nbits = 8 if n_vectors >= 256 * 39 else max(1, int(math.log2(max(2, n_vectors // 39))))
+        index = faiss.IndexIVFPQ(quantizer, dim, nlist, _pq_m(dim), nbits, ip)
+    else:
+        raise ValueError(f"Unknown index type {index_type!r}")
+    index.nprobe = min(settings.ivf_nprobe, nlist)
+    return index
+
+
+def train_index(index: faiss.Index, X: np.ndarray, seed: int = 1234):
+    """Train on a random sample of at most INDEX_TRAIN_SIZE vectors."""
+    if index.is_trained:
+        return
+    n = len(X)
+    if n > settings.index_train_size:
+        rng = np.random.default_rng(seed)
+        X = X[np.sort(rng.choice(n, settings.index_train_size, replace=False))]
+    index.train(np.ascontiguousarray(X, dtype="float32"))
+
+
+class StreamingIndexBuilder:
+    """
+    Fills a new index batch by batch. IVF/PQ indexes must be trained before
+    the first add, so vectors are buffered until INDEX_TRAIN_SIZE of them (or
+    the whole corpus, if smaller) are available; the buffer is the training
+    sample. Memory beyond the index itself is bounded by that sample.
+    """
+
+    def __init__(self, index_type: str, n_total: int, with_ids: bool = True):
+        self.index_type = index_type
+        self.n_total = n_total
+        self.with_ids = with_ids
+        self.index = None
+        self._buf, self._buf_ids, self._buffered = [], [], 0
+
+    def add(self, X: np.ndarray, ids: np.ndarray = None):
+        if self.index is None:
+            self.index = make_index(self.index_type, X.shape[1], self.n_total)
+            if self.with_ids and not isinstance(self.index, faiss.IndexIVF):
+                self.index = faiss.IndexIDMap2(self.index)
+        if self.index.is_trained:
+            self._add(X, ids)
+            return
+        self._buf.append(X)
+        self._buf_ids.append(ids)
+        self._buffered += len(X)
+        if self._buffered >= min(settings.index_train_size, self.n_total):
+            self._train_and_flush()
+
+    def _add(self, X, ids):
+        if self.with_ids:
+            self.index.add_with_ids(X, np.asarray(ids, dtype="int64"))
+        else:
+            self.index.add(X)
+
+    def _train_and_flush(self):
+        X = np.concatenate(self._buf)
+        train_index(self.index, X)
+        for Xb, ids in zip(self._buf, self._buf_ids):
+            self._add(Xb, ids)
+        self._buf, self._buf_ids, self._buffered = [], [], 0
+
+    def finish(self) -> faiss.Index:
+        if self._buf:
+            self._train_and_flush()
+        return self.index
+
+
+def build_ann_index(X: np.ndarray, index_type: str = None, ids: np.ndarray = None) -> faiss.Index:
+    """
+    Build and fill an index. With `ids`, vectors are stored under those stable
+    ids: IVF indexes keep them natively, flat/HNSW are wrapped in IndexIDMap2.
+    """
+    index_type = index_type or resolve_index_type(len(X))
+    builder = StreamingIndexBuilder(index_type, len(X), with_ids=ids is not None)
+    builder.add(X, ids)
+    return builder.finish()
+
+
+def _unwrap(index: faiss.Index) -> faiss.Index:
+    if isinstance(index, faiss.IndexIDMap):
+        return faiss.downcast_index(index.index)
+    return faiss.downcast_index(index)
+
+
+def index_kind(index: faiss.Index) -> str:
+    inner = _unwrap(index)
+    if isinstance(inner, faiss.IndexIVFPQ):
+        return "ivf_pq"
+    if isinstance(inner, faiss.IndexIVF):
+        return "ivf_flat"
+    if isinstance(inner, faiss.IndexHNSW):
+        return "hnsw"
+    return "flat"
+
+
+def supports_remove(index: faiss.Index) -> bool:
+    # HNSW graphs cannot drop nodes; everything else removes by id in place
+    return index_kind(index) != "hnsw"
+
+
+def reconstruct_vectors(index: faiss.Index, ids) -> np.ndarray:
+    """Exact stored vectors for `ids`, or None when the index is lossy (PQ)."""
+    kind = index_kind(index)
+    if kind == "ivf_pq":
+        return None
+    ids = np.asarray(ids, dtype="int64")
+    if kind == "ivf_flat" and index.direct_map.type != faiss.DirectMap.Hashtable:
+        index.set_direct_map_type(faiss.DirectMap.Hashtable)
+    return index.reconstruct_batch(ids)
+
+
+def search_params(index: faiss.Index, nprobe: int = None, ef_search: int = None):
+    """
+    Per-request search parameters. These are passed to `index.search` rather
+    than set on the shared index, so concurrent requests don't race.
+    """
+    inner = _unwrap(index)
+    if nprobe and isinstance(inner, faiss.IndexIVF):
+        # Probing more lists than exist is just a full scan
+        return faiss.SearchParametersIVF(nprobe=min(int(nprobe), inner.nlist))
+    if ef_search and isinstance(inner, faiss.IndexHNSW):
+        return faiss.SearchParametersHNSW(efSearch=int(ef_search))
+    return None
+
+
+def ann_search(index: faiss.Index, qv: np.ndarray, k: int, nprobe: int = None, ef_search: int = None):
+    params = search_params(index, nprobe, ef_search)
+    if params is None:
+        return index.search(qv, k)
+    return index.search(qv, k, params=params)
+
+
+# The chunk-store build an index belongs to is appended to the FAISS file
+# (FAISS stops reading at the end of the index and ignores it), so the index
+# and its id travel together through one atomic rename.
+_BUILD_TAG = b"\nminirag-build:"
+_BUILD_LEN = 12
+
+
+def write_index(index: faiss.Index, path: str, build: str = None):
+    """`faiss.write_index`, tagged with the chunk-store `build` it belongs to."""
+    faiss.write_index(index, path)
+    if build:
+        with open(path, "ab") as f:
+            f.write(_BUILD_TAG + build.encode("ascii"))
+
+
+def read_index_build(path: str):
+    """The build id an index file was tagged with, or None (untagged / older file)."""
+    n = len(_BUILD_TAG) + _BUILD_LEN
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        if f.tell() < n:
+            return None
+        f.seek(-n, os.SEEK_END)
+        tail = f.read(n)
+    if not tail.startswith(_BUILD_TAG):
+        return None
+    return tail[len(_BUILD_TAG):].decode("ascii")
@@ -0,0 +1,121 @@
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+
+class SemanticAnswerCache:
+    """
+    Bounded LRU of final /ask answers keyed on the question embedding.
+
+    A lookup matches the most similar cached question (cosine on normalised
+    vectors) if it is at least `threshold` and was answered against the same
+    index generation and `scope` (e.g. the model). Entries from an older
+    generation are dropped as soon as a newer one is seen, so a rebuild
+    invalidates everything. A caller still on an older generation (a request
+    that started before a hot-swap) misses and cannot store. `maxsize=0`
+    disables the cache.
+    """
+
+    def __init__(self, maxsize: int = 512, threshold: float = 0.95, ttl_s: float = 0.0):
+        self.maxsize = maxsize
+        self.threshold = threshold
+        self.ttl_s = ttl_s
+        self._lock = threading.Lock()
+        self._vectors = None  # (maxsize, d) rows, one slot per entry
+        self._slots = OrderedDict()  # slot -> (scope, payload, expires), LRU order
+        self._free = list(range(maxsize))
+        self._generation = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _check_generation(self, generation) -> bool:
+        """Move forward to `generation` if it is newer; False if it is older."""
+        if self._generation is not None and generation < self._generation:
+            return False
+        if generation != self._generation:
+            if self._slots:
+                self.invalidations += 1
+            self._clear()
+            self._generation = generation
+        return True
+
+    def _clear(self):
+        self._slots.clear()
+        self._free = list(range(self.maxsize))
+
+    def get(self, vector: np.ndarray, generation: int, scope=None):
+        """Return (payload, similarity) for the closest match, or None."""
+        if self.maxsize <= 0:
+            return None
+        q = np.asarray(vector, dtype="float32").reshape(-1)
+        with self._lock:
+            best = None
+            if self._check_generation(generation) and self._slots:
+                slots = np.fromiter(self._slots, dtype="int64", count=len(self._slots))
+                sims = self._vectors[slots] @ q
+                now = time.monotonic()
+                # Highest similarity first; skip other scopes / expired entries
+                for j in np.argsort(-sims):
+                    if sims[j] < self.threshold:
+                        break
+                    slot = int(slots[j])
+                    entry_scope, payload, expires = self._slots[slot]
+                    if entry_scope != scope:
+                        continue
+                    if expires and expires <= now:
+                        self._drop(slot)
+                        continue
+                    self._slots.move_to_end(slot)
+                    best = (payload, float(sims[j]))
+                    break
+            if best is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return best
+
+    def put(self, vector: np.ndarray, generation: int, payload, scope=None):
+        if self.maxsize <= 0:
+            return
+        q = np.asarray(vector, dtype="float32").reshape(-1)
+        expires = time.monotonic() + self.ttl_s if self.ttl_s > 0 else 0.0
+        with self._lock:
+            if not self._check_generation(generation):
+                return
+            if self._vectors is None or self._vectors.shape[1] != q.shape[0]:
+                self._vectors = np.zeros((self.maxsize, q.shape[0]), dtype="float32")
+                self._clear()
+            if not self._free:
+                self._drop(next(iter(self._slots)))
+                self.evictions += 1
+            slot = self._free.pop()
+            self._vectors[slot] = q
+            self._slots[slot] = (scope, payload, expires)
+
+    def _drop(self, slot):
+        del self._slots[slot]
+        self._free.append(slot)
+
+    def clear(self):
+        with self._lock:
+            self._clear()
+            self._generation = None
+
+    def __len__(self):
+        return len(self._slots)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._slots),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
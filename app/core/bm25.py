@@ -0,0 +1,166 @@
+import os
+import re
+from array import array
+from collections import Counter
+
+import numpy as np
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> list[str]:
+    return _TOKEN_RE.findall(text.lower())
+
+
+def bm25_path(index_path: str) -> str:
+    # Lives next to index.faiss: ./faiss_index/index.faiss -> ./faiss_index/index.bm25.npz
+    return os.path.splitext(index_path)[0] + ".bm25.npz"
+
+
+def _pack_terms(terms):
+    # One UTF-8 blob plus offsets: a fixed-width "<U" array would pad every
+    # term to the longest one (a single base64 token makes the vocab huge)
+    encoded = [t.encode("utf-8") for t in terms]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(e) for e in encoded], out=offsets[1:])
+    return np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets
+
+
+def _unpack_terms(blob, offsets):
+    data = blob.tobytes()
+    bounds = offsets.tolist()
+    return [data[s:e].decode("utf-8") for s, e in zip(bounds, bounds[1:])]
+
+
+class BM25Index:
+    """
+    Okapi BM25 over an inverted index in CSR layout.
+
+    Postings for term t are `doc_ids[indptr[t]:indptr[t+1]]`, with the full
+    per-posting BM25 weight (idf * saturated tf, length-normalised) already
+    folded into `weights` at build time. A query therefore only touches the
+    postings of its own terms, and scoring is a couple of NumPy ops.
+    """
+
+    def __init__(self, terms, indptr, doc_ids, weights, doc_len, idf, k1=1.5, b=0.75, build_id=None):
+        self.terms = terms
+        self.vocab = {t: i for i, t in enumerate(terms)}
+        self.indptr = indptr
+        self.doc_ids = doc_ids
+        self.weights = weights
+        self.doc_len = doc_len
+        self.idf = idf
+        self.k1 = k1
+        self.b = b
+        self.build_id = build_id  # chunk-store build this index was written with
+
+    @property
+    def n_docs(self) -> int:
+        return len(self.doc_len)
+
+    @classmethod
+    def build(cls, texts, k1: float = 1.5, b: float = 0.75) -> "BM25Index":
+        builder = BM25Builder()
+        builder.add(texts)
+        return builder.finish(k1, b)
+
+    def save(self, path: str):
+        term_blob, term_offsets = _pack_terms(self.terms)
+        extra = {"build": np.array(self.build_id)} if self.build_id else {}
+        with open(path, "wb") as f:
+            np.savez(
+                f,
+                **extra,
+                term_blob=term_blob,
+                term_offsets=term_offsets,
+                indptr=self.indptr,
+                doc_ids=self.doc_ids,
+                weights=self.weights,
+                doc_len=self.doc_len,
+                idf=self.idf,
+                params=np.array([self.k1, self.b], dtype=np.float32),
+            )
+
+    @classmethod
+    def load(cls, path: str) -> "BM25Index":
+        with np.load(path) as z:
+            k1, b = (float(x) for x in z["params"])
+            if "term_blob" in z.files:
+                terms = _unpack_terms(z["term_blob"], z["term_offsets"])
+            else:
+                terms = z["terms"].tolist()  # files written before the blob layout
+            build_id = str(z["build"]) if "build" in z.files else None
+            return cls(terms, z["indptr"], z["doc_ids"], z["weights"], z["doc_len"], z["idf"], k1, b, build_id)
+
+    def score(self, query: str, top_n: int = 10):
+        """Return (doc_ids, scores) of the best `top_n` docs, best first."""
+        tids = [self.vocab[t] for t in set(tokenize(query)) if t in self.vocab]
+        if not tids or top_n <= 0:
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float32)
+
+        if len(tids) == 1:
+            s, e = self.indptr[tids[0]], self.indptr[tids[0] + 1]
+            docs, scores = self.doc_ids[s:e], self.weights[s:e]
+        else:
+            spans = [(self.indptr[t], self.indptr[t + 1]) for t in tids]
+            cand = np.concatenate([self.doc_ids[s:e] for s, e in spans])
+            w = np.concatenate([self.weights[s:e] for s, e in spans])
+            if len(cand) * 8 > self.n_docs:
+                # Common terms: a dense accumulator is cheaper than sorting postings
+                acc = np.bincount(cand, weights=w, minlength=self.n_docs)
+                docs = np.flatnonzero(acc).astype(np.int32)
+                scores = acc[docs].astype(np.float32)
+            else:
+                docs, inv = np.unique(cand, return_inverse=True)
+                scores = np.bincount(inv, weights=w).astype(np.float32)
+
+        if len(docs) > top_n:
+            part = np.argpartition(-scores, top_n - 1)[:top_n]
+            docs, scores = docs[part], scores[part]
+        order = np.argsort(-scores, kind="stable")
+        return docs[order], scores[order]
+
+
+class BM25Builder:
+    """
+    Accumulates postings batch by batch (only compact int/float arrays, never
+    the text) so the index can be built while chunks stream through ingestion.
+    """
+
+    def __init__(self):
+        self.vocab = {}
+        self.post_term, self.post_doc, self.post_tf = array("i"), array("i"), array("f")
+        self.doc_len = array("f")
+
+    def add(self, texts):
+        vocab = self.vocab
+        for text in texts:
+            doc_id = len(self.doc_len)
+            toks = tokenize(text)
+            self.doc_len.append(len(toks))
+            for tok, tf in Counter(toks).items():
+                self.post_term.append(vocab.setdefault(tok, len(vocab)))
+                self.post_doc.append(doc_id)
+                self.post_tf.append(tf)
+
+    def finish(self, k1: float = 1.5, b: float = 0.75) -> BM25Index:
+        terms = sorted(self.vocab, key=self.vocab.get)
+        n_docs = len(self.doc_len)
+        term_ids = np.frombuffer(self.post_term, dtype=np.int32)
+        docs = np.frombuffer(self.post_doc, dtype=np.int32)
+        tfs = np.frombuffer(self.post_tf, dtype=np.float32)
+        dl = np.frombuffer(self.doc_len, dtype=np.float32).copy()
+
+        # Group postings by term (stable, so doc ids stay ascending within a term)
+        order = np.argsort(term_ids, kind="stable")
+        term_ids, docs, tfs = term_ids[order], docs[order], tfs[order]
+        df = np.bincount(term_ids, minlength=len(terms))
+        indptr = np.zeros(len(terms) + 1, dtype=np.int64)
+        np.cumsum(df, out=indptr[1:])
+
+        idf = np.log1p((n_docs - df + 0.5) / (df + 0.5)).astype(np.float32)
+        avgdl = float(dl.mean()) if n_docs else 0.0
+        norm = k1 * (1 - b + b * dl[docs] / avgdl) if avgdl else np.full_like(tfs, k1)
+        weights = (idf[term_ids] * tfs * (k1 + 1) / (tfs + norm)).astype(np.float32)
+
+        return BM25Index(terms, indptr, docs.copy(), weights, dl, idf, k1, b)
@@ -1,12 +1,33 @@
+import contextlib
+import hashlib
 import os
-import faiss
+import threading
+import time
 import numpy as np
-import pickle
+from collections import defaultdict, deque
+from typing import NamedTuple
+from app.core.ann import (
+    StreamingIndexBuilder,
+    index_kind,
+    read_index_build,
+    reconstruct_vectors,
+    resolve_index_type,
+    supports_remove,
+    write_index,
+)
+from app.core.bm25 import BM25Builder, bm25_path
 from app.core.config import settings
-from sentence_transformers import SentenceTransformer
-import numpy as np
+from app.core.index_store import index_store
+from app.core.logger import log_event
+from app.core.meta_store import ChunkStore, MetaWriter, open_store, resolve_meta_path
+from app.core.parallel_ingest import IngestPool, resolve_workers
+from app.core.embedding import get_backend
+from app.core.lazy import lazy_import
+
+faiss = lazy_import("faiss")  # loaded on first index build / load
 
-_model = None  # Global model instance for reuse
+# One build at a time per process: builds share the .tmp paths they publish from
+_build_lock = threading.Lock()
 
 def load_docs(file_paths):
     docs = []
@@ -18,44 +39,406 @@ def load_docs(file_paths):
         sources.append(os.path.basename(fp))
     return docs, sources
 
+def iter_file_words(fp, block_size: int = 1 << 20):
+    """Stream whitespace-separated words from a file without reading it whole."""
+    carry = ""
+    with open(fp, "r", encoding="utf-8") as f:
+        while True:
+            block = f.read(block_size)
+            if not block:
+                break
+            words = (carry + block).split()
+            # The last word may continue in the next block
+            carry = "" if block[-1].isspace() else (words.pop() if words else "")
+            yield from words
+    if carry:
+        yield carry
+
+
+def iter_chunks(words, size=512, overlap=64):
+    """Sliding word windows over any word iterable; same output as `simple_chunk`."""
+    step = size - overlap
+    window = []
+    for w in words:
+        window.append(w)
+        if len(window) == size:
+            yield " ".join(window)
+            del window[:step]
+    # Trailing windows start inside the tail, exactly like the index loop below
+    while window:
+        yield " ".join(window)
+        del window[:step]
+
+
+def count_chunks(n_words, size=512, overlap=64) -> int:
+    step = size - overlap
+    return -(-n_words // step) if n_words else 0
+
+
 def simple_chunk(text, size=512, overlap=64):
-    tokens = text.split()
-    chunks = []
-    i = 0
-    while i < len(tokens):
-        chunk = tokens[i:i+size]
-        chunks.append(" ".join(chunk))
-        i += size - overlap
-    return chunks
-
-def get_embedding_model() -> SentenceTransformer:
-    global _model
-    if _model is None:
-        _model = SentenceTransformer("all-MiniLM-L6-v2")  # 384-dim, fast, free
-    return _model
+    return list(iter_chunks(text.split(), size, overlap))
+
+
+# Every code point `str.split()` treats as whitespace lies below U+3001
+_WHITESPACE = np.zeros(0x3002, dtype=bool)
+_WHITESPACE[[c for c in range(0x3001) if chr(c).isspace()]] = True
+# Lookup tables over code points up to U+201E: sentence-ending marks and closers
+_SENTENCE_END = np.zeros(0x201F, dtype=bool)
+_SENTENCE_END[[ord(c) for c in ".!?"]] = True
+_CLOSERS = np.zeros(0x201F, dtype=bool)
+_CLOSERS[[ord(c) for c in "\"')]”’"]] = True
+BOUNDARIES = ("", "sentence", "paragraph")
+
+
+def _codepoints(text: str) -> np.ndarray:
+    # One byte per character for ASCII text, four otherwise
+    if text.isascii():
+        return np.frombuffer(text.encode("ascii"), dtype=np.uint8)
+    return np.frombuffer(text.encode("utf-32-le"), dtype="<u4")
+
+
+def _cut_points(cp, starts, ends, boundary):
+    """Word indices a chunk may end after: sentence ends and/or blank lines."""
+    # Gaps between words are pure whitespace: two newlines in one = blank line
+    newlines = np.flatnonzero(cp == 10)
+    cut = np.zeros(len(starts), dtype=bool)
+    cut[:-1] = np.searchsorted(newlines, starts[1:]) - np.searchsorted(newlines, ends[:-1]) >= 2
+    if boundary == "sentence":
+        last = np.minimum(cp[ends - 1].astype(np.int64), 0x201E)
+        before = np.minimum(cp[np.maximum(ends - 2, starts)].astype(np.int64), 0x201E)
+        cut |= _SENTENCE_END[last]
+        cut |= _CLOSERS[last] & _SENTENCE_END[before] & (ends - starts > 1)
+    return np.flatnonzero(cut)
+
+
+def _snapped_windows(n, size, overlap, cuts):
+    """
+    Word windows that end at the last cut point in their second half (else at
+    `size` words). The next window starts `overlap` words back, or later at
+    a cut inside that overlap, so it starts on a sentence / paragraph too.
+    """
+    first, last = [], []
+    s = 0
+    while True:
+        e = min(s + size, n)
+        if e < n:
+            j = int(np.searchsorted(cuts, e - 1, side="right")) - 1
+            if j >= 0 and cuts[j] + 1 > s + size // 2:
+                e = int(cuts[j]) + 1
+        first.append(s)
+        last.append(e - 1)
+        if e >= n:
+            break
+        nxt = e - overlap
+        k = int(np.searchsorted(cuts, nxt - 1))
+        if k < len(cuts) and cuts[k] + 1 < e:
+            nxt = int(cuts[k]) + 1
+        s = max(nxt, s + 1)
+    return np.asarray(first), np.asarray(last)
+
+
+def span_offsets(text: str, size=512, overlap=64, boundary=""):
+    """
+    Character (start, end) arrays of the chunks of `text`, in one vectorised
+    pass over its code points; no word list and no chunk strings are built.
+
+    Without a boundary the windows are exactly `simple_chunk`'s, so
+    `" ".join(text[s:e].split())` equals its chunks. With "sentence" or
+    "paragraph" a window ends at the last sentence end / blank line in its
+    second half, and its overlap with the next window starts after one when
+    it contains one.
+    """
+    if boundary not in BOUNDARIES:
+        raise ValueError(f"Unknown chunk boundary {boundary!r} (expected one of {BOUNDARIES[1:]})")
+    cp = _codepoints(text)
+    is_word = ~_WHITESPACE[cp if cp.dtype == np.uint8 else np.minimum(cp, 0x3001)]
+    edges = np.diff(is_word.astype(np.int8), prepend=np.int8(0), append=np.int8(0))
+    starts, ends = np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+    n = len(starts)
+    if not n:
+        return starts, ends
+    if boundary:
+        first, last = _snapped_windows(n, size, overlap, _cut_points(cp, starts, ends, boundary))
+    else:
+        first = np.arange(0, n, size - overlap)
+        last = np.minimum(first + size, n) - 1
+    return starts[first], ends[last]
+
+
+def iter_spans(text: str, size=512, overlap=64, doc_id=0, boundary=""):
+    """Lazily yield `(doc_id, start, end)` character spans; chunk text is `text[start:end]`."""
+    starts, ends = span_offsets(text, size, overlap, boundary)
+    for s, e in zip(starts.tolist(), ends.tolist()):
+        yield doc_id, s, e
+
+
+def utf8_offsets(text: str, offsets: np.ndarray) -> np.ndarray:
+    """Character offsets into `text` as byte offsets into `text.encode("utf-8")`."""
+    if text.isascii():
+        return offsets
+    cp = _codepoints(text)
+    width = 1 + (cp >= 0x80).astype(np.int64) + (cp >= 0x800) + (cp >= 0x10000)
+    return np.concatenate(([0], np.cumsum(width)))[offsets]
+
+def get_embedding_model():
+    # all-MiniLM-L6-v2: 384-dim, fast, free; backend per EMBEDDING_BACKEND (or EMBED_FN)
+    return get_backend()
+
 
 def embed(texts: list[str]) -> np.ndarray:
     model = get_embedding_model()
     vectors = model.encode(texts, normalize_embeddings=True)
     return vectors.astype("float32")
 
-def build_index(file_paths):
-    docs, sources = load_docs(file_paths)
-    all_chunks, chunk_sources = [], []
-    for doc, src in zip(docs, sources):
-        chunks = simple_chunk(doc, size=settings.CHUNK_SIZE, overlap=settings.CHUNK_OVERLAP)
-        all_chunks.extend(chunks)
-        chunk_sources.extend([src]*len(chunks))
-
-    X = embed(all_chunks)
-    faiss.normalize_L2(X)
-    index = faiss.IndexFlatIP(X.shape[1])
-    index.add(X)
-
-    # Save index and metadata
-    os.makedirs(os.path.dirname(settings.INDEX_PATH), exist_ok=True)
-    faiss.write_index(index, settings.INDEX_PATH)
-    with open(settings.META_PATH, "wb") as f:
-        pickle.dump({"chunks": all_chunks, "sources": chunk_sources}, f)
-
-    return len(all_chunks), sum(len(chunk.split()) for chunk in all_chunks)
+class IngestResult(NamedTuple):
+    chunks: int
+    est_tokens: int
+    reused: int = 0
+    added: int = 0
+    removed: int = 0
+
+
+def _content_hash(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def _index_params() -> dict:
+    # Vectors can only be reused if chunks were cut and embedded the same way;
+    # another backend (int8 / onnx) or model export gives different vectors
+    return {
+        "chunk_size": settings.chunk_size,
+        "chunk_overlap": settings.chunk_overlap,
+        "embedding_model": settings.embedding_model,
+        "embedding_backend": settings.embedding_backend,
+        "embedding_model_dir": settings.embedding_model_dir,
+        "embedding_onnx_file": settings.embedding_onnx_file,
+        "embed_fn": settings.embed_fn,
+    }
+
+
+def _load_previous():
+    """
+    Previous index plus {(source, chunk hash): [ids]} from disk, if compatible
+    with the current settings. Chunk text is never loaded.
+    """
+    try:
+        index = faiss.read_index(settings.index_path)
+        store = open_store(resolve_meta_path(settings.meta_path, settings.index_path))
+    except (FileNotFoundError, RuntimeError):
+        return None, None
+    if store.manifest.get("params") != _index_params() or not store.has_ids:
+        return None, None
+    if read_index_build(settings.index_path) not in (None, store.manifest.get("build")):
+        # Caught between another build's manifest and index: don't reuse either
+        return None, None
+    reusable = defaultdict(deque)
+    for src, h, cid in store.keys():
+        reusable[(src, h)].append(cid)
+    return index, {"reusable": reusable, "next_id": store.manifest["next_id"]}
+
+
+def _iter_corpus(file_paths):
+    """Yield (source, chunk) for every file, one file and one block at a time."""
+    for fp in file_paths:
+        src = os.path.basename(fp)
+        for chunk in iter_chunks(iter_file_words(fp), settings.chunk_size, settings.chunk_overlap):
+            yield src, chunk
+
+
+def _iter_span_corpus(file_paths, writer):
+    """
+    Yield (source, chunk, byte span) for every file: each file is read whole,
+    stored once in the chunk store and cut with the offset chunker.
+    """
+    for fp in file_paths:
+        src = os.path.basename(fp)
+        with open(fp, "r", encoding="utf-8") as f:
+            text = f.read()
+        base = writer.add_document(text)
+        starts, ends = span_offsets(text, settings.chunk_size, settings.chunk_overlap, settings.chunk_boundary)
+        spans = base + np.stack([utf8_offsets(text, starts), utf8_offsets(text, ends)], axis=1)
+        for s, e, span in zip(starts.tolist(), ends.tolist(), spans.tolist()):
+            yield src, text[s:e], span
+
+
+def _count_spans(fp) -> int:
+    with open(fp, "r", encoding="utf-8") as f:
+        text = f.read()
+    return len(span_offsets(text, settings.chunk_size, settings.chunk_overlap, settings.chunk_boundary)[0])
+
+
+def _batched(it, n):
+    batch = []
+    for item in it:
+        batch.append(item)
+        if len(batch) == n:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def build_index(file_paths, progress=None):
+    """
+    Streaming, incremental (re)build of the index for `file_paths`.
+
+    Files are read in blocks and chunked lazily; chunks are embedded in
+    batches of INGEST_BATCH_SIZE, added to FAISS and appended to the metadata
+    file batch by batch, so peak memory (beyond the index itself) is bounded
+    by the batch size rather than the corpus.
+
+    Chunks are tracked by (source, text hash), each keeping a stable vector
+    id: only chunks whose text is new get embedded, and vectors of chunks
+    that disappeared (including whole deleted files) are removed.
+
+    With INGEST_WORKERS > 1 (0 = all cores) reading/chunking and embedding
+    run in a process pool; results merge back in file order, so the index is
+    the same as a serial build.
+
+    With CHUNK_MODE=spans each file is read whole and cut by the offset
+    chunker (`span_offsets`, optionally on sentence / paragraph boundaries);
+    the store keeps every document once and chunks as byte spans into it.
+
+    `progress`, if given, is called with a dict after every batch.
+    """
+    with _build_lock:
+        old_index, old = _load_previous()
+        workers = resolve_workers(settings.ingest_workers)
+        with contextlib.ExitStack() as stack:
+            pool = stack.enter_context(IngestPool(workers)) if workers > 1 else None
+            return _build(file_paths, progress, old_index, old, pool)
+
+
+def _build(file_paths, progress, old_index, old, pool):
+    reusable = old["reusable"] if old else {}
+    next_id = old["next_id"] if old else 0
+    encode = pool.embed if pool else embed
+
+    spans_mode = settings.chunk_mode == "spans"
+    if settings.chunk_mode not in ("words", "spans"):
+        raise ValueError(f"Unknown CHUNK_MODE {settings.chunk_mode!r} (expected words or spans)")
+
+    # Cheap pre-pass (no embedding) so we can pick the index type and report progress
+    if spans_mode:
+        # The offset chunker is vectorised; it runs here even with a pool (which still embeds)
+        total = sum(_count_spans(fp) for fp in file_paths)
+    elif pool:
+        total = pool.count_chunks(file_paths)
+    else:
+        total = sum(
+            count_chunks(sum(1 for _ in iter_file_words(fp)), settings.chunk_size, settings.chunk_overlap)
+            for fp in file_paths
+        )
+    if not total:
+        raise ValueError("No text found in the provided documents")
+
+    index_type = resolve_index_type(total)
+    in_place = old_index is not None and index_kind(old_index) == index_type and supports_remove(old_index)
+    # Otherwise (type changed, or HNSW which can't delete) rebuild, reusing the
+    # old index's stored vectors where it holds them exactly
+    builder = None if in_place else StreamingIndexBuilder(index_type, total)
+    can_reconstruct = old_index is not None and index_kind(old_index) != "ivf_pq"
+
+    writer = MetaWriter(settings.meta_path)
+    bm25 = BM25Builder()
+    done = added = est_tokens = 0
+    start = time.time()
+    if spans_mode:
+        corpus = _iter_span_corpus(file_paths, writer)
+    else:
+        corpus = pool.iter_corpus(file_paths) if pool else _iter_corpus(file_paths)
+    # Parallel mode embeds one shard per worker, so scale the batch with the pool
+    batch_size = settings.ingest_batch_size * (pool.workers if pool else 1)
+    try:
+        for batch in _batched(corpus, batch_size):
+            chunks = [item[1] for item in batch]
+            sources = [item[0] for item in batch]
+            spans = [item[2] for item in batch] if spans_mode else None
+            hashes = [_content_hash(c) for c in chunks]
+            ids = np.empty(len(batch), dtype="int64")
+            is_new = np.zeros(len(batch), dtype=bool)
+            for j, key in enumerate(zip(sources, hashes)):
+                if reusable.get(key):
+                    ids[j] = reusable[key].popleft()
+                else:
+                    ids[j] = next_id
+                    next_id += 1
+                    is_new[j] = True
+            added += int(is_new.sum())
+
+            if in_place:
+                if is_new.any():
+                    X = encode([c for c, n in zip(chunks, is_new) if n])
+                    faiss.normalize_L2(X)
+                    old_index.add_with_ids(X, ids[is_new])
+            else:
+                need = is_new if can_reconstruct else np.ones(len(batch), dtype=bool)
+                X = None
+                if need.any():
+                    X_new = encode([c for c, n in zip(chunks, need) if n])
+                    X = np.empty((len(batch), X_new.shape[1]), dtype="float32")
+                    X[need] = X_new
+                if not need.all():
+                    X_old = reconstruct_vectors(old_index, ids[~need])
+                    if X is None:
+                        X = np.empty((len(batch), X_old.shape[1]), dtype="float32")
+                    X[~need] = X_old
+                faiss.normalize_L2(X)
+                builder.add(X, ids)
+
+            writer.append(chunks, sources, ids.tolist(), hashes, spans=spans)
+            bm25.add(chunks)
+            done += len(batch)
+            est_tokens += sum(len(c.split()) for c in chunks)
+
+            info = {
+                "chunks_done": done,
+                "chunks_total": total,
+                "embedded": added,
+                "elapsed_ms": int((time.time() - start) * 1000),
+            }
+            log_event("ingest_progress", info)
+            if progress is not None:
+                progress(info)
+
+        # Whatever was not claimed by a current chunk is gone
+        removed_ids = [cid for ids_ in reusable.values() for cid in ids_]
+        if in_place:
+            index = old_index
+            if removed_ids:
+                index.remove_ids(np.asarray(removed_ids, dtype="int64"))
+        else:
+            index = builder.finish()
+
+        # Save index and metadata (write-then-rename so other workers never see a
+        # partial file). The manifest goes live first; the BM25 and FAISS files
+        # carry its build id, and readers only load a set whose ids all match.
+        os.makedirs(os.path.dirname(settings.index_path), exist_ok=True)
+        lexical = bm25.finish()
+        lexical.build_id = writer.build
+        lexical.save(bm25_path(settings.index_path) + ".tmp")
+        write_index(index, settings.index_path + ".tmp", writer.build)
+        manifest = writer.close(params=_index_params(), next_id=next_id)
+        os.replace(bm25_path(settings.index_path) + ".tmp", bm25_path(settings.index_path))
+        os.replace(settings.index_path + ".tmp", settings.index_path)
+    except BaseException:
+        writer.abort()
+        raise
+
+    # Hot-swap the resident index to what was just built, without reading it
+    # back; in-flight searches keep their old snapshot
+    try:
+        store = ChunkStore(settings.meta_path, manifest)
+    except FileNotFoundError:
+        # A concurrent build already replaced ours and removed its columns
+        index_store.reload(force=True)
+    else:
+        index_store.publish(index, store, lexical)
+
+    return IngestResult(
+        chunks=done,
+        est_tokens=est_tokens,
+        reused=done - added,
+        added=added,
+        removed=len(removed_ids),
+    )
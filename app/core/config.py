@@ -10,13 +10,85 @@ class Settings(BaseSettings):
 
     # Optional with defaults
     model_name: str = "gpt-4o-mini"
+    embedding_model: str = "all-MiniLM-L6-v2"
+    embedding_backend: str = "torch"  # torch | int8 (dynamic int8 torch) | onnx (ONNX Runtime)
+    embedding_model_dir: str = ""  # local model directory, no network (required for onnx)
+    embedding_onnx_file: str = "onnx/model.onnx"  # inside EMBEDDING_MODEL_DIR; a quantised export works too
+    embedding_batch_size: int = 32
+    embed_device: str = "auto"  # torch backend: auto (sentence-transformers picks cuda / mps / cpu) | cpu | cuda | cuda:N; int8 and onnx run on CPU
+    embed_fn: str = ""  # optional "module:function" replacing the embedding backend (offline benchmarks)
     chunk_size: int = 512
     chunk_overlap: int = 64
+    chunk_mode: str = "words"  # words (streamed word windows, chunk text stored) | spans (each document stored once, chunks are byte spans into it)
+    chunk_boundary: str = ""  # spans only: "" | sentence | paragraph, end chunks on one in the window's second half
     top_k: int = 5
+    hybrid_lexical_weight: float = 1.0  # scale of normalised BM25 scores vs cosine in the hybrid merge (0 = vector only)
+    context_token_budget: int = 0  # max prompt tokens of retrieved context (0 = no cap); drops are logged
+    ask_batch_max_questions: int = 256  # per /ask/batch call
+    ask_batch_concurrency: int = 8  # answers generated in parallel per /ask/batch call
     rate_limit_rpm: int = 60
+    rate_limit_backend: str = "memory"  # memory (per process) | sqlite (shared by all workers on the host)
+    rate_limit_sqlite_path: str = "./faiss_index/rate_limit.sqlite3"
+    rate_limit_busy_timeout_ms: float = 50.0  # sqlite: max wait for another worker's lock per check
+    rate_limit_fail_open: bool = True  # sqlite lock not acquired in time: allow the request (true) or 503 (false)
     docs_path: str = "./docs"
     index_path: str = "./faiss_index/index.faiss"
-    meta_path: str = "./faiss_index/index.pkl"
+    meta_path: str = "./faiss_index/index.meta.json"  # manifest of the mmap'd columnar chunk store
+    warmup_on_startup: bool = True  # preload model, index and tokenizer in the background; /ready waits for it
+    warmup_retry_s: float = 1.0  # first retry delay for failed warm-up steps, doubling (0 = no retries)
+    warmup_retry_max_s: float = 60.0
+    index_check_interval_s: float = 1.0  # how often to stat index files for hot-swap
+    ingest_batch_size: int = 256  # chunks embedded + written per batch (bounds ingest memory)
+    ingest_workers: int = 1  # >1 = process pool for chunking + embedding, 0 = all cores
+
+    # ANN index (auto | flat | ivf_flat | ivf_pq | hnsw)
+    index_type: str = "auto"
+    index_train_size: int = 100_000  # max vectors sampled for IVF/PQ training
+    ivf_nlist: int = 0  # 0 = ~4*sqrt(n_chunks)
+    ivf_nprobe: int = 8
+    ivf_max_nprobe: int = 1024  # largest per-request nprobe accepted by /ask (also capped at nlist)
+    pq_m: int = 0  # 0 = dim/8
+    hnsw_m: int = 32
+    hnsw_ef_construction: int = 200
+    hnsw_ef_search: int = 64
+    hnsw_max_ef_search: int = 1024  # largest per-request ef_search accepted by /ask
+
+    # Query embedding cache (0 disables)
+    embed_cache_size: int = 1024
+    embed_cache_ttl_s: float = 3600.0
+
+    # Micro-batching of concurrent query embeddings (window 0 disables waiting)
+    embed_batch_window_ms: float = 5.0
+    embed_batch_max_size: int = 32
+
+    # Optional cross-encoder rerank (empty model = off): rescore RERANK_CANDIDATES, keep TOP_K
+    rerank_model: str = ""  # e.g. cross-encoder/ms-marco-MiniLM-L-6-v2
+    rerank_fn: str = ""  # optional "module:function" scoring (query, passage) pairs instead (benchmarks)
+    rerank_candidates: int = 20
+    rerank_batch_size: int = 32
+    rerank_cache_size: int = 4096  # cached (query, chunk id) scores
+
+    # Semantic answer cache for /ask (0 disables); hits need cosine >= threshold
+    answer_cache_size: int = 512
+    answer_cache_threshold: float = 0.95
+    answer_cache_ttl_s: float = 3600.0
+
+    # SSE token coalescing: flush every N ms or M chars (both 0 = one frame per delta)
+    sse_coalesce_ms: float = 0.0
+    sse_coalesce_chars: int = 0
+
+    # Shared async OpenAI client (one keep-alive pool per event loop)
+    openai_base_url: str = ""  # e.g. http://127.0.0.1:9000/v1 for the local mock (bench/mock_openai.py); "" = api.openai.com
+    openai_max_connections: int = 100
+    openai_max_keepalive: int = 20
+    openai_timeout_s: float = 60.0
+    openai_connect_timeout_s: float = 5.0
+    openai_max_retries: int = 3  # retries on 429 / timeouts before the stream gives up
+
+    # Structured logs: enqueued by callers, written in batches by a background thread
+    log_queue_size: int = 10_000  # records buffered; beyond that new records are dropped (and counted)
+    log_batch_size: int = 256  # max records per write
+    log_sample_rates: dict[str, float] = {}  # event_type -> fraction kept, e.g. {"request_log": 0.1}
 
     model_config = SettingsConfigDict(
         env_file=".env",
@@ -0,0 +1,145 @@
+import re
+from functools import lru_cache
+
+from app.core.config import settings
+from app.core.logger import log_event
+
+
+@lru_cache(maxsize=16)
+def get_encoding(model: str):
+    """tiktoken encoding for `model`, loaded once (None if unavailable, e.g. offline)."""
+    import tiktoken
+
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        # Unknown model name: the current OpenAI chat models all use o200k/cl100k
+        try:
+            return tiktoken.get_encoding("o200k_base")
+        except Exception:
+            return None
+    except Exception:
+        return None
+
+
+def count_tokens(text: str, model: str = "gpt-3.5-turbo") -> int:
+    enc = get_encoding(model)
+    if enc is None:
+        return max(1, len(text) // 4)
+    return len(enc.encode(text))
+
+
+def _truncate(text: str, max_tokens: int, model: str) -> str:
+    enc = get_encoding(model)
+    if enc is None:
+        return text[: max_tokens * 4]
+    return enc.decode(enc.encode(text)[:max_tokens])
+
+
+def _overlap(prev_words, words, step: int) -> int:
+    """Words of `words` already covered by the window just before it (0 if not contiguous)."""
+    k = min(len(prev_words) - step, len(words))
+    if k > 0 and prev_words[-k:] == words[:k]:
+        return k
+    if settings.chunk_boundary:
+        # Boundary-snapped windows overlap by a varying number of words
+        for k in range(min(settings.chunk_overlap, len(prev_words) - 1, len(words)), 0, -1):
+            if prev_words[-k:] == words[:k]:
+                return k
+    return 0
+
+
+def _after_words(text: str, k: int) -> str:
+    """`text` from the end of its k-th word on, original whitespace included."""
+    if k <= 0:
+        return text
+    for i, m in enumerate(re.finditer(r"\S+", text), 1):
+        if i == k:
+            return text[m.end():]
+    return ""
+
+
+def pack_context(hits, budget_tokens: int = 0, model: str = "gpt-3.5-turbo"):
+    """
+    Turn retrieval hits into prompt passages.
+
+    `hits` are in score order and carry `chunk`, `source` and `row` (position
+    in the chunk store). Hits are admitted best-first while their new text
+    fits in `budget_tokens` (0 = unlimited); text a hit shares with an
+    already admitted neighbour (consecutive rows overlap by CHUNK_OVERLAP
+    words) is only paid for once. Admitted runs of consecutive rows from the
+    same source are then merged into one passage. Passages are returned in
+    order of their best hit, so [1] is still the most relevant source and
+    citations number the passages exactly as the prompt does.
+
+    A passage that was not merged is the hit's text exactly as stored (with
+    CHUNK_MODE=spans that keeps newlines, indentation and tables); a merged
+    one continues after the overlap with the next chunk's own text.
+    """
+    step = settings.chunk_size - settings.chunk_overlap
+    by_row = {h["row"]: h for h in hits if "row" in h}
+    words = {}
+    texts = {}
+    picked = {}  # row -> rank of the hit (score order)
+    used = dropped = 0
+    for rank, h in enumerate(hits):
+        row = h.get("row")
+        if row is None:
+            # No position information: cannot merge, keep as its own passage
+            row = ("nomerge", rank)
+        w = words.setdefault(row, h["chunk"].split())
+        texts.setdefault(row, h["chunk"])
+        # Only the part not already covered by admitted neighbours costs tokens
+        start, end = 0, len(w)
+        if isinstance(row, int):
+            prev, nxt = by_row.get(row - 1), by_row.get(row + 1)
+            if row - 1 in picked and prev["source"] == h["source"]:
+                start = _overlap(words[row - 1], w, step)
+            if row + 1 in picked and nxt["source"] == h["source"]:
+                end -= _overlap(w, words[row + 1], step)
+        cost = count_tokens(" ".join(w[start:end]), model) if start < end else 0
+        if budget_tokens and used + cost > budget_tokens:
+            if picked:
+                dropped += 1
+                continue
+            # Always keep the best hit, cut down to the budget
+            h = dict(h, chunk=_truncate(h["chunk"], budget_tokens, model))
+            w = words[row] = h["chunk"].split()
+            texts[row] = h["chunk"]
+            cost = budget_tokens
+        picked[row] = rank
+        if isinstance(row, int):
+            by_row[row] = h
+        used += cost
+
+    if dropped:
+        # Retrieved passages the prompt never sees: worth knowing when tuning the budget
+        log_event("context_budget", {"budget_tokens": budget_tokens, "kept": len(picked), "dropped": dropped})
+
+    # Merge runs of consecutive rows from the same source
+    passages = []
+    for row in sorted(picked, key=lambda r: (isinstance(r, tuple), r)):
+        h = by_row[row] if isinstance(row, int) else hits[row[1]]
+        last = passages[-1] if passages else None
+        if (
+            last is not None
+            and isinstance(row, int)
+            and last["_last_row"] == row - 1
+            and last["source"] == h["source"]
+        ):
+            k = _overlap(words[row - 1], words[row], step)
+            if k or settings.chunk_overlap == 0:
+                rest = _after_words(texts[row], k)
+                last["_text"] += rest if k else " " + rest
+                last["_last_row"] = row
+                last["_rank"] = min(last["_rank"], picked[row])
+                continue
+        passages.append({
+            "source": h["source"],
+            "_text": texts[row],
+            "_last_row": row,
+            "_rank": picked[row],
+        })
+
+    passages.sort(key=lambda p: p["_rank"])
+    return [{"chunk": p["_text"], "source": p["source"]} for p in passages]
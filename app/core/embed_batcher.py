@@ -0,0 +1,116 @@
+import asyncio
+import threading
+import weakref
+from bisect import bisect_left
+
+import numpy as np
+
+# Upper bounds for the batch-size / queue-depth histograms
+HIST_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+
+
+class _Histogram:
+    def __init__(self, buckets=HIST_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+
+    def as_dict(self):
+        labels = [f"<={b}" for b in self.buckets] + [f">{self.buckets[-1]}"]
+        return dict(zip(labels, self.counts))
+
+
+class _LoopQueue:
+    __slots__ = ("pending", "timer")
+
+    def __init__(self):
+        self.pending = []
+        self.timer = None
+
+
+class EmbeddingBatcher:
+    """
+    Coalesces concurrent query embeddings into one `encode` call.
+
+    The first query to arrive opens a window of `window_ms`; everything that
+    arrives before it closes (or until `max_batch` is reached) is encoded
+    together in a worker thread, and each caller's future gets its own row.
+    """
+
+    def __init__(self, encode_fn, window_ms: float = 5.0, max_batch: int = 32):
+        self.encode_fn = encode_fn
+        self.window_ms = window_ms
+        self.max_batch = max_batch
+        # One queue per event loop (several uvicorn loops / TestClient portals may coexist)
+        self._queues = weakref.WeakKeyDictionary()
+        self._tasks = set()
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.items = 0
+        self.batch_sizes = _Histogram()
+        self.queue_depths = _Histogram()
+
+    @property
+    def queue_depth(self) -> int:
+        return sum(len(q.pending) for q in list(self._queues.values()))
+
+    def _queue(self, loop) -> "_LoopQueue":
+        with self._lock:
+            q = self._queues.get(loop)
+            if q is None:
+                q = self._queues[loop] = _LoopQueue()
+            return q
+
+    async def embed(self, text: str) -> np.ndarray:
+        loop = asyncio.get_running_loop()
+        q = self._queue(loop)
+        fut = loop.create_future()
+        q.pending.append((text, fut))
+        self.queue_depths.observe(len(q.pending))
+
+        if len(q.pending) >= self.max_batch or self.window_ms <= 0:
+            self._flush(loop, q)
+        elif q.timer is None:
+            q.timer = loop.call_later(self.window_ms / 1000, self._flush, loop, q)
+        return await fut
+
+    def _flush(self, loop, q):
+        if q.timer is not None:
+            q.timer.cancel()
+            q.timer = None
+        # A full batch flushes immediately, so pending never exceeds max_batch
+        batch, q.pending = q.pending, []
+        if batch:
+            task = loop.create_task(self._run(loop, batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, loop, batch):
+        texts = [t for t, _ in batch]
+        with self._lock:
+            self.batches += 1
+            self.items += len(batch)
+            self.batch_sizes.observe(len(batch))
+        try:
+            # Model inference is CPU-bound; keep it off the event loop
+            vectors = await loop.run_in_executor(None, self.encode_fn, texts)
+        except Exception as e:
+            for _, fut in batch:
+                if not fut.done():
+                    fut.set_exception(e)
+            return
+        for i, (_, fut) in enumerate(batch):
+            if not fut.done():
+                fut.set_result(vectors[i : i + 1])
+
+    def stats(self) -> dict:
+        return {
+            "queue_depth": self.queue_depth,
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0,
+            "batch_size_hist": self.batch_sizes.as_dict(),
+            "queue_depth_hist": self.queue_depths.as_dict(),
+        }
@@ -0,0 +1,195 @@
+"""
+Embedding backends. All expose `encode(texts, normalize_embeddings=True)`
+returning float32 rows, like `SentenceTransformer.encode`, so callers do not
+care which one is configured (EMBEDDING_BACKEND).
+
+- torch: the sentence-transformers model as is, on EMBED_DEVICE (auto lets
+         sentence-transformers pick a GPU when there is one).
+- int8:  the same model with its Linear layers dynamically quantised to int8
+         (weights converted once at load, activations per batch); no extra
+         deps. Dynamic quantisation only has CPU kernels.
+- onnx:  ONNX Runtime on an exported model (EMBEDDING_ONNX_FILE inside
+         EMBEDDING_MODEL_DIR), tokenised with the model's own tokenizer and
+         pooled the way its sentence-transformers config says. Pointing
+         EMBEDDING_ONNX_FILE at a quantised export gives ONNX int8.
+         onnxruntime is optional: pip install -r requirements-onnx.txt.
+
+With EMBEDDING_MODEL_DIR set everything loads from that directory and never
+touches the network.
+"""
+import importlib
+import json
+import os
+import threading
+
+import numpy as np
+
+from app.core.config import settings
+
+BACKENDS = ("torch", "int8", "onnx")
+
+
+def _normalize(X: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(X, axis=1, keepdims=True)
+    return X / np.maximum(norms, 1e-12)
+
+
+class TorchBackend:
+    name = "torch"
+
+    def __init__(self, model_path: str, batch_size: int = 32, device: str = "auto"):
+        from sentence_transformers import SentenceTransformer
+
+        self.batch_size = batch_size
+        self.model = SentenceTransformer(model_path, device=None if device in ("", "auto") else device)
+
+    def encode(self, texts, normalize_embeddings: bool = True):
+        X = self.model.encode(
+            list(texts), batch_size=self.batch_size, normalize_embeddings=normalize_embeddings, convert_to_numpy=True
+        )
+        return np.asarray(X, dtype="float32")
+
+
+class Int8Backend(TorchBackend):
+    name = "int8"
+
+    def __init__(self, model_path: str, batch_size: int = 32, device: str = "auto"):
+        import torch
+
+        super().__init__(model_path, batch_size, device="cpu")  # quantised Linear layers are CPU-only
+        self.model = torch.ao.quantization.quantize_dynamic(self.model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+class OnnxBackend:
+    name = "onnx"
+
+    def __init__(self, model_dir: str, onnx_file: str = "onnx/model.onnx", batch_size: int = 32):
+        try:
+            import onnxruntime as ort
+        except ImportError as e:
+            raise ImportError(
+                "EMBEDDING_BACKEND=onnx needs onnxruntime, which is optional: pip install -r requirements-onnx.txt"
+            ) from e
+        from transformers import AutoTokenizer
+
+        path = onnx_file if os.path.isabs(onnx_file) else os.path.join(model_dir, onnx_file)
+        self.batch_size = batch_size
+        self.session = ort.InferenceSession(path, providers=["CPUExecutionProvider"])
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir, local_files_only=True)
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        self.output_names = [o.name for o in self.session.get_outputs()]
+        self.pooling, self.max_length = _st_config(model_dir, self.tokenizer)
+
+    def encode(self, texts, normalize_embeddings: bool = True):
+        texts = list(texts)
+        out = []
+        for i in range(0, len(texts), self.batch_size):
+            enc = self.tokenizer(
+                texts[i : i + self.batch_size],
+                padding=True,
+                truncation=True,
+                max_length=self.max_length,
+                return_tensors="np",
+            )
+            feed = {k: v.astype("int64") for k, v in enc.items() if k in self.input_names}
+            if "sentence_embedding" in self.output_names:
+                emb = self.session.run(["sentence_embedding"], feed)[0]
+            else:
+                hidden = self.session.run(self.output_names[:1], feed)[0]  # (batch, seq, dim) token states
+                if self.pooling == "cls":
+                    emb = hidden[:, 0]
+                else:
+                    mask = enc["attention_mask"][..., None].astype("float32")
+                    emb = (hidden * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+            out.append(np.asarray(emb, dtype="float32"))
+        if not out:
+            return np.empty((0, 0), dtype="float32")
+        X = np.vstack(out)
+        return _normalize(X) if normalize_embeddings else X
+
+
+def _st_config(model_dir: str, tokenizer):
+    """Pooling mode and max sequence length from a sentence-transformers model directory."""
+    pooling = "mean"
+    try:
+        with open(os.path.join(model_dir, "1_Pooling", "config.json"), encoding="utf-8") as f:
+            cfg = json.load(f)
+        if cfg.get("pooling_mode_cls_token"):
+            pooling = "cls"
+    except FileNotFoundError:
+        pass
+    max_length = min(getattr(tokenizer, "model_max_length", 512) or 512, 512)
+    try:
+        with open(os.path.join(model_dir, "sentence_bert_config.json"), encoding="utf-8") as f:
+            max_length = json.load(f).get("max_seq_length", max_length)
+    except FileNotFoundError:
+        pass
+    return pooling, max_length
+
+
+class FunctionBackend:
+    """EMBED_FN replacement encoder ("module:function", offline benchmarks and tests)."""
+
+    name = "fn"
+
+    def __init__(self, spec: str):
+        module, _, name = spec.partition(":")
+        self.fn = getattr(importlib.import_module(module), name)
+
+    def encode(self, texts, normalize_embeddings: bool = True):
+        # Must already return normalised float32 rows
+        return np.asarray(self.fn(list(texts)), dtype="float32")
+
+
+def create_backend(
+    backend: str,
+    model: str,
+    model_dir: str = "",
+    onnx_file: str = "onnx/model.onnx",
+    batch_size: int = 32,
+    device: str = "auto",
+):
+    path = model_dir or model
+    if backend == "torch":
+        return TorchBackend(path, batch_size, device)
+    if backend == "int8":
+        return Int8Backend(path, batch_size)
+    if backend == "onnx":
+        if not model_dir:
+            raise ValueError("EMBEDDING_BACKEND=onnx needs EMBEDDING_MODEL_DIR (a local model directory)")
+        return OnnxBackend(model_dir, onnx_file, batch_size)
+    raise ValueError(f"Unknown EMBEDDING_BACKEND {backend!r} (expected one of {', '.join(BACKENDS)})")
+
+
+_backends = {}
+_lock = threading.Lock()
+
+
+def get_backend():
+    """The configured backend, loaded once per configuration."""
+    key = (
+        settings.embed_fn,
+        settings.embedding_backend,
+        settings.embedding_model,
+        settings.embedding_model_dir,
+        settings.embedding_onnx_file,
+        settings.embed_device,
+    )
+    backend = _backends.get(key)
+    if backend is None:
+        with _lock:
+            backend = _backends.get(key)
+            if backend is None:
+                if settings.embed_fn:
+                    backend = FunctionBackend(settings.embed_fn)
+                else:
+                    backend = create_backend(
+                        settings.embedding_backend,
+                        settings.embedding_model,
+                        settings.embedding_model_dir,
+                        settings.embedding_onnx_file,
+                        settings.embedding_batch_size,
+                        settings.embed_device,
+                    )
+                _backends[key] = backend
+    return backend
@@ -0,0 +1,177 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from app.core.ann import read_index_build
+from app.core.bm25 import BM25Index, bm25_path
+from app.core.config import settings
+from app.core.lazy import lazy_import
+from app.core.meta_store import open_store, resolve_meta_path
+from app.core.metrics import registry
+
+faiss = lazy_import("faiss")
+
+# A build renames its manifest, BM25 and FAISS files within milliseconds; a
+# first load caught in between waits for the set to match
+LOAD_ATTEMPTS = 20
+LOAD_RETRY_S = 0.05
+
+
+@dataclass(frozen=True)
+class IndexSnapshot:
+    """One immutable, fully-loaded generation of the index + chunk metadata."""
+    index: faiss.Index
+    store: object  # meta_store.ChunkStore (mmap) or LegacyStore
+    bm25: BM25Index
+    generation: int
+    mtimes: tuple = field(default=(), compare=False)
+    loaded_at: float = field(default_factory=time.time, compare=False)
+
+    def __post_init__(self):
+        order = np.argsort(self.store.ids, kind="stable")
+        object.__setattr__(self, "_id_order", order)
+        object.__setattr__(self, "_sorted_ids", np.asarray(self.store.ids)[order])
+
+    def rows_for(self, labels) -> np.ndarray:
+        """Map FAISS result labels (stable ids) to metadata rows; -1 where unknown."""
+        labels = np.asarray(labels, dtype="int64")
+        if not len(self._sorted_ids):
+            return np.full(len(labels), -1, dtype="int64")
+        pos = np.minimum(np.searchsorted(self._sorted_ids, labels), len(self._sorted_ids) - 1)
+        rows = self._id_order[pos].astype("int64")
+        # An index and metadata from different builds must not map to the wrong chunk
+        rows[self._sorted_ids[pos] != labels] = -1
+        return rows
+
+
+def _load_matching(index_path, meta_path):
+    """
+    Index, chunk store and BM25 of one build, or None when the files on disk
+    belong to different builds (another process is publishing right now).
+    Untagged files from older builds are trusted as before.
+    """
+    build = read_index_build(index_path)
+    store = open_store(meta_path)
+    expected = store.manifest.get("build")
+    if build is not None and build != expected:
+        return None
+    index = faiss.read_index(index_path)
+    if read_index_build(index_path) != build:
+        return None  # replaced while we were reading it
+    try:
+        bm25 = BM25Index.load(bm25_path(index_path))
+    except FileNotFoundError:
+        # Index built before BM25 was persisted; build it in memory once
+        bm25 = BM25Index.build(store.texts())
+    if bm25.build_id is not None and bm25.build_id != expected:
+        return None
+    return index, store, bm25
+
+
+def _file_mtimes(*paths):
+    try:
+        return tuple(os.stat(p).st_mtime_ns for p in paths)
+    except FileNotFoundError:
+        return None
+
+
+class IndexStore:
+    """
+    Process-wide holder for the FAISS index and its metadata.
+
+    The index is loaded once and kept resident. Readers grab the current
+    snapshot with `get()` and keep using it for the whole search, so a
+    hot-swap (after `build_index` or when the files change on disk) never
+    pulls the index out from under an in-flight request.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._generation = 0
+        self._last_check = 0.0
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    @property
+    def current(self):
+        """The loaded snapshot, or None; never triggers a load."""
+        return self._snapshot
+
+    def _paths(self):
+        return settings.index_path, resolve_meta_path(settings.meta_path, settings.index_path)
+
+    def _stale(self, snap: IndexSnapshot) -> bool:
+        now = time.monotonic()
+        if now - self._last_check < settings.index_check_interval_s:
+            return False
+        self._last_check = now
+        current = _file_mtimes(*self._paths())
+        return current is not None and current != snap.mtimes
+
+    def get(self) -> IndexSnapshot:
+        snap = self._snapshot
+        if snap is None or self._stale(snap):
+            return self.reload()
+        return snap
+
+    def reload(self, force: bool = False) -> IndexSnapshot:
+        index_path, meta_path = self._paths()
+        with self._lock:
+            mtimes = _file_mtimes(index_path, meta_path)
+            # Another thread may already have loaded this exact version
+            if not force and self._snapshot is not None and mtimes == self._snapshot.mtimes:
+                return self._snapshot
+            for _ in range(LOAD_ATTEMPTS):
+                loaded = _load_matching(index_path, meta_path)
+                if loaded is not None:
+                    return self._swap(*loaded, mtimes)
+                if self._snapshot is not None and not force:
+                    # Keep serving the current build; the next check looks again
+                    return self._snapshot
+                time.sleep(LOAD_RETRY_S)
+            raise RuntimeError(f"{index_path} and {meta_path} belong to different builds")
+
+    def publish(self, index, store, bm25) -> IndexSnapshot:
+        """Swap in an index that was just built in this process (no re-read)."""
+        with self._lock:
+            mtimes = _file_mtimes(*self._paths())
+            return self._swap(index, store, bm25, mtimes)
+
+    def _swap(self, index, store, bm25, mtimes) -> IndexSnapshot:
+        self._generation += 1
+        snap = IndexSnapshot(
+            index=index,
+            store=store,
+            bm25=bm25,
+            generation=self._generation,
+            mtimes=mtimes or (),
+        )
+        self._snapshot = snap
+        self._last_check = time.monotonic()
+        return snap
+
+    def clear(self):
+        with self._lock:
+            self._snapshot = None
+
+
+index_store = IndexStore()
+
+
+def _index_size():
+    snap = index_store.current
+    if snap is None:
+        return {("vectors",): 0, ("chunks",): 0}
+    return {("vectors",): snap.index.ntotal, ("chunks",): len(snap.store)}
+
+
+registry.gauge("minirag_index_size", "Resident index size", ["unit"], fn=_index_size)
+registry.gauge("minirag_index_generation", "Generation of the resident index", fn=lambda: index_store.generation)
@@ -0,0 +1,34 @@
+import importlib
+
+
+class LazyModule:
+    """
+    Stand-in for a heavy module that imports it on first attribute access.
+
+    `faiss = lazy_import("faiss")` at the top of a module keeps the usual
+    `faiss.read_index(...)` call sites while `import app.main` stays cheap.
+    The real import goes through `importlib.import_module`, whose per-module
+    import lock makes a concurrent first use from several threads safe.
+    """
+
+    __slots__ = ("_name", "_module")
+
+    def __init__(self, name: str):
+        self._name = name
+        self._module = None
+
+    def _load(self):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __repr__(self):
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<lazy module {self._name!r} ({state})>"
+
+
+def lazy_import(name: str) -> LazyModule:
+    return LazyModule(name)
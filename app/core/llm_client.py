@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+import weakref
+
+from app.core.config import settings
+from app.core.lazy import lazy_import
+
+# The SDK alone takes ~0.5 s to import; loaded with the first client
+httpx = lazy_import("httpx")
+openai = lazy_import("openai")
+
+# Optional httpx transport for every client built from here on (load tests
+# point this at a stubbed upstream; None = real network)
+transport = None
+
+# One pooled client per event loop: httpx connections belong to the loop that
+# opened them, and uvicorn workers / TestClient portals each run their own
+_clients = weakref.WeakKeyDictionary()
+_lock = threading.Lock()
+
+
+def _make_client() -> openai.AsyncOpenAI:
+    http_client = httpx.AsyncClient(
+        transport=transport,
+        limits=httpx.Limits(
+            max_connections=settings.openai_max_connections,
+            max_keepalive_connections=settings.openai_max_keepalive,
+            keepalive_expiry=30.0,
+        ),
+        timeout=httpx.Timeout(settings.openai_timeout_s, connect=settings.openai_connect_timeout_s),
+    )
+    return openai.AsyncOpenAI(
+        api_key=settings.openai_api_key,
+        base_url=settings.openai_base_url or None,
+        http_client=http_client,
+        # Retries/backoff are handled by the caller so they can be reported in the stream
+        max_retries=0,
+    )
+
+
+def get_openai_client(api_key: str | None = None) -> openai.AsyncOpenAI:
+    """Shared AsyncOpenAI client for the running loop (keep-alive connection pool)."""
+    loop = asyncio.get_running_loop()
+    with _lock:
+        client = _clients.get(loop)
+        if client is None:
+            client = _clients[loop] = _make_client()
+    if api_key and api_key != client.api_key:
+        # Copy shares the same httpx pool
+        client = client.with_options(api_key=api_key)
+    return client
+
+
+async def close_openai_client():
+    """Close the running loop's client (app shutdown)."""
+    with _lock:
+        client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.close()
@@ -1,10 +1,127 @@
-import json
+import atexit
+import os
+import queue
+import random
+import sys
+import threading
 import uuid
-import time
-from fastapi import Request
 
-def log_event(event_type, data):
-    print(json.dumps({"event_type": event_type, **data}, ensure_ascii=False))
+from app.core.config import settings
+from app.core.metrics import registry
+from app.core.streaming import dumps
+
+
+class BatchLogger:
+    """
+    Structured JSON-lines logger that never blocks the caller.
+
+    `emit` only puts the record on a bounded queue; a background thread
+    serialises whatever has queued up (up to `batch_size` records) and writes
+    it with a single `write`. When the queue is full the record is dropped
+    and counted instead of waiting on a slow stdout. Records of event types
+    in `sample_rates` are kept with that probability (`force=True` bypasses
+    sampling, e.g. for errors).
+    """
+
+    def __init__(self, stream=None, maxsize: int = 10_000, batch_size: int = 256, sample_rates=None):
+        self.stream = stream  # None = sys.stdout at write time
+        self.batch_size = max(1, batch_size)
+        self.sample_rates = dict(sample_rates or {})
+        self._queue = queue.Queue(maxsize)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self.written = 0
+        self.dropped = 0
+        self.sampled_out = 0
+
+    def _ensure_thread(self):
+        # Started lazily, and again in a forked worker (threads do not survive fork)
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+                self._thread.start()
+
+    def emit(self, record: dict, force: bool = False) -> bool:
+        """Queue `record` (not to be mutated afterwards); False if sampled out or dropped."""
+        if not force:
+            rate = self.sample_rates.get(record.get("event_type"))
+            if rate is not None and random.random() >= rate:
+                self.sampled_out += 1
+                return False
+        self._ensure_thread()
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            return False
+        return True
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            lines = []
+            markers = []  # flush() waiters, released once everything before them is written
+            for item in batch:
+                if isinstance(item, threading.Event):
+                    markers.append(item)
+                else:
+                    try:
+                        lines.append(dumps(item))
+                    except Exception:
+                        lines.append(dumps({"event_type": "log_error", "repr": repr(item)[:500]}))
+            if lines:
+                try:
+                    stream = self.stream or sys.stdout
+                    stream.write("\n".join(lines) + "\n")
+                    stream.flush()
+                except Exception:
+                    pass
+                self.written += len(lines)
+            for m in markers:
+                m.set()
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Wait until everything queued so far is written. True if it was in time."""
+        if self._thread is None or self._pid != os.getpid():
+            return True
+        done = threading.Event()
+        try:
+            self._queue.put(done, timeout=timeout)
+        except queue.Full:
+            return False
+        return done.wait(timeout)
+
+    def stats(self) -> dict:
+        return {
+            "queued": self._queue.qsize(),
+            "written": self.written,
+            "dropped": self.dropped,
+            "sampled_out": self.sampled_out,
+        }
+
+
+logger = BatchLogger(
+    maxsize=settings.log_queue_size,
+    batch_size=settings.log_batch_size,
+    sample_rates=settings.log_sample_rates,
+)
+# Daemon thread: make sure queued records reach stdout before the interpreter exits
+atexit.register(logger.flush)
+
+registry.counter("minirag_log_dropped_total", "Log records dropped because the queue was full", fn=lambda: logger.dropped)
+
+
+def log_event(event_type, data, force: bool = False):
+    logger.emit({"event_type": event_type, **data}, force=force)
 
 def make_request_id():
     return str(uuid.uuid4())
@@ -21,4 +138,5 @@ def log_request(request_id, route, status, tokens=None, cost=None, latency=None)
         entry["cost_usd"] = cost
     if latency is not None:
         entry["latency_ms"] = latency
-    log_event("request_log", entry)
+    # Failures are always logged, whatever the sample rate
+    log_event("request_log", entry, force=status not in ("ok", 200))
@@ -0,0 +1,267 @@
+import glob
+import json
+import mmap
+import os
+import pickle
+import re
+import uuid
+
+import numpy as np
+
+# Chunk metadata is a small JSON manifest (META_PATH) pointing at one build's
+# columnar files next to it:
+#
+#   <base>.<build>.text     UTF-8 bytes: each chunk's text, or (CHUNK_MODE=spans)
+#                           each document's text once
+#   <base>.<build>.spans    int64[n, 2] (start, end) byte offsets into .text
+#   <base>.<build>.src      int32[n] index into the manifest's "sources" table
+#   <base>.<build>.ids      int64[n] stable FAISS vector id
+#   <base>.<build>.hashes   V20[n]   sha1 of the chunk text (raw bytes)
+#
+# Readers mmap the columns, so lookups are zero-copy, pages are shared between
+# worker processes, and only the chunks a query returns are decoded. Each
+# build writes new files and then atomically replaces the manifest, so a
+# reader never sees a half-written build; old files are unlinked afterwards
+# (processes that still map them keep a valid view until they swap).
+#
+# Chunks are slices of .text, so overlapping chunks of a stored document share
+# bytes instead of repeating them. "columnar-v1" builds (an `offsets` column of
+# n+1 chunk boundaries) and the original pickle formats (one dict, or pickle
+# frames) are still readable.
+
+FORMAT = "columnar-v2"
+COLUMNS = {"spans": "<i8", "src": "<i4", "ids": "<i8", "hashes": "V20"}
+
+
+def _base(path: str) -> str:
+    return os.path.splitext(path)[0]
+
+
+def _column_path(path: str, build: str, name: str) -> str:
+    return f"{_base(path)}.{build}.{name}"
+
+
+class MetaWriter:
+    """Append-only columnar writer; the build only becomes visible on `close()`."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.build = uuid.uuid4().hex[:12]
+        self.rows = 0
+        self._offset = 0
+        self._sources = {}
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._files = {
+            name: open(_column_path(path, self.build, name), "wb")
+            for name in ("text", *COLUMNS)
+        }
+
+    def add_document(self, text: str) -> int:
+        """Store a whole document once; returns its byte offset for `append(spans=...)`."""
+        data = text.encode("utf-8")
+        self._files["text"].write(data)
+        self._offset += len(data)
+        return self._offset - len(data)
+
+    def append(self, chunks, sources, ids, hashes, spans=None):
+        """
+        Add rows. Without `spans` each chunk's text is written out; with them
+        (absolute (start, end) byte offsets into documents from `add_document`)
+        only the offsets are.
+        """
+        if spans is None:
+            encoded = [c.encode("utf-8") for c in chunks]
+            lengths = np.array([len(b) for b in encoded], dtype="<i8")
+            ends = self._offset + np.cumsum(lengths)
+            spans = np.stack([ends - lengths, ends], axis=1)
+            self._files["text"].write(b"".join(encoded))
+            self._offset += int(lengths.sum())
+        self._files["spans"].write(np.asarray(spans, dtype="<i8").reshape(-1, 2).tobytes())
+        src = [self._sources.setdefault(s, len(self._sources)) for s in sources]
+        self._files["src"].write(np.asarray(src, dtype="<i4").tobytes())
+        self._files["ids"].write(np.asarray(ids, dtype="<i8").tobytes())
+        self._files["hashes"].write(b"".join(bytes.fromhex(h) for h in hashes))
+        self.rows += len(chunks)
+
+    def _close_files(self):
+        for f in self._files.values():
+            f.close()
+
+    def close(self, **manifest) -> dict:
+        """Publish the build (atomically replace the manifest); returns the manifest."""
+        self._close_files()
+        doc = {
+            "format": FORMAT,
+            "build": self.build,
+            "rows": self.rows,
+            "sources": list(self._sources),
+            **manifest,
+        }
+        with open(self.path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(doc, f)
+        os.replace(self.path + ".tmp", self.path)
+        self._remove_other_builds()
+        return doc
+
+    def abort(self):
+        self._close_files()
+        for name in self._files:
+            _unlink(_column_path(self.path, self.build, name))
+
+    def _remove_other_builds(self):
+        pattern = re.compile(re.escape(_base(self.path)) + r"\.([0-9a-f]{12})\.(text|spans|offsets|src|ids|hashes)$")
+        for fp in glob.glob(_base(self.path) + ".*.*"):
+            m = pattern.match(fp)
+            if m and m.group(1) != self.build:
+                _unlink(fp)
+
+
+def _unlink(fp):
+    try:
+        os.remove(fp)
+    except OSError:
+        # Already gone, or still mapped on a platform that forbids unlinking it
+        pass
+
+
+def _map_column(fp: str, dtype: str) -> np.ndarray:
+    if os.path.getsize(fp) == 0:
+        return np.empty(0, dtype=dtype)
+    return np.memmap(fp, dtype=dtype, mode="r")
+
+
+class ChunkStore:
+    """Read-only, mmap-backed view of one columnar build."""
+
+    has_ids = True
+
+    def __init__(self, path: str, manifest: dict):
+        self.manifest = manifest
+        self.source_names = manifest["sources"]
+        build = manifest["build"]
+        columns = dict(COLUMNS)
+        if manifest.get("format") == "columnar-v1":
+            del columns["spans"]
+        for name, dtype in columns.items():
+            setattr(self, name, _map_column(_column_path(path, build, name), dtype))
+        if "spans" in columns:
+            self.spans = self.spans.reshape(-1, 2)
+            self.starts, self.ends = self.spans[:, 0], self.spans[:, 1]
+        else:
+            offsets = _map_column(_column_path(path, build, "offsets"), "<i8")
+            self.starts, self.ends = offsets[:-1], offsets[1:]
+        with open(_column_path(path, build, "text"), "rb") as f:
+            self._text = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if os.fstat(f.fileno()).st_size else b""
+
+    def __len__(self):
+        return len(self.ids)
+
+    def chunk(self, i: int) -> str:
+        return self._text[self.starts[i]:self.ends[i]].decode("utf-8")
+
+    def source(self, i: int) -> str:
+        return self.source_names[self.src[i]]
+
+    def texts(self):
+        for i in range(len(self)):
+            yield self.chunk(i)
+
+    def keys(self):
+        """Yield (source, chunk sha1 hex, id) per row without decoding any text."""
+        names = self.source_names
+        for s, h, cid in zip(self.src.tolist(), self.hashes.tolist(), self.ids.tolist()):
+            yield names[s], h.hex(), cid
+
+
+class LegacyStore:
+    """Same interface over the in-memory pickle formats."""
+
+    def __init__(self, meta: dict):
+        self.manifest = {k: v for k, v in meta.items() if k not in ("chunks", "sources", "ids", "hashes")}
+        self._chunks = meta["chunks"]
+        self._sources = meta["sources"]
+        self._hashes = meta.get("hashes")
+        ids = meta.get("ids")
+        self.ids = np.asarray(ids if ids is not None else range(len(self._chunks)), dtype="int64")
+        self.has_ids = ids is not None
+
+    def __len__(self):
+        return len(self._chunks)
+
+    def chunk(self, i: int) -> str:
+        return self._chunks[i]
+
+    def source(self, i: int) -> str:
+        return self._sources[i]
+
+    def texts(self):
+        return iter(self._chunks)
+
+    def keys(self):
+        return zip(self._sources, self._hashes, self.ids.tolist())
+
+
+def _iter_pickle_frames(path: str):
+    with open(path, "rb") as f:
+        while True:
+            try:
+                yield pickle.load(f)
+            except EOFError:
+                return
+
+
+def _read_pickle_meta(path: str) -> dict:
+    meta = {k: [] for k in ("chunks", "sources", "ids", "hashes")}
+    for frame in _iter_pickle_frames(path):
+        if "rows" in frame:
+            for k in meta:
+                meta[k].extend(frame["rows"][k])
+        elif "manifest" in frame:
+            meta.update(frame["manifest"])
+        else:
+            # Original single-dict format
+            return frame
+    return meta
+
+
+def resolve_meta_path(meta_path: str, index_path: str) -> str:
+    """
+    META_PATH, or the pickle metadata (`index.pkl`) next to INDEX_PATH when no
+    manifest has been written yet, so indexes built before the columnar store
+    keep serving until the next ingest writes one.
+    """
+    if os.path.exists(meta_path):
+        return meta_path
+    legacy = _base(index_path) + ".pkl"
+    return legacy if os.path.exists(legacy) else meta_path
+
+
+def open_store(path: str):
+    with open(path, "rb") as f:
+        head = f.read(1)
+    if head != b"{":
+        return LegacyStore(_read_pickle_meta(path))
+    for attempt in range(2):
+        with open(path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        try:
+            return ChunkStore(path, manifest)
+        except FileNotFoundError:
+            # A newer build replaced the manifest and cleaned up between our two reads
+            if attempt:
+                raise
+
+
+def read_meta(path: str) -> dict:
+    """Materialise all metadata as plain lists (tools and tests; not the hot path)."""
+    store = open_store(path)
+    if isinstance(store, LegacyStore) and not store.has_ids:
+        return {"chunks": store._chunks, "sources": store._sources, **store.manifest}
+    keys = list(store.keys())
+    return {
+        "chunks": list(store.texts()),
+        "sources": [k[0] for k in keys],
+        "hashes": [k[1] for k in keys],
+        "ids": [k[2] for k in keys],
+        **store.manifest,
+    }
@@ -0,0 +1,253 @@
+"""
+In-process metrics registry, exposed at /metrics in the Prometheus text format.
+
+Recording is a lock-protected add on a preallocated slot (well under a
+microsecond); label children are created once and reused. Values that other
+components already track (cache hit counts, index size) are read at scrape
+time through callbacks instead of being counted twice on the hot path.
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# Seconds; covers sub-millisecond cache hits up to long generations
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _fmt(value) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _label_str(names, values, extra=()) -> str:
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class _Value:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1.0):
+        with self._lock:
+            self.value -= amount
+
+    def set(self, value: float):
+        self.value = float(value)
+
+    @contextmanager
+    def track_inprogress(self):
+        self.inc()
+        try:
+            yield
+        finally:
+            self.dec()
+
+
+class _HistogramValue:
+    __slots__ = ("buckets", "counts", "sum", "_lock")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+
+    @contextmanager
+    def time(self):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+
+class _Metric:
+    type = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames=(), fn=None):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        # Optional callback sampled at scrape time: a number, or {label values: number}
+        self.fn = fn
+        self._children = {}
+        self._lock = threading.Lock()
+        self._child = self.labels() if not self.labelnames and fn is None else None
+
+    def _new(self):
+        return _Value()
+
+    def labels(self, *values):
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            with self._lock:
+                child = self._children.setdefault(key, self._new())
+        return child
+
+    def _default(self):
+        return self._child or self.labels()
+
+    def samples(self):
+        """(label values, value) pairs."""
+        if self.fn is not None:
+            value = self.fn()
+            if isinstance(value, dict):
+                return [(k if isinstance(k, tuple) else (k,), v) for k, v in value.items()]
+            return [((), value)]
+        return [(k, c.value) for k, c in list(self._children.items())]
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+        for values, value in self.samples():
+            lines.append(f"{self.name}{_label_str(self.labelnames, values)} {_fmt(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def inc(self, amount: float = 1.0):
+        self._default().inc(amount)
+
+
+class Gauge(_Metric):
+    type = "gauge"
+
+    def inc(self, amount: float = 1.0):
+        self._default().inc(amount)
+
+    def dec(self, amount: float = 1.0):
+        self._default().dec(amount)
+
+    def set(self, value: float):
+        self._default().set(value)
+
+    def track_inprogress(self):
+        return self._default().track_inprogress()
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, help, labelnames)
+
+    def _new(self):
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value: float):
+        self._default().observe(value)
+
+    def time(self):
+        return self._default().time()
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+        for values, child in list(self._children.items()):
+            with child._lock:
+                counts = list(child.counts)
+                total = child.sum
+            cumulative = 0
+            for le, n in zip(self.buckets + (float("inf"),), counts):
+                cumulative += n
+                labels = _label_str(self.labelnames, values, [("le", _fmt(le))])
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _label_str(self.labelnames, values)
+            lines.append(f"{self.name}_sum{labels} {_fmt(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Duplicate metric {metric.name}")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, help, labelnames=(), fn=None) -> Counter:
+        return self.register(Counter(name, help, labelnames, fn))
+
+    def gauge(self, name, help, labelnames=(), fn=None) -> Gauge:
+        return self.register(Gauge(name, help, labelnames, fn))
+
+    def histogram(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, help, labelnames, buckets))
+
+    def render(self) -> str:
+        lines = []
+        for metric in list(self._metrics.values()):
+            try:
+                lines.extend(metric.render())
+            except Exception:
+                # A failing callback must not take the whole scrape down
+                continue
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+# Per-stage latencies (seconds)
+EMBED_SECONDS = registry.histogram("minirag_embed_seconds", "Query embedding time (cache hits included)")
+FAISS_SECONDS = registry.histogram("minirag_faiss_search_seconds", "FAISS search time per (batched) search call")
+LEXICAL_SECONDS = registry.histogram("minirag_lexical_seconds", "BM25 scoring time per query")
+RERANK_SECONDS = registry.histogram("minirag_rerank_seconds", "Cross-encoder rerank time per (batched) call")
+CONTEXT_PACK_SECONDS = registry.histogram("minirag_context_pack_seconds", "Context packing time per question")
+PROMPT_BUILD_SECONDS = registry.histogram(
+    "minirag_prompt_build_seconds", "Prompt assembly and token estimate time per question"
+)
+TTFT_SECONDS = registry.histogram(
+    "minirag_upstream_ttft_seconds", "Time from opening the upstream request to its first token (retries included)"
+)
+STREAM_SECONDS = registry.histogram("minirag_stream_seconds", "Total upstream stream time per answer")
+
+# Events
+BUDGET_ABORTS = registry.counter(
+    "minirag_budget_aborts_total", "Answers stopped by the budget guard", ["stage"]
+)
+UPSTREAM_RETRIES = registry.counter("minirag_upstream_retries_total", "Upstream request retries", ["reason"])
+RATE_LIMITED = registry.counter(
+    "minirag_rate_limited_total", "429 responses: rejected by our limiter or received from upstream", ["source"]
+)
+INFLIGHT_STREAMS = registry.gauge("minirag_inflight_streams", "Answers currently being generated")
+
+# Known label values start at 0 so rate() works from the first scrape
+for _stage in ("prompt", "stream"):
+    BUDGET_ABORTS.labels(_stage)
+for _reason in ("429", "timeout"):
+    UPSTREAM_RETRIES.labels(_reason)
+for _source in ("rate_limiter", "upstream"):
+    RATE_LIMITED.labels(_source)
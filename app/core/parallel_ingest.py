@@ -0,0 +1,133 @@
+import multiprocessing as mp
+import os
+import pickle
+import shutil
+import tempfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from app.core.config import settings
+
+
+def resolve_workers(n: int) -> int:
+    # 0 = one worker per CPU core
+    return max(1, n if n > 0 else (os.cpu_count() or 1))
+
+
+# --- worker-side functions (run in spawned processes) ---
+
+def _init_worker(overrides: dict, threads: int):
+    # Keep each worker's BLAS/torch pool small so N workers don't oversubscribe the cores
+    for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        os.environ[var] = str(threads)
+    for k, v in overrides.items():
+        setattr(settings, k, v)
+
+
+def _count_file(fp):
+    from app.core.chunk_manager import count_chunks, iter_file_words
+
+    n_words = sum(1 for _ in iter_file_words(fp))
+    return count_chunks(n_words, settings.chunk_size, settings.chunk_overlap)
+
+
+def _chunk_file(task):
+    """Chunk one file into a spill file of pickled batches (never the whole file in memory)."""
+    from app.core.chunk_manager import iter_chunks, iter_file_words
+
+    fp, spill_dir = task
+    fd, spill = tempfile.mkstemp(dir=spill_dir, suffix=".chunks")
+    with os.fdopen(fd, "wb") as f:
+        batch = []
+        for chunk in iter_chunks(iter_file_words(fp), settings.chunk_size, settings.chunk_overlap):
+            batch.append(chunk)
+            if len(batch) >= settings.ingest_batch_size:
+                pickle.dump(batch, f, protocol=pickle.HIGHEST_PROTOCOL)
+                batch = []
+        if batch:
+            pickle.dump(batch, f, protocol=pickle.HIGHEST_PROTOCOL)
+    return os.path.basename(fp), spill
+
+
+def _read_spill(spill):
+    with open(spill, "rb") as f:
+        while True:
+            try:
+                yield pickle.load(f)
+            except EOFError:
+                return
+
+
+def _embed_shard(texts):
+    from app.core.chunk_manager import embed
+
+    return embed(texts)
+
+
+# --- parent side ---
+
+class IngestPool:
+    """
+    Process pool for parallel ingestion: files are read and chunked in
+    workers, and each embedding batch is split into one contiguous shard per
+    worker (each worker loads its own model once). Results are always merged
+    back in input order, so the index is identical to a serial build.
+
+    A worker writes a file's chunks to a temporary spill file in batches of
+    INGEST_BATCH_SIZE, and the parent reads them back one batch at a time, so
+    a single large file costs neither side more than a batch of memory.
+    """
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self._spill_dir = tempfile.mkdtemp(prefix="minirag-ingest-")
+        threads = max(1, (os.cpu_count() or 1) // workers)
+        self._executor = ProcessPoolExecutor(
+            max_workers=workers,
+            # spawn: never fork a parent that may already hold torch/OpenMP threads
+            mp_context=mp.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(settings.model_dump(), threads),
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        # Spill files of files that were never read back (an aborted build)
+        shutil.rmtree(self._spill_dir, ignore_errors=True)
+
+    def _imap(self, fn, items, inflight: int):
+        """Ordered map with at most `inflight` pending tasks (bounded memory)."""
+        pending = deque()
+        for item in items:
+            pending.append(self._executor.submit(fn, item))
+            if len(pending) >= inflight:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+    def count_chunks(self, file_paths) -> int:
+        return sum(self._imap(_count_file, file_paths, 4 * self.workers))
+
+    def iter_corpus(self, file_paths):
+        """Yield (source, chunk) in file order."""
+        tasks = ((fp, self._spill_dir) for fp in file_paths)
+        for src, spill in self._imap(_chunk_file, tasks, 2 * self.workers):
+            try:
+                for batch in _read_spill(spill):
+                    for chunk in batch:
+                        yield src, chunk
+            finally:
+                os.remove(spill)
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        size = -(-len(texts) // self.workers)
+        shards = [texts[i:i + size] for i in range(0, len(texts), size)]
+        return np.concatenate(list(self._executor.map(_embed_shard, shards)))
@@ -1,19 +1,164 @@
+import math
+import os
+import sqlite3
+import threading
 import time
 from fastapi import HTTPException, status
+from starlette.concurrency import run_in_threadpool
 
-# Simple in-memory: {api_key: [timestamps]}
-rate_limits = {}
+from app.core.config import settings
+from app.core.metrics import RATE_LIMITED
 
-def rate_limiter(api_key: str, limit_per_minute: int = 60):
-    now = time.time()
-    window = 60  # seconds
-    times = rate_limits.get(api_key, [])
-    # Filter out timestamps older than window
-    times = [t for t in times if now - t < window]
-    if len(times) >= limit_per_minute:
+# Token bucket per key: holds up to `limit_per_minute` tokens, refills at
+# limit/60 per second, each request takes one (a batch takes one per
+# question, all or nothing). State is two numbers per key, and every check is
+# O(1) whichever backend holds it.
+
+
+def _take(tokens: float, ts: float, rate: float, capacity: float, now: float, cost: float = 1.0):
+    tokens = min(capacity, tokens + max(0.0, now - ts) * rate)
+    if tokens >= cost:
+        return tokens - cost, True
+    return tokens, False
+
+
+class MemoryBackend:
+    """Per-process buckets (each uvicorn worker enforces its own limit)."""
+
+    def __init__(self):
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def take(self, key: str, rate: float, capacity: float, now: float, cost: float = 1.0):
+        with self._lock:
+            tokens, ts = self._buckets.get(key, (capacity, now))
+            tokens, allowed = _take(tokens, ts, rate, capacity, now, cost)
+            self._buckets[key] = (tokens, now)
+        return allowed, tokens
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+class SQLiteBackend:
+    """
+    Buckets in a SQLite file shared by every worker process on the host.
+    Each check is one short write transaction, so concurrent workers are
+    serialised by SQLite's lock and together enforce a single limit. A check
+    waits at most `busy_timeout_s` for the lock and then raises
+    sqlite3.OperationalError.
+    """
+
+    def __init__(self, path: str, busy_timeout_s: float = 5.0):
+        self.path = path
+        self.busy_timeout_s = busy_timeout_s
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        # One-off setup may wait longer than a per-request check
+        conn = sqlite3.connect(path, timeout=5.0, isolation_level=None)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS buckets (key TEXT PRIMARY KEY, tokens REAL NOT NULL, ts REAL NOT NULL)"
+            )
+        finally:
+            conn.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout_s, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def take(self, key: str, rate: float, capacity: float, now: float, cost: float = 1.0):
+        conn = self._connect()
+        # IMMEDIATE takes the write lock up front: read-modify-write is atomic across processes
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT tokens, ts FROM buckets WHERE key = ?", (key,)).fetchone()
+            tokens, ts = row if row else (capacity, now)
+            tokens, allowed = _take(tokens, ts, rate, capacity, now, cost)
+            conn.execute(
+                "INSERT INTO buckets (key, tokens, ts) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET tokens = excluded.tokens, ts = excluded.ts",
+                (key, tokens, now),
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return allowed, tokens
+
+    def clear(self):
+        self._connect().execute("DELETE FROM buckets")
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            if settings.rate_limit_backend == "sqlite":
+                _backend = SQLiteBackend(
+                    settings.rate_limit_sqlite_path, settings.rate_limit_busy_timeout_ms / 1000
+                )
+            elif settings.rate_limit_backend == "memory":
+                _backend = MemoryBackend()
+            else:
+                raise ValueError(f"Unknown RATE_LIMIT_BACKEND {settings.rate_limit_backend!r}")
+        return _backend
+
+
+def rate_limiter(api_key: str, limit_per_minute: int = 60, cost: int = 1) -> dict:
+    """
+    Take `cost` requests (1, or one per question of a batch) from `api_key`'s
+    bucket. Returns the rate-limit headers for the response; raises 429 (with
+    Retry-After) when the bucket holds fewer, and takes nothing then.
+    `limit_per_minute <= 0` disables the limit.
+    """
+    if limit_per_minute <= 0:
+        return {}
+    rate = limit_per_minute / 60.0
+    try:
+        allowed, tokens = get_backend().take(api_key, rate, float(limit_per_minute), time.time(), float(cost))
+    except sqlite3.OperationalError:
+        # Shared bucket store stayed locked past RATE_LIMIT_BUSY_TIMEOUT_MS
+        if settings.rate_limit_fail_open:
+            return {}
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Rate limiter busy",
+            headers={"Retry-After": "1"},
+        )
+    headers = {
+        "X-RateLimit-Limit": str(limit_per_minute),
+        "X-RateLimit-Remaining": str(int(tokens)),
+    }
+    if not allowed:
+        headers["Retry-After"] = str(max(1, math.ceil((min(cost, limit_per_minute) - tokens) / rate)))
+        RATE_LIMITED.labels("rate_limiter").inc()
         raise HTTPException(
             status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-            detail="Rate limit exceeded"
+            detail="Rate limit exceeded",
+            headers=headers,
         )
-    times.append(now)
-    rate_limits[api_key] = times
+    return headers
+
+
+async def rate_limiter_async(api_key: str, limit_per_minute: int = 60, cost: int = 1) -> dict:
+    """
+    `rate_limiter` for async endpoints. The in-memory check runs inline; the
+    SQLite one (lock wait, disk write) runs in the threadpool so it never
+    blocks the event loop.
+    """
+    if limit_per_minute <= 0:
+        return {}
+    if isinstance(_backend, MemoryBackend):
+        return rate_limiter(api_key, limit_per_minute, cost)
+    return await run_in_threadpool(rate_limiter, api_key, limit_per_minute, cost)
@@ -0,0 +1,79 @@
+import hashlib
+import importlib
+import threading
+import time
+
+import numpy as np
+
+from app.core.cache import LRUCache
+from app.core.config import settings
+from app.core.metrics import RERANK_SECONDS
+
+_model = None
+_model_lock = threading.Lock()
+
+# (model, query, sha1 of the passage) -> score. Keyed on the text itself: a
+# rebuild with new params restarts chunk ids, so an id may label another passage.
+score_cache = LRUCache(settings.rerank_cache_size)
+
+
+def _passage_key(text: str) -> bytes:
+    return hashlib.sha1(text.encode("utf-8")).digest()
+
+
+def enabled() -> bool:
+    return bool(settings.rerank_model or settings.rerank_fn)
+
+
+def get_reranker():
+    global _model
+    with _model_lock:
+        if _model is None:
+            from sentence_transformers import CrossEncoder
+
+            _model = CrossEncoder(settings.rerank_model)  # e.g. ms-marco-MiniLM-L-6-v2: small, CPU-friendly
+        return _model
+
+
+def score_pairs(pairs: list[tuple[str, str]]) -> np.ndarray:
+    """Relevance score per (query, passage) pair, higher is better."""
+    if not pairs:
+        return np.empty(0, dtype="float32")
+    if settings.rerank_fn:
+        # Replacement scorer (offline benchmarks / tests)
+        module, _, name = settings.rerank_fn.partition(":")
+        fn = getattr(importlib.import_module(module), name)
+        return np.asarray(fn(pairs), dtype="float32")
+    model = get_reranker()
+    return np.asarray(model.predict(pairs, batch_size=settings.rerank_batch_size), dtype="float32")
+
+
+def rerank_batch(queries, hits_lists, top_k: int):
+    """
+    Re-order each query's candidate hits by cross-encoder score and keep
+    `top_k`. Uncached pairs of all queries are scored in one batched call.
+    """
+    t0 = time.perf_counter()
+    scope = settings.rerank_model or settings.rerank_fn
+    scores = [[None] * len(hits) for hits in hits_lists]
+    todo = []
+    for qi, (query, hits) in enumerate(zip(queries, hits_lists)):
+        query = " ".join(query.split())
+        for hi, h in enumerate(hits):
+            cached = score_cache.get((scope, query, _passage_key(h["chunk"])))
+            if cached is None:
+                todo.append((qi, hi, query))
+            else:
+                scores[qi][hi] = cached
+
+    fresh = score_pairs([(query, hits_lists[qi][hi]["chunk"]) for qi, hi, query in todo])
+    for (qi, hi, query), s in zip(todo, fresh.tolist()):
+        scores[qi][hi] = s
+        score_cache.put((scope, query, _passage_key(hits_lists[qi][hi]["chunk"])), s)
+
+    out = []
+    for hits, qs in zip(hits_lists, scores):
+        order = sorted(range(len(hits)), key=lambda i: -qs[i])[:top_k]
+        out.append([dict(hits[i], score=qs[i], retrieval_score=hits[i].get("score")) for i in order])
+    RERANK_SECONDS.observe(time.perf_counter() - t0)
+    return out
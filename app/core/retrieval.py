@@ -1,43 +1,145 @@
-import faiss
+import time
+
 import numpy as np
-import pickle
+from app.core.ann import ann_search
+from app.core.cache import LRUCache
 from app.core.config import settings
+from app.core.lazy import lazy_import
+from app.core.embed_batcher import EmbeddingBatcher
 from app.core.chunk_manager import get_embedding_model
-import numpy as np
+from app.core.index_store import index_store
+from app.core import rerank
+from app.core.metrics import EMBED_SECONDS, FAISS_SECONDS, LEXICAL_SECONDS
+
+faiss = lazy_import("faiss")
+
+# Repeated questions (dashboards, client retries) skip the model entirely
+embed_cache = LRUCache(settings.embed_cache_size, settings.embed_cache_ttl_s)
+
+
+def normalize_query(text: str) -> str:
+    return " ".join(text.split())
 
 
 def embed_query(text: str) -> np.ndarray:
+    t0 = time.perf_counter()
+    text = normalize_query(text)
+    key = (settings.embedding_model, text)
+    cached = embed_cache.get(key)
+    if cached is None:
+        model = get_embedding_model()
+        cached = model.encode([text], normalize_embeddings=True).astype("float32")
+        cached.setflags(write=False)
+        embed_cache.put(key, cached)
+    EMBED_SECONDS.observe(time.perf_counter() - t0)
+    # Callers normalise in place, so hand out a private copy
+    return cached.copy()
+
+
+def _encode_batch(texts: list[str]) -> np.ndarray:
     model = get_embedding_model()
-    vector = model.encode([text], normalize_embeddings=True)
-    return vector.astype("float32")
-
-def bm25_score(chunk, query):
-    # Simple lexical: count shared words (improve later)
-    chunk_words = set(chunk.lower().split())
-    query_words = set(query.lower().split())
-    return len(chunk_words & query_words)
-
-def hybrid_retrieve(query, top_k=5):
-    # 1. Load FAISS index and meta
-    index = faiss.read_index(settings.index_path)
-    with open(settings.meta_path, "rb") as f:
-        meta = pickle.load(f)
-    chunks = meta["chunks"]
-    sources = meta["sources"]
-
-    # 2. Vector similarity
-    qv = embed_query(query)
+    return model.encode(texts, normalize_embeddings=True).astype("float32")
+
+
+embed_batcher = EmbeddingBatcher(_encode_batch, settings.embed_batch_window_ms, settings.embed_batch_max_size)
+
+
+async def embed_query_async(text: str) -> np.ndarray:
+    """Cache-first query embedding; misses are micro-batched across concurrent requests."""
+    t0 = time.perf_counter()
+    text = normalize_query(text)
+    key = (settings.embedding_model, text)
+    cached = embed_cache.get(key)
+    if cached is None:
+        cached = await embed_batcher.embed(text)
+        cached.setflags(write=False)
+        embed_cache.put(key, cached)
+    EMBED_SECONDS.observe(time.perf_counter() - t0)
+    return cached.copy()
+
+
+def embed_queries(texts: list[str]) -> np.ndarray:
+    """Cache-aware embeddings for many queries: all misses go through one encode call."""
+    t0 = time.perf_counter()
+    texts = [normalize_query(t) for t in texts]
+    found = {}
+    for t in texts:
+        if t not in found:
+            found[t] = embed_cache.get((settings.embedding_model, t))
+    missing = [t for t, v in found.items() if v is None]
+    if missing:
+        for t, v in zip(missing, _encode_batch(missing)):
+            row = v.reshape(1, -1).copy()
+            row.setflags(write=False)
+            embed_cache.put((settings.embedding_model, t), row)
+            found[t] = row
+    out = np.vstack([found[t] for t in texts])
+    EMBED_SECONDS.observe(time.perf_counter() - t0)
+    return out
+
+
+def _merge_hits(snap, query, D_row, I_row, n_cand, top_k):
+    store = snap.store
+    found = I_row >= 0
+    rows = snap.rows_for(I_row[found])
+    known = rows >= 0
+    scores = {int(r): float(d) for r, d in zip(rows[known], D_row[found][known])}
+
+    # Lexical: BM25 over the prebuilt inverted index, only the query's postings
+    weight = settings.hybrid_lexical_weight
+    if weight > 0:
+        t0 = time.perf_counter()
+        lex_ids, lex_scores = snap.bm25.score(query, n_cand)
+        LEXICAL_SECONDS.observe(time.perf_counter() - t0)
+        if len(lex_scores):
+            # Scale to [0, weight] so it is comparable with cosine similarity
+            lex_scores = lex_scores * (weight / lex_scores[0])
+
+        # Combine: best score per chunk, no dups
+        for i, s in zip(lex_ids.tolist(), lex_scores.tolist()):
+            scores[i] = max(scores.get(i, 0.0), s)
+    sorted_hits = sorted(scores.items(), key=lambda x: -x[1])[:top_k]
+    # Only the returned hits are decoded from the mmap'd text blob
+    # `row` lets the context packer merge overlapping neighbours from the same file
+    ids = store.ids if store.has_ids else None
+    return [
+        {
+            "chunk": store.chunk(i),
+            "source": store.source(i),
+            "row": i,
+            "id": int(ids[i]) if ids is not None else None,
+            "score": score,
+        }
+        for i, score in sorted_hits
+    ]
+
+
+def hybrid_retrieve(query, top_k=5, nprobe=None, ef_search=None, query_vector=None):
+    qv = embed_query(query) if query_vector is None else query_vector
+    return hybrid_retrieve_batch([query], top_k, nprobe, ef_search, query_vectors=qv)[0]
+
+
+def hybrid_retrieve_batch(queries, top_k=5, nprobe=None, ef_search=None, query_vectors=None):
+    """
+    Hybrid retrieval for many queries: one (n, d) FAISS search, BM25 per query.
+    With a reranker configured, RERANK_CANDIDATES hits per query are rescored
+    by the cross-encoder and the best `top_k` kept.
+    """
+    use_rerank = rerank.enabled()
+    pool = max(top_k, settings.rerank_candidates) if use_rerank else top_k
+    # Resident FAISS index and meta (loaded once, hot-swapped on rebuild); one
+    # snapshot for the whole batch
+    snap = index_store.get()
+    n_cand = min(pool * 2, len(snap.store))
+
+    # Vector similarity, all queries in one matrix search
+    qv = embed_queries(queries) if query_vectors is None else query_vectors
+    qv = np.ascontiguousarray(qv, dtype="float32")
     faiss.normalize_L2(qv)
-    D, I = index.search(qv, min(top_k * 2, len(chunks)))
-    faiss_hits = [(chunks[i], sources[i], float(D[0][j])) for j, i in enumerate(I[0])]
-
-    # 3. Lexical (BM25/TfIdf): Just using word overlap as a placeholder
-    lex_scores = [(chunk, src, bm25_score(chunk, query)) for chunk, src in zip(chunks, sources)]
-
-    # 4. Combine: Take best from each, no dups
-    all_hits = { (chunk, src): max(faiss_score, lex_score)
-                 for (chunk, src, faiss_score), (_, _, lex_score) in zip(faiss_hits, lex_scores)}
-    # Sort by score, get top_k
-    sorted_hits = sorted(all_hits.items(), key=lambda x: -x[1])[:top_k]
-    result = [{"chunk": chunk, "source": src} for (chunk, src), score in sorted_hits]
-    return result
+    t0 = time.perf_counter()
+    D, I = ann_search(snap.index, qv, n_cand, nprobe=nprobe, ef_search=ef_search)
+    FAISS_SECONDS.observe(time.perf_counter() - t0)
+    hits = [_merge_hits(snap, q, D[j], I[j], n_cand, pool) for j, q in enumerate(queries)]
+    if use_rerank:
+        hits = rerank.rerank_batch(queries, hits, top_k)
+    return hits
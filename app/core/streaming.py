@@ -0,0 +1,95 @@
+import asyncio
+import json
+import time
+
+try:
+    import orjson
+except ImportError:  # in requirements.txt (~5-10x faster than json for small frames); json still works
+    orjson = None
+
+
+def dumps(obj) -> str:
+    """JSON-encode an SSE payload (orjson when installed; same schema either way)."""
+    if orjson is not None:
+        return orjson.dumps(obj).decode("utf-8")
+    return json.dumps(obj, ensure_ascii=False)
+
+
+def loads(data):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+async def chat_deltas(lines):
+    """
+    Text deltas from the raw SSE lines of an OpenAI chat-completions stream.
+    Decoding the few fields we need directly is much cheaper than building
+    the SDK's pydantic chunk objects for every token.
+    """
+    async for line in lines:
+        if not line.startswith("data:"):
+            continue
+        payload = line[5:].strip()
+        if payload == "[DONE]":
+            return
+        obj = loads(payload)
+        if obj.get("error"):
+            raise RuntimeError(str(obj["error"].get("message", obj["error"]))[:200])
+        choices = obj.get("choices")
+        if choices:
+            content = (choices[0].get("delta") or {}).get("content")
+            if content:
+                yield content
+
+
+async def coalesce(deltas, window_ms: float = 0.0, max_chars: int = 0):
+    """
+    Merge an async stream of text deltas into fewer, larger pieces.
+
+    A piece is emitted once `window_ms` has passed since the previous one or
+    `max_chars` have accumulated, whichever comes first; with both 0 every
+    delta passes straight through. The first delta is never held back (no
+    added time-to-first-token), and a partial piece is flushed when the
+    window expires even if the upstream goes quiet.
+    """
+    if window_ms <= 0 and max_chars <= 0:
+        async for d in deltas:
+            yield d
+        return
+
+    window = window_ms / 1000
+    it = deltas.__aiter__()
+    buf = []
+    size = 0
+    last = float("-inf")
+    nxt = None
+    try:
+        while True:
+            if nxt is None:
+                nxt = asyncio.ensure_future(it.__anext__())
+            if buf and window > 0:
+                # Wait for the next delta only until this piece's window closes
+                done, _ = await asyncio.wait({nxt}, timeout=max(0.0, last + window - time.monotonic()))
+                if not done:
+                    yield "".join(buf)
+                    buf, size, last = [], 0, time.monotonic()
+                    continue
+            try:
+                d = await nxt
+            except StopAsyncIteration:
+                break
+            finally:
+                nxt = None
+            buf.append(d)
+            size += len(d)
+            now = time.monotonic()
+            first = last == float("-inf")
+            if first or (window > 0 and now - last >= window) or (max_chars > 0 and size >= max_chars):
+                yield "".join(buf)
+                buf, size, last = [], 0, now
+        if buf:
+            yield "".join(buf)
+    finally:
+        if nxt is not None:
+            nxt.cancel()
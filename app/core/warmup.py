@@ -0,0 +1,129 @@
+import importlib
+import os
+import threading
+import time
+
+from app.core import rerank
+from app.core.chunk_manager import get_embedding_model
+from app.core.config import settings
+from app.core.context import count_tokens, get_encoding
+from app.core.index_store import index_store
+from app.core.logger import log_event
+from app.core.meta_store import resolve_meta_path
+from app.core.retrieval import _encode_batch
+
+
+def _libraries():
+    # Deferred at import time (see app/core/lazy.py); load them before traffic
+    for name in ("faiss", "httpx", "openai"):
+        importlib.import_module(name)
+
+
+def _embedding_model():
+    get_embedding_model()
+
+
+def _warmup_encode():
+    # First encode pays torch's lazy kernel/thread-pool init; do it before real traffic
+    _encode_batch(["warm-up query"] * 4)
+
+
+def _index():
+    meta_path = resolve_meta_path(settings.meta_path, settings.index_path)
+    if not (os.path.exists(settings.index_path) and os.path.exists(meta_path)):
+        return "no index yet"
+    snap = index_store.get()
+    return f"{len(snap.store)} chunks"
+
+
+def _tokenizer():
+    count_tokens("warm-up", settings.model_name)
+    return "tiktoken" if get_encoding(settings.model_name) is not None else "len/4 fallback"
+
+
+def _reranker():
+    if not rerank.enabled():
+        return "disabled"
+    rerank.score_pairs([("warm-up query", "warm-up passage")])
+
+
+STEPS = [
+    ("libraries", _libraries),
+    ("embedding_model", _embedding_model),
+    ("warmup_encode", _warmup_encode),
+    ("index", _index),
+    ("tokenizer", _tokenizer),
+    ("reranker", _reranker),
+]
+
+
+class Warmup:
+    """
+    Startup preloading, run in the background by the app lifespan.
+    `/ready` reports ready only after every step succeeded; `/health` stays a
+    plain liveness check. Steps that fail (e.g. a transient model download
+    error) are retried with exponential backoff until they pass.
+    """
+
+    def __init__(self, steps=None):
+        self.steps = list(STEPS if steps is None else steps)
+        self.ready = False
+        self.done = False
+        self.attempts = 0
+        self.timings = {}
+        self.total_ms = None
+        self.import_ms = None  # set by app.main once its imports are done
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def run(self, failed_only: bool = False) -> bool:
+        """One pass over the steps (or only those that failed last time)."""
+        with self._lock:
+            start = time.perf_counter()
+            for name, fn in self.steps:
+                if failed_only and self.timings.get(name, {}).get("ok"):
+                    continue
+                t0 = time.perf_counter()
+                try:
+                    detail = fn()
+                    entry = {"ok": True}
+                    if detail:
+                        entry["detail"] = detail
+                except Exception as e:
+                    entry = {"ok": False, "error": f"{type(e).__name__}: {str(e)[:200]}"}
+                entry["ms"] = round((time.perf_counter() - t0) * 1000, 1)
+                self.timings[name] = entry
+            self.attempts += 1
+            self.total_ms = round((self.total_ms or 0) + (time.perf_counter() - start) * 1000, 1)
+            ok = all(self.timings[name]["ok"] for name, _ in self.steps)
+            self.ready, self.done = ok, True
+        log_event("startup", self.status(), force=True)
+        return ok
+
+    def run_until_ready(self) -> bool:
+        """
+        `run()`, then re-run the failed steps after WARMUP_RETRY_S, doubling
+        up to WARMUP_RETRY_MAX_S, until all pass or `stop()` is called.
+        """
+        ok = self.run()
+        delay = settings.warmup_retry_s
+        while not ok and delay > 0 and not self._stop.wait(delay):
+            ok = self.run(failed_only=True)
+            delay = min(delay * 2, settings.warmup_retry_max_s)
+        return ok
+
+    def stop(self):
+        self._stop.set()
+
+    def status(self) -> dict:
+        return {
+            "ready": self.ready,
+            "done": self.done,
+            "attempts": self.attempts,
+            "import_ms": self.import_ms,
+            "total_ms": self.total_ms,
+            "steps": dict(self.timings),
+        }
+
+
+warmup = Warmup()
@@ -1,9 +1,42 @@
-from fastapi import FastAPI
+import time
+
+_import_start = time.perf_counter()
+
+import asyncio
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Response
+from fastapi.responses import JSONResponse
 from app.api.ingest import router as ingest_router
 from app.api.ask import router as ask_router
 from app.core.config import settings
+from app.core.llm_client import close_openai_client
+from app.core import metrics
+from app.core.logger import logger
+from app.core.warmup import warmup
+
+# Heavy libraries are imported lazily, so this is the app's own import cost
+warmup.import_ms = round((time.perf_counter() - _import_start) * 1000, 1)
+
 
-app = FastAPI(title="Mini RAG Q&A")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if settings.warmup_on_startup:
+        # Off the loop and not awaited: the server accepts traffic (and /health
+        # answers) right away, /ready flips once the warm-up is done (failed
+        # steps are retried in the background)
+        app.state.warmup_task = asyncio.create_task(asyncio.to_thread(warmup.run_until_ready))
+    else:
+        warmup.ready = warmup.done = True
+    yield
+    warmup.stop()
+    # Drain the pooled upstream connections
+    await close_openai_client()
+    # Write out queued log records
+    await asyncio.to_thread(logger.flush)
+
+
+app = FastAPI(title="Mini RAG Q&A", lifespan=lifespan)
 
 @app.get("/")
 def root():
@@ -13,5 +46,16 @@ def root():
 def health():
     return {"status": "ok"}
 
+@app.get("/ready")
+def ready():
+    # Readiness: model, index and tokenizer are loaded (see app/core/warmup.py)
+    status = warmup.status()
+    return JSONResponse(status, status_code=200 if status["ready"] else 503)
+
+@app.get("/metrics")
+def metrics_endpoint():
+    # Prometheus text exposition format
+    return Response(metrics.registry.render(), media_type=metrics.CONTENT_TYPE)
+
 app.include_router(ingest_router)
 app.include_router(ask_router)
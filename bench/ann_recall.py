@@ -0,0 +1,106 @@
+"""
+Recall-vs-latency report for the ANN index types against the flat baseline.
+
+    python -m bench.ann_recall --n 100000 --dim 384
+
+Vectors are synthetic (clustered, L2-normalised) so the report runs offline.
+Recall@k is measured against exact IndexFlatIP results; latency is per
+single-query search, which is what /ask does.
+"""
+import argparse
+import json
+import time
+from pathlib import Path
+
+import faiss
+import numpy as np
+
+from app.core import ann
+from app.core.config import settings
+
+
+def synthetic_vectors(n, dim, n_clusters=256, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((n_clusters, dim)).astype("float32")
+    X = centers[rng.integers(0, n_clusters, n)] + 0.5 * rng.standard_normal((n, dim)).astype("float32")
+    faiss.normalize_L2(X)
+    return X
+
+
+def recall_at_k(found, truth):
+    k = truth.shape[1]
+    return float(np.mean([len(set(f) & set(t)) / k for f, t in zip(found, truth)]))
+
+
+def time_queries(index, Q, k, **params):
+    lat, found = [], []
+    for q in Q:
+        t0 = time.perf_counter()
+        _, I = ann.ann_search(index, q[None, :], k, **params)
+        lat.append((time.perf_counter() - t0) * 1000)
+        found.append(I[0])
+    lat = np.array(lat)
+    return np.array(found), {
+        "p50_ms": round(float(np.percentile(lat, 50)), 4),
+        "p95_ms": round(float(np.percentile(lat, 95)), 4),
+        "qps": round(1000 / float(lat.mean()), 1),
+    }
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--n", type=int, default=100_000)
+    p.add_argument("--dim", type=int, default=384)
+    p.add_argument("--queries", type=int, default=500)
+    p.add_argument("--k", type=int, default=10)
+    p.add_argument("--out", default="bench/results/ann_recall.json")
+    args = p.parse_args()
+
+    X = synthetic_vectors(args.n, args.dim)
+    Q = synthetic_vectors(args.queries, args.dim, seed=1)
+
+    flat = ann.build_ann_index(X, "flat")
+    _, truth = flat.search(Q, args.k)
+    rows = []
+
+    found, lat = time_queries(flat, Q, args.k)
+    rows.append({"index": "flat", "params": {}, "recall": recall_at_k(found, truth), **lat, "build_s": 0.0})
+
+    sweeps = {
+        "ivf_flat": [{"nprobe": n} for n in (1, 4, 8, 16, 32)],
+        "ivf_pq": [{"nprobe": n} for n in (1, 4, 8, 16, 32)],
+        "hnsw": [{"ef_search": e} for e in (16, 32, 64, 128)],
+    }
+    for index_type, params_list in sweeps.items():
+        t0 = time.perf_counter()
+        index = ann.build_ann_index(X, index_type)
+        build_s = round(time.perf_counter() - t0, 2)
+        for params in params_list:
+            found, lat = time_queries(index, Q, args.k, **params)
+            rows.append({
+                "index": index_type,
+                "params": params,
+                "recall": round(recall_at_k(found, truth), 4),
+                **lat,
+                "build_s": build_s,
+            })
+
+    report = {
+        "n_vectors": args.n,
+        "dim": args.dim,
+        "k": args.k,
+        "auto_choice": ann.choose_index_type(args.n),
+        "ivf_nlist": ann._nlist(args.n),
+        "train_size": settings.index_train_size,
+        "results": rows,
+    }
+    Path(args.out).parent.mkdir(parents=True, exist_ok=True)
+    Path(args.out).write_text(json.dumps(report, indent=2), encoding="utf-8")
+    for r in rows:
+        print(f"[ann] {r['index']:<8} {json.dumps(r['params']):<20} recall@{args.k}={r['recall']:.3f}  "
+              f"p50={r['p50_ms']:.3f}ms  p95={r['p95_ms']:.3f}ms  qps={r['qps']}")
+    print(f"[ann] Wrote {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+/ask throughput vs concurrency against a stubbed OpenAI upstream.
+
+    python -m bench.ask_concurrency --concurrency 1 4 16 64 --tokens 20 --token-ms 10
+
+Every upstream stream emits --tokens chunks --token-ms apart, so one answer
+takes ~tokens*token_ms of pure waiting. Requests go through the real app
+(ASGI, SSE, shared AsyncOpenAI client) with retrieval stubbed out. With a
+non-blocking upstream, throughput should grow ~linearly with concurrency;
+the "blocking" baseline replays the old behaviour (sync client, every token
+read blocking the event loop) for comparison.
+"""
+import argparse
+import asyncio
+import json
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import httpx
+import numpy as np
+
+from app.api import ask as ask_mod
+from app.api import auth
+from app.core import llm_client
+from app.core.config import settings
+from app.main import app
+
+CONTEXT = [{"chunk": "Synthetic context about the topic.", "source": "bench.txt"}]
+
+
+def stub_upstream(n_tokens: int, token_ms: float) -> httpx.MockTransport:
+    async def body():
+        for i in range(n_tokens):
+            await asyncio.sleep(token_ms / 1000)
+            chunk = {
+                "id": "bench",
+                "object": "chat.completion.chunk",
+                "created": 0,
+                "model": settings.model_name,
+                "choices": [{"index": 0, "delta": {"content": f"t{i} "}, "finish_reason": None}],
+            }
+            yield f"data: {json.dumps(chunk)}\n\n".encode()
+        yield b"data: [DONE]\n\n"
+
+    return httpx.MockTransport(
+        lambda request: httpx.Response(200, headers={"content-type": "text/event-stream"}, content=body())
+    )
+
+
+def blocking_tokens(n_tokens: int, token_ms: float):
+    # What the synchronous client did: each chunk read blocks the loop
+    def gen(*args, **kwargs):
+        for i in range(n_tokens):
+            time.sleep(token_ms / 1000)
+            yield json.dumps({"event": "token", "data": f"t{i} "})
+        yield json.dumps({"event": "done", "data": {"answer": "", "citations": [], "usage": {}}}), n_tokens, 0.0, 0
+
+    return gen
+
+
+async def run_level(concurrency: int, requests: int) -> dict:
+    latencies = []
+    sem = asyncio.Semaphore(concurrency)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+
+        async def one():
+            async with sem:
+                t0 = time.perf_counter()
+                r = await client.post("/ask", json={"question": "what is this?", "max_tokens": 64, "budget_usd": 1.0})
+                assert r.status_code == 200 and '"done"' in r.text, r.text[:200]
+                latencies.append((time.perf_counter() - t0) * 1000)
+
+        t0 = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(requests)))
+        wall = time.perf_counter() - t0
+    lat = np.array(latencies)
+    return {
+        "concurrency": concurrency,
+        "requests": requests,
+        "req_per_s": round(requests / wall, 1),
+        "p50_ms": round(float(np.percentile(lat, 50)), 1),
+        "p95_ms": round(float(np.percentile(lat, 95)), 1),
+    }
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 64])
+    p.add_argument("--rounds", type=int, default=4, help="requests per level = rounds * concurrency")
+    p.add_argument("--tokens", type=int, default=20)
+    p.add_argument("--token-ms", type=float, default=10.0)
+    p.add_argument("--coalesce-ms", type=float, default=0.0, help="SSE_COALESCE_MS for the async runs")
+    p.add_argument("--coalesce-chars", type=int, default=0, help="SSE_COALESCE_CHARS for the async runs")
+    p.add_argument("--modes", nargs="+", default=["async", "blocking"], choices=["async", "blocking"])
+    p.add_argument("--out", default="bench/results/ask_concurrency.json")
+    args = p.parse_args()
+
+    async def no_embed(question):
+        return None
+
+    settings.rate_limit_rpm = 10**9
+    settings.sse_coalesce_ms = args.coalesce_ms
+    settings.sse_coalesce_chars = args.coalesce_chars
+    app.dependency_overrides[auth.check_service_api_key] = lambda: None
+    ask_mod.embed_query_async = no_embed
+    ask_mod.hybrid_retrieve = lambda *a, **k: CONTEXT
+    ask_mod.index_store = SimpleNamespace(get=lambda: SimpleNamespace(generation=0))
+    # Every request asks the same question: measure generation, not the answer cache
+    ask_mod.answer_cache.maxsize = 0
+    llm_client.transport = stub_upstream(args.tokens, args.token_ms)
+    async_tokens = ask_mod.tokens_from_openai
+
+    report = {
+        "tokens_per_answer": args.tokens,
+        "token_ms": args.token_ms,
+        "ideal_answer_ms": args.tokens * args.token_ms,
+        "sse_coalesce_ms": args.coalesce_ms,
+        "sse_coalesce_chars": args.coalesce_chars,
+        "results": {},
+    }
+    for mode in args.modes:
+        ask_mod.tokens_from_openai = async_tokens if mode == "async" else blocking_tokens(args.tokens, args.token_ms)
+        rows = []
+        for c in args.concurrency:
+            row = asyncio.run(run_level(c, args.rounds * c))
+            rows.append(row)
+            print(f"[ask] {mode:<8} concurrency={c:<4} {row['req_per_s']:>7} req/s  "
+                  f"p50={row['p50_ms']}ms p95={row['p95_ms']}ms")
+        report["results"][mode] = rows
+
+    Path(args.out).parent.mkdir(parents=True, exist_ok=True)
+    Path(args.out).write_text(json.dumps(report, indent=2), encoding="utf-8")
+    print(f"[ask] Wrote {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Chunking throughput, allocations and metadata size: word windows vs spans.
+
+    python -m bench.chunking --docs 200 --doc-words 5000
+
+Compares `simple_chunk` (split into a word list, re-join every window) with
+the offset chunker (`span_offsets`: one vectorised pass, (start, end) per
+chunk), alone, with every chunk sliced out as ingest does before embedding,
+and with sentence boundaries. Each variant reports words/s, chunks/s and the
+peak Python allocation for one document (tracemalloc, measured separately).
+The same chunks are then written to the chunk store both ways, with the text
+of every chunk (CHUNK_MODE=words) or each document once plus byte spans
+(CHUNK_MODE=spans), to compare metadata bytes on disk.
+"""
+import argparse
+import hashlib
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+
+from app.core.chunk_manager import simple_chunk, span_offsets, utf8_offsets
+from app.core.config import settings
+from app.core.meta_store import MetaWriter
+from bench.synthetic import make_texts
+
+
+def punctuate(text, seed):
+    # Sentences of ~15 words, paragraphs of ~8 sentences, so boundaries exist
+    rng = np.random.default_rng(seed)
+    words = text.split()
+    ends = np.cumsum(rng.integers(8, 23, len(words) // 8 + 1))
+    for k, i in enumerate(ends[ends < len(words)]):
+        words[i] += ".\n\n" if k % 8 == 7 else "."
+    return " ".join(words).replace("\n\n ", "\n\n")
+
+
+def variants(size, overlap):
+    def slices(text, boundary=""):
+        starts, ends = span_offsets(text, size, overlap, boundary)
+        return [text[s:e] for s, e in zip(starts.tolist(), ends.tolist())]
+
+    return {
+        "simple_chunk": lambda t: simple_chunk(t, size, overlap),
+        "spans": lambda t: span_offsets(t, size, overlap)[0],
+        "spans+slice": slices,
+        "spans+slice_sentence": lambda t: slices(t, "sentence"),
+    }
+
+
+def bench_variant(fn, docs, n_words):
+    n_chunks = 0
+    t0 = time.perf_counter()
+    for d in docs:
+        n_chunks += len(fn(d))
+    wall = time.perf_counter() - t0
+    tracemalloc.start()
+    fn(docs[0])
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {
+        "words_per_s": round(n_words / wall),
+        "chunks_per_s": round(n_chunks / wall),
+        "chunks": n_chunks,
+        "peak_alloc_per_doc_kb": round(peak / 1024, 1),
+    }
+
+
+def store_bytes(docs, size, overlap, mode, tmp):
+    path = os.path.join(tmp, mode, "index.meta.json")
+    writer = MetaWriter(path)
+    fake_hash = hashlib.sha1(b"").hexdigest()
+    next_id = 0
+    for i, text in enumerate(docs):
+        if mode == "words":
+            chunks = simple_chunk(text, size, overlap)
+            spans = None
+        else:
+            base = writer.add_document(text)
+            starts, ends = span_offsets(text, size, overlap)
+            spans = base + np.stack([utf8_offsets(text, starts), utf8_offsets(text, ends)], axis=1)
+            chunks = [None] * len(spans)
+        n = len(chunks)
+        writer.append(chunks, [f"doc{i}.txt"] * n, list(range(next_id, next_id + n)), [fake_hash] * n, spans=spans)
+        next_id += n
+    writer.close(next_id=next_id)
+    files = [f for f in Path(path).parent.iterdir() if f.name != "index.meta.json"]
+    return {
+        "text_bytes": sum(f.stat().st_size for f in files if f.suffix == ".text"),
+        "total_bytes": sum(f.stat().st_size for f in files),
+    }
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--docs", type=int, default=200)
+    p.add_argument("--doc-words", type=int, default=5000)
+    p.add_argument("--chunk-size", type=int, default=settings.chunk_size)
+    p.add_argument("--chunk-overlap", type=int, default=settings.chunk_overlap)
+    p.add_argument("--out", default="bench/results/chunking.json")
+    args = p.parse_args()
+
+    docs = [punctuate(t, i) for i, t in enumerate(make_texts(args.docs, args.doc_words, seed=1))]
+    n_words = args.docs * args.doc_words
+    corpus_bytes = sum(len(d.encode("utf-8")) for d in docs)
+    report = {
+        "docs": args.docs,
+        "doc_words": args.doc_words,
+        "chunk_size": args.chunk_size,
+        "chunk_overlap": args.chunk_overlap,
+        "corpus_bytes": corpus_bytes,
+        "chunkers": {},
+        "metadata": {},
+    }
+    for name, fn in variants(args.chunk_size, args.chunk_overlap).items():
+        row = report["chunkers"][name] = bench_variant(fn, docs, n_words)
+        print(f"[chunk] {name:<22} {row['words_per_s']:>11,} words/s {row['chunks_per_s']:>8,} chunks/s "
+              f"peak {row['peak_alloc_per_doc_kb']:>8} KB/doc")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for mode in ("words", "spans"):
+            row = report["metadata"][mode] = store_bytes(docs, args.chunk_size, args.chunk_overlap, mode, tmp)
+            row["text_vs_corpus"] = round(row["text_bytes"] / corpus_bytes, 3)
+            print(f"[chunk] store ({mode:<5}) text {row['text_bytes']:>12,} B ({row['text_vs_corpus']}x corpus)  "
+                  f"total {row['total_bytes']:>12,} B")
+
+    Path(args.out).parent.mkdir(parents=True, exist_ok=True)
+    Path(args.out).write_text(json.dumps(report, indent=2), encoding="utf-8")
+    print(f"[chunk] Wrote {args.out}")
+
+
+if __name__ == "__main__":
+    main()
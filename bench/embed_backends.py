@@ -0,0 +1,94 @@
+"""
+Embedding backend throughput / latency and parity with torch.
+
+    python -m bench.embed_backends --model-dir models/all-MiniLM-L6-v2
+
+Loads each backend from the same local model directory (no network) and
+reports load time, single-query latency (p50/p95, the /ask path) and batch
+throughput (texts/s, the ingest path), plus the cosine agreement of its
+vectors with the torch backend's. The ONNX backend needs onnxruntime and an
+exported model (EMBEDDING_ONNX_FILE, default onnx/model.onnx); backends that
+cannot load are reported with their error instead.
+"""
+import argparse
+import json
+import random
+import time
+from pathlib import Path
+
+import numpy as np
+
+from app.core.config import settings
+from app.core.embedding import BACKENDS, create_backend
+from bench.synthetic import make_vocab
+
+
+def pct(values, q):
+    return round(float(np.percentile(values, q)), 2)
+
+
+def make_texts(n, lo, hi, seed):
+    vocab = make_vocab(5_000, seed=seed)
+    rng = random.Random(seed)
+    return [" ".join(rng.choice(vocab) for _ in range(rng.randint(lo, hi))) for _ in range(n)]
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--model-dir", default=settings.embedding_model_dir or settings.embedding_model)
+    p.add_argument("--onnx-file", default=settings.embedding_onnx_file)
+    p.add_argument("--backends", nargs="+", default=list(BACKENDS))
+    p.add_argument("--queries", type=int, default=200)
+    p.add_argument("--passages", type=int, default=512)
+    p.add_argument("--batch-size", type=int, default=32)
+    p.add_argument("--out", default="bench/results/embed_backends.json")
+    args = p.parse_args()
+
+    queries = make_texts(args.queries, 4, 16, seed=1)  # question-sized
+    passages = make_texts(args.passages, 200, 400, seed=2)  # chunk-sized
+    report = {"model": args.model_dir, "batch_size": args.batch_size, "backends": {}}
+    ref = None
+    for name in args.backends:
+        t0 = time.perf_counter()
+        try:
+            backend = create_backend(name, args.model_dir, args.model_dir, args.onnx_file, args.batch_size)
+            backend.encode(queries[:2])  # first-call init is part of load
+        except Exception as e:
+            report["backends"][name] = {"error": f"{type(e).__name__}: {str(e)[:200]}"}
+            print(f"[embed] {name}: unavailable ({report['backends'][name]['error']})")
+            continue
+        load_ms = (time.perf_counter() - t0) * 1000
+
+        lat = []
+        for q in queries:
+            t = time.perf_counter()
+            backend.encode([q])
+            lat.append((time.perf_counter() - t) * 1000)
+
+        t = time.perf_counter()
+        X = backend.encode(passages)
+        batch_s = time.perf_counter() - t
+
+        row = {
+            "load_ms": round(load_ms, 1),
+            "query_p50_ms": pct(lat, 50),
+            "query_p95_ms": pct(lat, 95),
+            "passages_per_s": round(len(passages) / batch_s, 1),
+        }
+        if name == "torch":
+            ref = X
+        if ref is not None:
+            row["cosine_vs_torch_min"] = round(float((X * ref).sum(axis=1).min()), 5)
+            row["cosine_vs_torch_mean"] = round(float((X * ref).sum(axis=1).mean()), 5)
+        report["backends"][name] = row
+        print(f"[embed] {name}: load={row['load_ms']}ms query p50={row['query_p50_ms']}ms "
+              f"p95={row['query_p95_ms']}ms batch={row['passages_per_s']} passages/s "
+              f"cos_min={row.get('cosine_vs_torch_min', '-')}")
+
+    Path(args.out).parent.mkdir(parents=True, exist_ok=True)
+    Path(args.out).write_text(json.dumps(report, indent=2), encoding="utf-8")
+    print(f"[embed] Wrote {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Ingest throughput vs INGEST_WORKERS.
+
+    python -m bench.ingest_scaling --files 64 --words 20000 --workers 1 2 4 8
+
+Builds the same synthetic corpus with 1..N workers and reports chunks/s.
+Uses the deterministic fake embedder by default so it runs offline; pass
+--real-model to embed with the configured sentence-transformer instead.
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from app.core import chunk_manager
+from app.core.config import settings
+from bench.synthetic import write_corpus
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--files", type=int, default=64)
+    p.add_argument("--words", type=int, default=20_000)
+    p.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, os.cpu_count() or 1])
+    p.add_argument("--real-model", action="store_true")
+    p.add_argument("--out", default="bench/results/ingest_scaling.json")
+    args = p.parse_args()
+
+    if not args.real_model:
+        settings.embed_fn = "bench.synthetic:fake_encode"
+    settings.index_type = "flat"
+
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = write_corpus(os.path.join(tmp, "docs"), args.files, args.words)
+        for n in sorted(set(args.workers)):
+            # Fresh output each run so nothing is reused incrementally
+            settings.index_path = os.path.join(tmp, f"w{n}", "index.faiss")
+            settings.meta_path = os.path.join(tmp, f"w{n}", "index.meta.json")
+            settings.ingest_workers = n
+            t0 = time.perf_counter()
+            result = chunk_manager.build_index(paths)
+            elapsed = time.perf_counter() - t0
+            rows.append({
+                "workers": n,
+                "chunks": result.chunks,
+                "seconds": round(elapsed, 2),
+                "chunks_per_s": round(result.chunks / elapsed, 1),
+            })
+            print(f"[ingest] workers={n:<3} chunks={result.chunks} {elapsed:.2f}s "
+                  f"{result.chunks / elapsed:.1f} chunks/s")
+
+    base = rows[0]["chunks_per_s"]
+    for r in rows:
+        r["speedup"] = round(r["chunks_per_s"] / base, 2)
+    report = {
+        "files": args.files,
+        "words_per_file": args.words,
+        "embedder": settings.embedding_model if args.real_model else "fake_encode",
+        "cpu_count": os.cpu_count(),
+        "note": "includes worker process start-up (model load per worker)",
+        "results": rows,
+    }
+    Path(args.out).parent.mkdir(parents=True, exist_ok=True)
+    Path(args.out).write_text(json.dumps(report, indent=2), encoding="utf-8")
+    print(f"[ingest] Wrote {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,254 @@
+"""
+Concurrent load generator for a running /ask.
+
+    python -m bench.mock_openai --ttft-ms 300 --token-rate 50 &
+    OPENAI_BASE_URL=http://127.0.0.1:9000/v1 uvicorn app.main:app &
+    python -m bench.loadgen --concurrency 32 --duration 60
+    python -m bench.loadgen --rps 20 --duration 60
+
+Two modes:
+
+- closed loop (--concurrency N): N clients, each sending its next question as
+  soon as the previous answer finishes; finds throughput at a given number of
+  in-flight streams.
+- open loop (--rps R): new requests arrive at R per second (evenly spaced, or
+  Poisson with --poisson) whether or not earlier ones have finished, which is
+  what real traffic does; queueing shows up as growing latency instead of
+  being hidden by a slower send rate.
+
+Every answer is read as SSE. The report has time-to-first-token, the gaps
+between token frames, total latency (p50/p90/p95/p99/max), achieved req/s
+and the error rate by kind: HTTP status, [Upstream Error] / [Stream Error] /
+[Budget Exceeded] answers, streams with no done event, client exceptions.
+
+The server's answer cache and rate limit would otherwise turn most of the
+run into cache replays or 429s, so start it with both off:
+
+    ANSWER_CACHE_SIZE=0 RATE_LIMIT_RPM=0 OPENAI_BASE_URL=... uvicorn app.main:app
+
+Each question also gets a unique suffix (--no-cache-bust to send them as
+is). Answers that were still replayed from the cache (a `cache` field or
+zero prompt tokens in the done event) are counted as `cache_hits` and left
+out of the latency figures.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+from pathlib import Path
+
+import httpx
+import numpy as np
+
+ERROR_PREFIXES = {
+    "[Upstream Error]": "upstream_error",
+    "[Stream Error]": "stream_error",
+    "[Budget Exceeded]": "budget_exceeded",
+}
+
+
+def load_questions(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line)["q"] for line in f if line.strip()]
+
+
+def percentiles(values):
+    if not values:
+        return None
+    a = np.asarray(values)
+    out = {f"p{q}": round(float(np.percentile(a, q)), 1) for q in (50, 90, 95, 99)}
+    out["max"] = round(float(a.max()), 1)
+    return out
+
+
+async def ask_once(client: httpx.AsyncClient, payload: dict, headers: dict) -> dict:
+    """One streamed /ask; times are ms from sending the request."""
+    t0 = time.perf_counter()
+    res = {"status": None, "ttft_ms": None, "gaps_ms": [], "total_ms": None, "frames": 0, "error": None}
+    res["cached"] = False
+    last = None
+    done = None
+    try:
+        async with client.stream("POST", "/ask", json=payload, headers=headers) as r:
+            res["status"] = r.status_code
+            if r.status_code != 200:
+                await r.aread()
+                res["error"] = f"http_{r.status_code}"
+            else:
+                async for line in r.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    try:
+                        msg = json.loads(line[5:])
+                    except json.JSONDecodeError:
+                        continue
+                    now = time.perf_counter()
+                    if msg.get("event") == "token":
+                        if last is None:
+                            res["ttft_ms"] = (now - t0) * 1000
+                        else:
+                            res["gaps_ms"].append((now - last) * 1000)
+                        last = now
+                        res["frames"] += 1
+                    elif msg.get("event") == "done":
+                        done = msg.get("data") or {}
+                        break
+                if done is None:
+                    res["error"] = "incomplete"
+                else:
+                    answer = done.get("answer", "")
+                    for prefix, kind in ERROR_PREFIXES.items():
+                        if answer.startswith(prefix):
+                            res["error"] = kind
+                            break
+                    usage = done.get("usage") or {}
+                    res["cached"] = bool(done.get("cache")) or usage.get("prompt_tokens") == 0
+    except Exception as e:
+        res["error"] = type(e).__name__
+    res["total_ms"] = (time.perf_counter() - t0) * 1000
+    return res
+
+
+async def run_load(
+    client: httpx.AsyncClient,
+    questions: list[str],
+    *,
+    concurrency: int = 0,
+    rps: float = 0.0,
+    duration_s: float = 0.0,
+    requests: int = 0,
+    poisson: bool = False,
+    max_tokens: int = 200,
+    budget_usd: float = 0.05,
+    api_key: str = "",
+    seed: int = 0,
+    cache_bust: bool = True,
+) -> dict:
+    """
+    Drive /ask until `requests` have been sent or `duration_s` has passed
+    (whichever is set first to run out) and summarise the results.
+    `cache_bust` makes every question unique.
+    """
+    if bool(concurrency) == bool(rps):
+        raise ValueError("Set exactly one of concurrency (closed loop) or rps (open loop)")
+    if not requests and not duration_s:
+        raise ValueError("Set requests and/or duration_s")
+    rng = random.Random(seed)
+    run_id = f"{rng.getrandbits(32):08x}"
+    headers = {"x-api-key": api_key, "accept": "text/event-stream"}
+    results = []
+    sent = 0
+    start = time.perf_counter()
+
+    def next_payload():
+        nonlocal sent
+        if requests and sent >= requests:
+            return None
+        if duration_s and time.perf_counter() - start >= duration_s:
+            return None
+        q = questions[sent % len(questions)]
+        if cache_bust:
+            q = f"{q} (load {run_id} #{sent})"
+        sent += 1
+        return {"question": q, "max_tokens": max_tokens, "budget_usd": budget_usd}
+
+    async def one(payload):
+        results.append(await ask_once(client, payload, headers))
+
+    if concurrency:
+
+        async def worker():
+            while (payload := next_payload()) is not None:
+                await one(payload)
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    else:
+        tasks = []
+        due = start
+        while (payload := next_payload()) is not None:
+            tasks.append(asyncio.create_task(one(payload)))
+            due += rng.expovariate(rps) if poisson else 1.0 / rps
+            await asyncio.sleep(max(0.0, due - time.perf_counter()))
+        await asyncio.gather(*tasks)
+    wall = time.perf_counter() - start
+
+    errors = {}
+    for r in results:
+        if r["error"]:
+            errors[r["error"]] = errors.get(r["error"], 0) + 1
+    ok = [r for r in results if not r["error"]]
+    # Latencies describe the streaming path; cache replays are only counted
+    streamed = [r for r in ok if not r["cached"]]
+    return {
+        "mode": "closed" if concurrency else "open",
+        "concurrency": concurrency or None,
+        "target_rps": rps or None,
+        "requests": len(results),
+        "duration_s": round(wall, 2),
+        "achieved_rps": round(len(results) / wall, 2) if wall else None,
+        "ok": len(ok),
+        "error_rate": round(1 - len(ok) / len(results), 4) if results else None,
+        "errors": errors,
+        "cache_hits": len(ok) - len(streamed),
+        # Latency figures are over streamed answers only; errors and cache hits are counted above
+        "ttft_ms": percentiles([r["ttft_ms"] for r in streamed if r["ttft_ms"] is not None]),
+        "inter_token_ms": percentiles([g for r in streamed for g in r["gaps_ms"]]),
+        "total_ms": percentiles([r["total_ms"] for r in streamed]),
+        "frames_per_answer": round(sum(r["frames"] for r in streamed) / len(streamed), 1) if streamed else None,
+    }
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--url", default="http://127.0.0.1:8000")
+    p.add_argument("--api-key", default=os.getenv("API_KEY", "changeme"))
+    p.add_argument("--questions", default="eval/golden.jsonl")
+    mode = p.add_mutually_exclusive_group(required=True)
+    mode.add_argument("--concurrency", type=int, default=0, help="closed loop: in-flight requests")
+    mode.add_argument("--rps", type=float, default=0.0, help="open loop: arrival rate")
+    p.add_argument("--poisson", action="store_true", help="open loop: exponential inter-arrival times")
+    p.add_argument("--duration", type=float, default=30.0, help="seconds (0 = until --requests)")
+    p.add_argument("--requests", type=int, default=0, help="stop after this many (0 = until --duration)")
+    p.add_argument("--max-tokens", type=int, default=200)
+    p.add_argument("--budget-usd", type=float, default=0.05)
+    p.add_argument("--no-cache-bust", dest="cache_bust", action="store_false", help="send the questions unchanged")
+    p.add_argument("--timeout", type=float, default=120.0)
+    p.add_argument("--out", default="bench/results/loadgen.json")
+    args = p.parse_args()
+
+    async def run():
+        limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+        async with httpx.AsyncClient(base_url=args.url, timeout=args.timeout, limits=limits) as client:
+            return await run_load(
+                client,
+                load_questions(args.questions),
+                concurrency=args.concurrency,
+                rps=args.rps,
+                duration_s=args.duration,
+                requests=args.requests,
+                poisson=args.poisson,
+                max_tokens=args.max_tokens,
+                budget_usd=args.budget_usd,
+                api_key=args.api_key,
+                cache_bust=args.cache_bust,
+            )
+
+    report = asyncio.run(run())
+    report["url"] = args.url
+    print(f"[load] {report['mode']} loop: {report['requests']} requests in {report['duration_s']}s "
+          f"= {report['achieved_rps']} req/s, error rate {report['error_rate']} {report['errors']}")
+    if report["cache_hits"] or "http_429" in report["errors"]:
+        print(f"[load] {report['cache_hits']} cache hits, {report['errors'].get('http_429', 0)} rate limited: "
+              "start the server with ANSWER_CACHE_SIZE=0 RATE_LIMIT_RPM=0 to measure the LLM path")
+    for key in ("ttft_ms", "inter_token_ms", "total_ms"):
+        print(f"[load] {key:<15} {report[key]}")
+
+    Path(args.out).parent.mkdir(parents=True, exist_ok=True)
+    Path(args.out).write_text(json.dumps(report, indent=2), encoding="utf-8")
+    print(f"[load] Wrote {args.out}")
+
+
+if __name__ == "__main__":
+    main()
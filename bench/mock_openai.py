@@ -0,0 +1,163 @@
+"""
+Local OpenAI-compatible chat-completions server for load tests.
+
+    python -m bench.mock_openai --port 9000 --ttft-ms 300 --token-rate 50
+    OPENAI_BASE_URL=http://127.0.0.1:9000/v1 uvicorn app.main:app
+
+Serves POST /v1/chat/completions (streaming and not) with a configurable
+time-to-first-token, token rate and answer length, plus injected faults:
+
+- --error-rate: fraction of requests answered with HTTP --error-status
+- --abort-rate: fraction of streams cut off halfway (connection dropped)
+- --burst-every-s / --burst-s: every N seconds, answer 429 for M seconds
+  (with Retry-After), like an upstream rate-limit window
+
+GET /stats returns what was served and injected, so a load test can tell
+its own errors from the ones it asked for.
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from dataclasses import asdict, dataclass
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+WORDS = (
+    "the index answers questions from retrieved chunks and cites each source inline so "
+    "readers can check every claim against the documents that were ingested"
+).split()
+
+
+@dataclass
+class MockConfig:
+    ttft_ms: float = 200.0  # request -> first content token
+    token_rate: float = 50.0  # content tokens per second after the first (0 = no delay)
+    tokens: int = 64  # completion length, capped by the request's max_tokens
+    jitter: float = 0.0  # each delay is scaled by a uniform factor in [1 - jitter, 1 + jitter]
+    error_rate: float = 0.0
+    error_status: int = 500
+    abort_rate: float = 0.0
+    burst_every_s: float = 0.0  # 0 = no 429 bursts
+    burst_s: float = 0.0
+    retry_after_s: float = 1.0
+    seed: int | None = None
+
+
+class _Abort(Exception):
+    pass
+
+
+def _chunk(model, delta, finish_reason=None):
+    return {
+        "id": "chatcmpl-mock",
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+    }
+
+
+def _error(status, message, kind, headers=None):
+    return JSONResponse({"error": {"message": message, "type": kind, "code": None}}, status_code=status, headers=headers)
+
+
+def create_app(cfg: MockConfig | None = None) -> FastAPI:
+    cfg = cfg or MockConfig()
+    rng = random.Random(cfg.seed)
+    started = time.monotonic()
+    stats = {"requests": 0, "completed": 0, "errors": 0, "rate_limited": 0, "aborted": 0, "tokens": 0}
+    app = FastAPI(title="mock-openai")
+
+    def delay(seconds):
+        if cfg.jitter:
+            seconds *= 1 + rng.uniform(-cfg.jitter, cfg.jitter)
+        return asyncio.sleep(max(seconds, 0.0))
+
+    def in_burst():
+        if cfg.burst_every_s <= 0 or cfg.burst_s <= 0:
+            return False
+        return (time.monotonic() - started) % cfg.burst_every_s < cfg.burst_s
+
+    @app.get("/stats")
+    def get_stats():
+        return {"config": asdict(cfg), **stats}
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        stats["requests"] += 1
+        model = body.get("model", "mock")
+
+        if in_burst():
+            stats["rate_limited"] += 1
+            return _error(
+                429, "Rate limit reached (mock burst)", "rate_limit_exceeded",
+                headers={"retry-after": str(cfg.retry_after_s)},
+            )
+        if cfg.error_rate and rng.random() < cfg.error_rate:
+            stats["errors"] += 1
+            return _error(cfg.error_status, "Injected error (mock)", "server_error")
+
+        n = max(1, min(cfg.tokens, body.get("max_tokens") or cfg.tokens))
+        gap = 1.0 / cfg.token_rate if cfg.token_rate > 0 else 0.0
+        words = [("[1] " if i == 0 else "") + WORDS[i % len(WORDS)] + " " for i in range(n)]
+        abort_at = n // 2 if cfg.abort_rate and rng.random() < cfg.abort_rate else None
+
+        if not body.get("stream"):
+            await delay(cfg.ttft_ms / 1000 + gap * (n - 1))
+            stats["completed"] += 1
+            stats["tokens"] += n
+            return {
+                "id": "chatcmpl-mock",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [
+                    {"index": 0, "message": {"role": "assistant", "content": "".join(words)}, "finish_reason": "stop"}
+                ],
+                "usage": {"prompt_tokens": 0, "completion_tokens": n, "total_tokens": n},
+            }
+
+        async def events():
+            yield f"data: {json.dumps(_chunk(model, {'role': 'assistant', 'content': ''}))}\n\n"
+            await delay(cfg.ttft_ms / 1000)
+            for i, word in enumerate(words):
+                if i == abort_at:
+                    stats["aborted"] += 1
+                    # Dropping the connection mid-body is what a crashed upstream looks like
+                    raise _Abort("injected mid-stream abort")
+                if i:
+                    await delay(gap)
+                stats["tokens"] += 1
+                yield f"data: {json.dumps(_chunk(model, {'content': word}))}\n\n"
+            yield f"data: {json.dumps(_chunk(model, {}, 'stop'))}\n\n"
+            yield "data: [DONE]\n\n"
+            stats["completed"] += 1
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return app
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=9000)
+    defaults = MockConfig()
+    for name, value in asdict(defaults).items():
+        kind = type(value) if value is not None else int
+        p.add_argument(f"--{name.replace('_', '-')}", type=kind, default=value)
+    args = vars(p.parse_args())
+    host, port = args.pop("host"), args.pop("port")
+
+    import uvicorn
+
+    print(f"[mock] OPENAI_BASE_URL=http://{host}:{port}/v1  {args}")
+    uvicorn.run(create_app(MockConfig(**args)), host=host, port=port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Rerank latency vs prompt-token savings.
+
+    python -m bench.rerank --files 40 --words 5000 --queries 200
+
+Builds a synthetic index (fake embedder), asks questions made of words from
+one known chunk, and compares plain hybrid retrieval at TOP_K=5 with
+cross-encoder reranking of RERANK_CANDIDATES down to smaller top_k values:
+prompt tokens of the packed context, how often the source chunk is kept
+("hit rate"), and rerank latency (cold, then with the score cache warm).
+Uses a lexical stand-in scorer by default; pass --real-model to load
+RERANK_MODEL (default cross-encoder/ms-marco-MiniLM-L-6-v2).
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from app.core import chunk_manager, rerank, retrieval
+from app.core.config import settings
+from app.core.context import count_tokens, pack_context
+from bench.synthetic import write_corpus
+
+
+def pct(values, q):
+    return round(float(np.percentile(values, q)), 2) if values else 0.0
+
+
+def run(queries, targets, top_k):
+    tokens, hits, lat = [], 0, []
+    for q, target in zip(queries, targets):
+        t0 = time.perf_counter()
+        found = retrieval.hybrid_retrieve(q, top_k=top_k)
+        lat.append((time.perf_counter() - t0) * 1000)
+        hits += any(h["row"] == target for h in found)
+        context = pack_context(found, 0, settings.model_name)
+        tokens.append(sum(count_tokens(c["chunk"], settings.model_name) for c in context))
+    return {
+        "prompt_tokens_mean": round(float(np.mean(tokens)), 1),
+        "hit_rate": round(hits / len(queries), 3),
+        "retrieve_p50_ms": pct(lat, 50),
+        "retrieve_p95_ms": pct(lat, 95),
+    }
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--files", type=int, default=40)
+    p.add_argument("--words", type=int, default=5000)
+    p.add_argument("--queries", type=int, default=200)
+    p.add_argument("--candidates", type=int, default=20)
+    p.add_argument("--top-k", type=int, nargs="+", default=[1, 2, 3])
+    p.add_argument("--real-model", action="store_true")
+    p.add_argument("--out", default="bench/results/rerank.json")
+    args = p.parse_args()
+
+    settings.embed_fn = "bench.synthetic:fake_encode"
+    settings.index_type = "flat"
+    settings.embed_cache_size = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        settings.index_path = os.path.join(tmp, "index.faiss")
+        settings.meta_path = os.path.join(tmp, "index.meta.json")
+        paths = write_corpus(os.path.join(tmp, "docs"), args.files, args.words)
+        chunk_manager.build_index(paths)
+
+        store = retrieval.index_store.get().store
+        rng = random.Random(0)
+        targets = [rng.randrange(len(store)) for _ in range(args.queries)]
+        queries = [" ".join(rng.sample(store.chunk(t).split(), 8)) for t in targets]
+
+        settings.rerank_model = ""
+        settings.rerank_fn = ""
+        report = {
+            "chunks": len(store),
+            "queries": args.queries,
+            "scorer": "none",
+            "baseline_top_k5": run(queries, targets, 5),
+            "rerank": [],
+        }
+        if args.real_model:
+            settings.rerank_model = settings.rerank_model or "cross-encoder/ms-marco-MiniLM-L-6-v2"
+        else:
+            settings.rerank_fn = "bench.synthetic:fake_rerank"
+        settings.rerank_candidates = args.candidates
+        report["scorer"] = settings.rerank_model or settings.rerank_fn
+
+        base = report["baseline_top_k5"]["prompt_tokens_mean"]
+        for k in args.top_k:
+            rerank.score_cache.clear()
+            cold = run(queries, targets, k)
+            warm = run(queries, targets, k)  # same questions: scores come from the cache
+            row = {
+                "top_k": k,
+                "candidates": args.candidates,
+                **cold,
+                "retrieve_p50_ms_cached": warm["retrieve_p50_ms"],
+                "prompt_token_savings": round(1 - cold["prompt_tokens_mean"] / base, 3),
+            }
+            report["rerank"].append(row)
+            print(f"[rerank] top_k={k} tokens={row['prompt_tokens_mean']} (-{row['prompt_token_savings']:.0%}) "
+                  f"hit_rate={row['hit_rate']} p50={row['retrieve_p50_ms']}ms "
+                  f"cached p50={row['retrieve_p50_ms_cached']}ms")
+        b = report["baseline_top_k5"]
+        print(f"[rerank] baseline top_k=5 tokens={b['prompt_tokens_mean']} hit_rate={b['hit_rate']} "
+              f"p50={b['retrieve_p50_ms']}ms")
+
+    Path(args.out).parent.mkdir(parents=True, exist_ok=True)
+    Path(args.out).write_text(json.dumps(report, indent=2), encoding="utf-8")
+    print(f"[rerank] Wrote {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""
+Startup report: import time vs warm-up steps (model load, index load, ...).
+
+    python -m bench.startup
+
+Runs in a fresh process, so the numbers are what a new uvicorn worker pays.
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+HEAVY = ("torch", "sentence_transformers", "transformers", "faiss", "tiktoken", "openai", "onnxruntime")
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--out", default="")
+    args = p.parse_args()
+
+    t0 = time.perf_counter()
+    from app.main import warmup
+
+    import_ms = round((time.perf_counter() - t0) * 1000, 1)
+    deferred = [m for m in HEAVY if m not in sys.modules]
+    warmup.run()
+    report = dict(warmup.status(), import_ms=import_ms, deferred_at_import=deferred)
+
+    print(f"[startup] import app.main: {import_ms} ms (deferred: {', '.join(deferred) or 'none'})")
+    for name, step in report["steps"].items():
+        detail = step.get("detail") or step.get("error") or ""
+        print(f"[startup] {name:<16} {step['ms']:>9} ms  {'ok' if step['ok'] else 'FAILED'}  {detail}")
+    print(f"[startup] warm-up total: {report['total_ms']} ms, ready={report['ready']}")
+    if args.out:
+        Path(args.out).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.out).write_text(json.dumps(report, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,322 @@
+"""
+Offline benchmark suite: chunking, embedding, retrieval, context packing and
+end-to-end /ask, with per-stage throughput and p50/p95/p99 latency.
+
+    python -m bench.suite                                   # 10k-chunk corpus
+    python -m bench.suite --chunks 1000000 --skip ask       # retrieval at 1M chunks
+    python -m bench.suite --save-baseline bench/baselines/suite.json
+    python -m bench.suite --check bench/baselines/suite.json --threshold 0.3
+
+No network: embeddings come from the deterministic fake encoder
+(bench.synthetic:fake_encode), the retrieval corpus is synthetic text with
+clustered vectors, and /ask runs through the real app (ASGI, SSE, retrieval,
+packing) with `tokens_from_openai` replaced by a local token stream.
+
+`--check` compares every stage with the baseline and exits 1 when a p95 is
+more than `threshold` slower (and by at least --min-delta-ms) or a
+throughput more than `threshold` lower.
+Baselines are machine-specific: the committed one was recorded on a single
+dev container and is only an example. Re-record it (`make bench-baseline`) on
+the machine that runs the check; `--check` warns when the machine differs.
+Reports go to bench/results/, which is not tracked.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+from app.core.config import settings
+
+STAGES = ("chunk", "embed_batch", "embed_query", "retrieve", "retrieve_batch", "pack_context", "ask")
+
+
+def summarize(latencies_ms, items, wall_s, unit):
+    lat = np.asarray(latencies_ms, dtype="float64")
+    return {
+        "ops": len(lat),
+        "throughput": round(items / wall_s, 1) if wall_s > 0 else 0.0,
+        "throughput_unit": unit,
+        "p50_ms": round(float(np.percentile(lat, 50)), 3),
+        "p95_ms": round(float(np.percentile(lat, 95)), 3),
+        "p99_ms": round(float(np.percentile(lat, 99)), 3),
+    }
+
+
+def timed(fn, inputs):
+    lat = []
+    t0 = time.perf_counter()
+    for x in inputs:
+        t = time.perf_counter()
+        fn(x)
+        lat.append((time.perf_counter() - t) * 1000)
+    return lat, time.perf_counter() - t0
+
+
+# --- stages ---
+
+def bench_chunk(args):
+    from app.core.chunk_manager import simple_chunk
+    from bench.synthetic import make_texts
+
+    docs = make_texts(args.docs, args.doc_words, seed=1)
+    n_chunks = []
+    lat, wall = timed(lambda d: n_chunks.append(len(simple_chunk(d, settings.chunk_size, settings.chunk_overlap))), docs)
+    row = summarize(lat, args.docs * args.doc_words, wall, "words/s")
+    row["chunks_per_s"] = round(sum(n_chunks) / wall, 1)
+    return row
+
+
+def bench_embed_batch(args):
+    from app.core.chunk_manager import embed
+    from bench.synthetic import make_texts
+
+    texts = make_texts(args.embed_batches * settings.ingest_batch_size, args.chunk_words, seed=2)
+    size = settings.ingest_batch_size
+    batches = [texts[i : i + size] for i in range(0, len(texts), size)]
+    lat, wall = timed(embed, batches)
+    return summarize(lat, len(texts), wall, "chunks/s")
+
+
+def bench_embed_query(args, queries):
+    from app.core import retrieval
+
+    retrieval.embed_cache.maxsize = 0  # every call encodes
+    lat, wall = timed(retrieval.embed_query, queries)
+    return summarize(lat, len(queries), wall, "queries/s")
+
+
+def build_corpus(args):
+    """Publish a synthetic index of `--chunks` chunks; returns (queries, query vectors)."""
+    from app.core.ann import build_ann_index, index_kind
+    from app.core.bm25 import BM25Index
+    from app.core.index_store import index_store
+    from app.core.meta_store import LegacyStore
+    from bench.synthetic import clustered_vectors, make_texts
+
+    t0 = time.perf_counter()
+    chunks = make_texts(args.chunks, args.chunk_words, seed=3)
+    X = clustered_vectors(args.chunks, seed=3)
+    index = build_ann_index(X, ids=np.arange(args.chunks, dtype="int64"))
+    store = LegacyStore({
+        "chunks": chunks,
+        "sources": [f"doc{i // 100:05d}.txt" for i in range(args.chunks)],
+        "ids": list(range(args.chunks)),
+    })
+    index_store.publish(index, store, BM25Index.build(chunks))
+    build_s = time.perf_counter() - t0
+
+    # Each query: a few words of one chunk + a noisy copy of its vector
+    rng = random.Random(4)
+    noise = np.random.default_rng(4)
+    targets = [rng.randrange(args.chunks) for _ in range(args.queries)]
+    queries = [" ".join(rng.sample(chunks[t].split(), 6)) for t in targets]
+    qv = X[targets] + 0.05 * noise.standard_normal((len(targets), X.shape[1])).astype("float32")
+    return queries, qv.astype("float32"), round(build_s, 1), index_kind(index)
+
+
+def bench_retrieve(args, queries, qv):
+    from app.core.retrieval import hybrid_retrieve
+
+    lat, wall = timed(lambda i: hybrid_retrieve(queries[i], settings.top_k, query_vector=qv[i : i + 1].copy()), range(len(queries)))
+    return summarize(lat, len(queries), wall, "queries/s")
+
+
+def bench_retrieve_batch(args, queries, qv):
+    from app.core.retrieval import hybrid_retrieve_batch
+
+    b = args.batch
+    spans = [(i, min(i + b, len(queries))) for i in range(0, len(queries), b)]
+    lat, wall = timed(lambda s: hybrid_retrieve_batch(queries[s[0] : s[1]], settings.top_k, query_vectors=qv[s[0] : s[1]].copy()), spans)
+    row = summarize(lat, len(queries), wall, "queries/s")
+    row["batch"] = b
+    return row
+
+
+def bench_pack(args, queries, qv):
+    from app.core.context import pack_context
+    from app.core.retrieval import hybrid_retrieve
+
+    hits = [hybrid_retrieve(queries[i], settings.top_k, query_vector=qv[i : i + 1].copy()) for i in range(len(queries))]
+    lat, wall = timed(lambda h: pack_context(h, settings.context_token_budget, settings.model_name), hits)
+    return summarize(lat, len(hits), wall, "queries/s")
+
+
+def fake_tokens(n_tokens, token_ms):
+    """Async stand-in for tokens_from_openai: n tokens, token_ms apart, then a done tuple."""
+
+    async def gen(context_chunks, question, *args, **kwargs):
+        from app.core.streaming import dumps
+
+        parts = []
+        for i in range(n_tokens):
+            if token_ms:
+                await asyncio.sleep(token_ms / 1000)
+            parts.append(f"t{i} ")
+            yield dumps({"event": "token", "data": parts[-1]})
+        citations = [{"source_id": f"{c['source']}#{i}", "snippet": c["chunk"][:120]} for i, c in enumerate(context_chunks)]
+        payload = {
+            "answer": "".join(parts) + "[1]",
+            "citations": citations,
+            "usage": {"prompt_tokens": 0, "completion_tokens": n_tokens, "cost_usd": 0.0, "latency_ms": 0},
+        }
+        yield {"event": "done", "data": payload}, n_tokens, 0.0, 0
+
+    return gen
+
+
+def bench_ask(args, queries):
+    import httpx
+
+    from app.api import ask as ask_mod
+    from app.api import auth
+    from app.main import app
+
+    settings.rate_limit_rpm = 0
+    app.dependency_overrides[auth.check_service_api_key] = lambda: None
+    ask_mod.answer_cache.maxsize = 0
+    ask_mod.tokens_from_openai = fake_tokens(args.tokens, args.token_ms)
+
+    async def run():
+        ttft, total = [], []
+        sem = asyncio.Semaphore(args.concurrency)
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+
+            async def one(q):
+                async with sem:
+                    t0 = time.perf_counter()
+                    first = None
+                    body = {"question": q, "max_tokens": 64, "budget_usd": 1.0}
+                    async with client.stream("POST", "/ask", json=body) as r:
+                        assert r.status_code == 200
+                        async for line in r.aiter_lines():
+                            if first is None and line.startswith("data:") and '"token"' in line:
+                                first = time.perf_counter()
+                    end = time.perf_counter()
+                    ttft.append(((first or end) - t0) * 1000)
+                    total.append((end - t0) * 1000)
+
+            t0 = time.perf_counter()
+            await asyncio.gather(*(one(q) for q in queries[: args.ask_requests]))
+            return ttft, total, time.perf_counter() - t0
+
+    ttft, total, wall = asyncio.run(run())
+    row = summarize(total, len(total), wall, "req/s")
+    row["concurrency"] = args.concurrency
+    row["ttft_p50_ms"] = round(float(np.percentile(ttft, 50)), 3)
+    row["ttft_p95_ms"] = round(float(np.percentile(ttft, 95)), 3)
+    row["ttft_p99_ms"] = round(float(np.percentile(ttft, 99)), 3)
+    return row
+
+
+# --- baselines ---
+
+def check(report, baseline, threshold, min_delta_ms=0.25):
+    """
+    Regressions of `report` vs `baseline`: p95 slower or throughput lower by
+    more than `threshold`. p95 changes under `min_delta_ms` are noise on
+    microsecond-scale stages and are ignored.
+    """
+    failures = []
+    for stage, base in baseline.get("stages", {}).items():
+        cur = report["stages"].get(stage)
+        if cur is None:
+            continue
+        slower = cur["p95_ms"] - base["p95_ms"]
+        if slower > min_delta_ms and cur["p95_ms"] > base["p95_ms"] * (1 + threshold):
+            failures.append(f"{stage}: p95 {cur['p95_ms']}ms vs baseline {base['p95_ms']}ms")
+        if base["throughput"] > 0 and cur["throughput"] < base["throughput"] * (1 - threshold):
+            failures.append(
+                f"{stage}: throughput {cur['throughput']} vs baseline {base['throughput']} {cur['throughput_unit']}"
+            )
+    return failures
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--chunks", type=int, default=10_000, help="retrieval corpus size (10k-1M)")
+    p.add_argument("--chunk-words", type=int, default=64)
+    p.add_argument("--docs", type=int, default=200, help="documents for the chunking stage")
+    p.add_argument("--doc-words", type=int, default=5_000)
+    p.add_argument("--embed-batches", type=int, default=8)
+    p.add_argument("--queries", type=int, default=500)
+    p.add_argument("--batch", type=int, default=64, help="queries per hybrid_retrieve_batch call")
+    p.add_argument("--ask-requests", type=int, default=200)
+    p.add_argument("--concurrency", type=int, default=16)
+    p.add_argument("--tokens", type=int, default=20)
+    p.add_argument("--token-ms", type=float, default=0.0)
+    p.add_argument("--skip", nargs="*", default=[], choices=STAGES)
+    p.add_argument("--out", default="bench/results/suite.json")
+    p.add_argument("--save-baseline", default="")
+    p.add_argument("--check", default="", help="baseline JSON to compare against")
+    p.add_argument("--threshold", type=float, default=0.3)
+    p.add_argument("--min-delta-ms", type=float, default=0.25, help="ignore smaller p95 changes")
+    args = p.parse_args()
+
+    settings.embed_fn = "bench.synthetic:fake_encode"
+    settings.index_type = "auto"
+    settings.rerank_model = ""
+    settings.rerank_fn = ""
+    settings.warmup_on_startup = False
+
+    run = [s for s in STAGES if s not in args.skip]
+    report = {
+        "machine": {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count()},
+        "params": {k: v for k, v in vars(args).items() if k not in ("out", "save_baseline", "check")},
+        "stages": {},
+    }
+
+    def record(name, row):
+        report["stages"][name] = row
+        print(f"[suite] {name:<15} {row['throughput']:>12} {row['throughput_unit']:<10} "
+              f"p50={row['p50_ms']}ms p95={row['p95_ms']}ms p99={row['p99_ms']}ms")
+
+    if "chunk" in run:
+        record("chunk", bench_chunk(args))
+    if "embed_batch" in run:
+        record("embed_batch", bench_embed_batch(args))
+    if {"embed_query", "retrieve", "retrieve_batch", "pack_context", "ask"} & set(run):
+        queries, qv, build_s, index_name = build_corpus(args)
+        report["corpus"] = {"chunks": args.chunks, "build_s": build_s, "index": index_name}
+        print(f"[suite] corpus: {args.chunks} chunks, {index_name}, built in {build_s}s")
+        if "embed_query" in run:
+            record("embed_query", bench_embed_query(args, queries))
+        if "retrieve" in run:
+            record("retrieve", bench_retrieve(args, queries, qv))
+        if "retrieve_batch" in run:
+            record("retrieve_batch", bench_retrieve_batch(args, queries, qv))
+        if "pack_context" in run:
+            record("pack_context", bench_pack(args, queries, qv))
+        if "ask" in run:
+            record("ask", bench_ask(args, queries))
+
+    Path(args.out).parent.mkdir(parents=True, exist_ok=True)
+    Path(args.out).write_text(json.dumps(report, indent=2), encoding="utf-8")
+    print(f"[suite] Wrote {args.out}")
+    if args.save_baseline:
+        Path(args.save_baseline).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.save_baseline).write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"[suite] Saved baseline {args.save_baseline}")
+    if args.check:
+        baseline = json.loads(Path(args.check).read_text(encoding="utf-8"))
+        other = {k: v for k, v in baseline.get("machine", {}).items() if report["machine"].get(k) != v}
+        if other:
+            print(f"[suite] WARNING baseline was recorded on another machine ({other}); "
+                  "re-record it here with `make bench-baseline` before trusting the check")
+        failures = check(report, baseline, args.threshold, args.min_delta_ms)
+        for f in failures:
+            print(f"[suite] REGRESSION {f}")
+        if failures:
+            sys.exit(1)
+        print(f"[suite] No regressions beyond {args.threshold:.0%} vs {args.check}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Synthetic corpora and a deterministic fake embedder for offline benchmarks."""
+import hashlib
+import os
+import random
+
+import numpy as np
+
+FAKE_DIM = 384
+
+# Fixed random projection; the matmul stands in for model compute
+_PROJ = np.random.default_rng(0).standard_normal((4096, FAKE_DIM)).astype("float32")
+
+
+def fake_encode(texts):
+    """
+    Deterministic stand-in for the sentence-transformer: hashed bag of words
+    projected to FAKE_DIM and L2-normalised. Same text -> same vector, in any
+    process, with a CPU cost that scales with text length.
+    """
+    X = np.zeros((len(texts), _PROJ.shape[0]), dtype="float32")
+    for i, t in enumerate(texts):
+        for w in t.lower().split():
+            X[i, int(hashlib.blake2b(w.encode(), digest_size=4).hexdigest(), 16) % _PROJ.shape[0]] += 1.0
+    V = X @ _PROJ
+    V /= np.maximum(np.linalg.norm(V, axis=1, keepdims=True), 1e-12)
+    return V
+
+
+def make_vocab(n=20_000, seed=0):
+    rng = random.Random(seed)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    return ["".join(rng.choice(letters) for _ in range(rng.randint(3, 10))) for _ in range(n)]
+
+
+def write_corpus(folder, n_files, words_per_file, seed=0):
+    """Write `n_files` text files of Zipf-distributed words; returns their paths."""
+    os.makedirs(folder, exist_ok=True)
+    vocab = make_vocab(seed=seed)
+    rng = np.random.default_rng(seed)
+    paths = []
+    for i in range(n_files):
+        idx = (rng.zipf(1.2, words_per_file) - 1) % len(vocab)
+        path = os.path.join(folder, f"doc{i:05d}.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(" ".join(vocab[j] for j in idx))
+        paths.append(path)
+    return paths
+
+
+def make_texts(n, words, seed=0, vocab=None):
+    """`n` in-memory texts of `words` Zipf-distributed words each (vectorised, fast at 1M)."""
+    vocab = np.array(vocab or make_vocab(seed=seed))
+    rng = np.random.default_rng(seed)
+    out = []
+    for start in range(0, n, 10_000):
+        m = min(10_000, n - start)
+        idx = (rng.zipf(1.2, (m, words)) - 1) % len(vocab)
+        out.extend(" ".join(row) for row in vocab[idx])
+    return out
+
+
+def clustered_vectors(n, dim=FAKE_DIM, clusters=256, seed=0):
+    """Normalised float32 vectors around `clusters` centres: ANN-realistic and cheap at 1M rows."""
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((clusters, dim)).astype("float32")
+    X = np.empty((n, dim), dtype="float32")
+    for start in range(0, n, 100_000):
+        m = min(100_000, n - start)
+        X[start : start + m] = centres[rng.integers(0, clusters, m)] + 0.5 * rng.standard_normal((m, dim))
+    X /= np.linalg.norm(X, axis=1, keepdims=True)
+    return X
+
+
+def fake_rerank(pairs):
+    """Deterministic stand-in for a cross-encoder: query-term overlap, length-normalised."""
+    out = []
+    for q, p in pairs:
+        words = p.lower().split()
+        out.append(len(set(q.lower().split()) & set(words)) / (1 + len(words)) ** 0.5)
+    return out
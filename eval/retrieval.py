@@ -0,0 +1,164 @@
+"""
+Retrieval-only offline evaluation: no HTTP, no LLM.
+
+    python -m eval.retrieval
+    python -m eval.retrieval --chunk-size 128 256 512 --top-k 1 3 5 10 --lexical-weight 0 0.5 1
+
+Every golden line needs the question and the files that answer it:
+
+    {"q": "What text was ingested?", "sources": ["hello.txt"]}
+
+(lines without `sources` are skipped). For each chunk size the documents are
+indexed in-process into a temporary directory. The golden questions are
+embedded once, in one batch. Each hybrid weighting is then one
+`hybrid_retrieve_batch` call (a single matrix search) at the largest top_k,
+and smaller top_k values are scored as cut-offs of that ranking. A hit is
+relevant when its source file is one of the labelled ones; each source counts
+once, at its best rank. Reported per configuration:
+
+- recall@k: fraction of labelled sources found in the top k
+- hit_rate@k: fraction of questions with at least one relevant hit in the top k
+- mrr: mean 1/rank of the first relevant hit (0 if none in the top k)
+- ndcg@k: binary-gain nDCG with one gain per labelled source
+
+EMBED_FN / --embed-fn swaps the embedding model for a stub, which is handy
+for checking the harness itself. Sweeps that are meant to inform real
+settings should use the real model.
+"""
+import argparse
+import contextlib
+import json
+import math
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from app.core.chunk_manager import build_index
+from app.core.config import settings
+from app.core.index_store import index_store
+from app.core.retrieval import embed_cache, embed_queries, hybrid_retrieve_batch
+
+
+def load_golden(path):
+    gold = []
+    for line in Path(path).read_text(encoding="utf-8").splitlines():
+        if not line.strip():
+            continue
+        obj = json.loads(line)
+        sources = obj.get("sources") or ([obj["source"]] if obj.get("source") else [])
+        if sources:
+            gold.append({"q": obj.get("q") or obj.get("question"), "sources": set(sources)})
+    return gold
+
+
+def ranked_sources(hits):
+    """Distinct sources in rank order (1-based rank of each source's best hit)."""
+    seen = {}
+    for rank, h in enumerate(hits, 1):
+        seen.setdefault(h["source"], rank)
+    return seen
+
+
+def score_query(hits, relevant, k):
+    ranks = [r for s, r in ranked_sources(hits[:k]).items() if s in relevant]
+    first = min(ranks) if ranks else None
+    dcg = sum(1 / math.log2(r + 1) for r in ranks)
+    idcg = sum(1 / math.log2(r + 1) for r in range(1, min(len(relevant), k) + 1))
+    return {
+        "recall": len(ranks) / len(relevant),
+        "hit_rate": 1.0 if ranks else 0.0,
+        "mrr": 1 / first if first else 0.0,
+        "ndcg": dcg / idcg if idcg else 0.0,
+    }
+
+
+def score(all_hits, gold, k):
+    rows = [score_query(hits, g["sources"], k) for hits, g in zip(all_hits, gold)]
+    return {m: round(sum(r[m] for r in rows) / len(rows), 4) for m in ("recall", "hit_rate", "mrr", "ndcg")}
+
+
+def build(doc_files, chunk_size, chunk_overlap, workdir):
+    settings.chunk_size = chunk_size
+    settings.chunk_overlap = chunk_overlap
+    settings.index_path = os.path.join(workdir, f"cs{chunk_size}", "index.faiss")
+    settings.meta_path = os.path.join(workdir, f"cs{chunk_size}", "index.meta.json")
+    t0 = time.perf_counter()
+    result = build_index(doc_files)
+    return result.chunks, (time.perf_counter() - t0) * 1000
+
+
+def sweep(doc_files, gold, chunk_sizes, top_ks, lexical_weights, chunk_overlap=None, workdir=None):
+    """Score every (chunk_size, lexical weight, top_k) combination; one row each."""
+    questions = [g["q"] for g in gold]
+    max_k = max(top_ks)
+    saved = {k: getattr(settings, k) for k in ("chunk_size", "chunk_overlap", "index_path", "meta_path", "hybrid_lexical_weight")}
+    overlap = settings.chunk_overlap if chunk_overlap is None else chunk_overlap
+    rows = []
+    try:
+        with tempfile.TemporaryDirectory() if workdir is None else contextlib.nullcontext(workdir) as tmp:
+            embed_cache.clear()
+            t0 = time.perf_counter()
+            Q = embed_queries(questions)
+            embed_ms = (time.perf_counter() - t0) * 1000
+            for size in chunk_sizes:
+                n_chunks, build_ms = build(doc_files, size, min(overlap, size // 2), tmp)
+                for weight in lexical_weights:
+                    settings.hybrid_lexical_weight = weight
+                    t0 = time.perf_counter()
+                    hits = hybrid_retrieve_batch(questions, max_k, query_vectors=Q)
+                    search_ms = (time.perf_counter() - t0) * 1000
+                    for k in top_ks:
+                        rows.append({
+                            "chunk_size": size,
+                            "lexical_weight": weight,
+                            "top_k": k,
+                            **score(hits, gold, k),
+                            "chunks": n_chunks,
+                            "build_ms": round(build_ms, 1),
+                            "embed_queries_ms": round(embed_ms, 1),
+                            "search_ms": round(search_ms, 1),
+                        })
+    finally:
+        for k, v in saved.items():
+            setattr(settings, k, v)
+        index_store.clear()
+    return rows
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--docs", default=settings.docs_path)
+    p.add_argument("--golden", default="eval/golden.jsonl")
+    p.add_argument("--chunk-size", type=int, nargs="+", default=[settings.chunk_size])
+    p.add_argument("--chunk-overlap", type=int, default=settings.chunk_overlap, help="capped at chunk_size / 2")
+    p.add_argument("--top-k", type=int, nargs="+", default=[1, 3, settings.top_k])
+    p.add_argument("--lexical-weight", type=float, nargs="+", default=[settings.hybrid_lexical_weight])
+    p.add_argument("--embed-fn", default=settings.embed_fn, help="module:function stub encoder")
+    p.add_argument("--workdir", default=None, help="keep the built indexes here (default: temporary)")
+    p.add_argument("--out", default="eval/retrieval_report.json")
+    args = p.parse_args()
+
+    settings.embed_fn = args.embed_fn
+    doc_files = sorted(
+        os.path.join(args.docs, f) for f in os.listdir(args.docs) if os.path.isfile(os.path.join(args.docs, f))
+    )
+    gold = load_golden(args.golden)
+    if not gold:
+        raise SystemExit(f"No labelled questions (with 'sources') in {args.golden}")
+
+    t0 = time.perf_counter()
+    rows = sweep(doc_files, gold, args.chunk_size, sorted(set(args.top_k)), args.lexical_weight, args.chunk_overlap, args.workdir)
+    wall = time.perf_counter() - t0
+    for r in rows:
+        print(f"[eval] chunk_size={r['chunk_size']:<5} lexical_weight={r['lexical_weight']:<4} top_k={r['top_k']:<3} "
+              f"recall={r['recall']:.3f} hit={r['hit_rate']:.3f} mrr={r['mrr']:.3f} ndcg={r['ndcg']:.3f}")
+    best = max(rows, key=lambda r: (r["ndcg"], r["recall"], -r["top_k"]))
+    report = {"questions": len(gold), "docs": len(doc_files), "wall_s": round(wall, 2), "best_by_ndcg": best, "rows": rows}
+    Path(args.out).write_text(json.dumps(report, indent=2), encoding="utf-8")
+    print(f"\n[eval] {len(gold)} questions x {len(rows)} configurations in {wall:.1f}s; wrote {args.out}")
+    print(f"[eval] best by nDCG: chunk_size={best['chunk_size']} lexical_weight={best['lexical_weight']} top_k={best['top_k']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,7 @@
+import hashlib
 import json
+
+import numpy as np
 import pytest
 from fastapi.testclient import TestClient
 
@@ -16,3 +19,45 @@ def require_api_key(monkeypatch):
         return True
     from app.api import auth as auth_mod
     monkeypatch.setattr(auth_mod, "check_service_api_key", lambda req: None)
+
+@pytest.fixture(autouse=True)
+def clear_answer_cache():
+    # Tests reuse questions with different fake answers
+    from app.api import ask as ask_mod
+    ask_mod.answer_cache.clear()
+    yield
+    ask_mod.answer_cache.clear()
+
+
+def fake_encode(texts, dim=8):
+    # Stand-in for the embedding model: md5-seeded unit vectors, so the same
+    # text gets the same vector in any process (EMBED_FN="conftest:fake_encode"
+    # works in spawned ingest workers too)
+    X = np.zeros((len(texts), dim), dtype="float32")
+    for i, t in enumerate(texts):
+        X[i] = np.random.default_rng(int(hashlib.md5(t.encode()).hexdigest()[:8], 16)).standard_normal(dim)
+    return X / np.linalg.norm(X, axis=1, keepdims=True)
+
+@pytest.fixture
+def fake_encoder():
+    return fake_encode
+
+@pytest.fixture
+def publish_index():
+    # A fresh IndexStore serving `chunks`, published in memory
+    import faiss
+    from app.core.bm25 import BM25Index
+    from app.core.index_store import IndexStore
+    from app.core.meta_store import LegacyStore
+
+    def publish(chunks, vectors=None, ids=None, source="a.txt"):
+        X = fake_encode(chunks) if vectors is None else vectors
+        ids = list(range(len(chunks))) if ids is None else list(ids)
+        index = faiss.IndexIDMap2(faiss.IndexFlatIP(X.shape[1]))
+        index.add_with_ids(X, np.asarray(ids, dtype="int64"))
+        meta = {"chunks": list(chunks), "sources": [source] * len(chunks), "ids": ids, "hashes": [""] * len(chunks)}
+        store = IndexStore()
+        store.publish(index, LegacyStore(meta), BM25Index.build(list(chunks)))
+        return store
+
+    return publish
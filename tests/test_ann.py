@@ -0,0 +1,52 @@
+import faiss
+import numpy as np
+import pytest
+
+from app.core import ann
+from app.core.config import settings
+
+
+def _vectors(n, dim=32, seed=0):
+    X = np.random.default_rng(seed).standard_normal((n, dim)).astype("float32")
+    faiss.normalize_L2(X)
+    return X
+
+
+def test_auto_selection_by_corpus_size():
+    assert ann.choose_index_type(100) == "flat"
+    assert ann.choose_index_type(50_000) == "ivf_flat"
+    assert ann.choose_index_type(5_000_000) == "ivf_pq"
+
+
+def test_unknown_index_type_is_rejected(monkeypatch):
+    monkeypatch.setattr(settings, "index_type", "lsh")
+    with pytest.raises(ValueError):
+        ann.resolve_index_type(10)
+
+
+@pytest.mark.parametrize("index_type", ann.INDEX_TYPES)
+def test_every_index_type_finds_exact_match(index_type):
+    X = _vectors(2000)
+    index = ann.build_ann_index(X, index_type)
+    assert index.ntotal == len(X)
+    # Searching with a stored vector at full probe/ef should return itself
+    D, I = ann.ann_search(index, X[:5], 1, nprobe=1024, ef_search=256)
+    assert I[:, 0].tolist() == [0, 1, 2, 3, 4]
+
+
+def test_search_params_only_apply_to_matching_index():
+    X = _vectors(2000)
+    assert ann.search_params(ann.build_ann_index(X, "flat"), nprobe=4) is None
+    assert ann.search_params(ann.build_ann_index(X, "ivf_flat"), nprobe=4).nprobe == 4
+    assert ann.search_params(ann.build_ann_index(X, "hnsw"), ef_search=99).efSearch == 99
+    ivf = ann.build_ann_index(X, "ivf_flat")
+    assert ann.search_params(ivf, nprobe=10**6).nprobe == ann._unwrap(ivf).nlist
+
+
+@pytest.mark.parametrize("knobs", [{"nprobe": 0}, {"nprobe": -3}, {"nprobe": "8"}, {"nprobe": 2.5},
+                                   {"nprobe": True}, {"ef_search": 10**9}])
+def test_ask_rejects_bad_search_knobs(client, knobs):
+    r = client.post("/ask", headers={"x-api-key": "test"}, json={"question": "hi", **knobs})
+    assert r.status_code == 400
+    r = client.post("/ask/batch", headers={"x-api-key": "test"}, json={"questions": ["hi"], **knobs})
+    assert r.status_code == 400
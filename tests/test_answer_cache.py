@@ -0,0 +1,93 @@
+import json
+from types import SimpleNamespace
+
+import numpy as np
+
+from app.api import ask as ask_mod
+from app.core.answer_cache import SemanticAnswerCache
+
+
+def _unit(*xs):
+    v = np.asarray(xs, dtype="float32")
+    return v / np.linalg.norm(v)
+
+
+def test_matches_paraphrase_above_threshold_only():
+    cache = SemanticAnswerCache(maxsize=4, threshold=0.9)
+    cache.put(_unit(1, 0, 0), 1, "A", scope="m")
+    assert cache.get(_unit(1, 0.1, 0), 1, scope="m")[0] == "A"
+    assert cache.get(_unit(1, 1, 0), 1, scope="m") is None  # cos ~0.71
+    assert cache.get(_unit(1, 0, 0), 1, scope="other-model") is None
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 2
+
+
+def test_new_generation_invalidates_and_lru_evicts():
+    cache = SemanticAnswerCache(maxsize=2, threshold=0.99)
+    cache.put(_unit(1, 0), 1, "A")
+    cache.put(_unit(0, 1), 1, "B")
+    cache.get(_unit(1, 0), 1)  # A is now most recent
+    cache.put(_unit(1, 1), 1, "C")
+    assert cache.get(_unit(0, 1), 1) is None  # B evicted
+    assert cache.stats()["evictions"] == 1
+
+    assert cache.get(_unit(1, 0), 2) is None
+    assert len(cache) == 0 and cache.stats()["invalidations"] == 1
+
+
+def _stream(client, max_tokens=50):
+    payload = {"question": "What is in my documents?", "max_tokens": max_tokens, "budget_usd": 0.01}
+    with client.stream("POST", "/ask", headers={"x-api-key": "test"}, json=payload) as r:
+        return [json.loads(l[6:]) for l in r.iter_lines() if l.startswith("data: ")]
+
+
+def test_ask_replays_cached_answer_for_free(client, monkeypatch):
+    calls = []
+
+    def fake_tokens(*a, **k):
+        calls.append(1)
+        yield json.dumps({"event": "token", "data": "Hello world"})
+        yield json.dumps({"event": "done", "data": {
+            "answer": "Hello world [1]",
+            "citations": [{"source_id": "sample.txt#0", "snippet": "Hello world"}],
+            "usage": {"prompt_tokens": 10, "completion_tokens": 2, "cost_usd": 0.001, "latency_ms": 5},
+        }}), 2, 0.001, 5
+
+    async def fake_embed(question):
+        return _unit(1, 2, 3).reshape(1, -1)
+
+    snap = SimpleNamespace(generation=7)
+    monkeypatch.setattr(ask_mod, "embed_query_async", fake_embed)
+    monkeypatch.setattr(ask_mod, "hybrid_retrieve", lambda *a, **k: [{"chunk": "Hello world", "source": "sample.txt"}])
+    monkeypatch.setattr(ask_mod.index_store, "get", lambda: snap)
+    monkeypatch.setattr(ask_mod, "tokens_from_openai", fake_tokens)
+
+    first = _stream(client)[-1]["data"]
+    events = _stream(client)
+    assert len(calls) == 1
+    # Replay is exactly what the first caller got
+    assert "".join(e["data"] for e in events if e["event"] == "token") == first["answer"]
+    done = events[-1]["data"]
+    assert done["usage"]["cost_usd"] == 0 and done["cache"]["hit"]
+    assert done["citations"][0]["source_id"] == "sample.txt#0"
+
+    snap.generation = 8  # index rebuilt
+    _stream(client)
+    assert len(calls) == 2
+
+    # A longer answer limit or another context budget is a different answer
+    _stream(client, max_tokens=800)
+    assert len(calls) == 3
+    monkeypatch.setattr(ask_mod.settings, "context_token_budget", 1234)
+    _stream(client)
+    assert len(calls) == 4
+
+
+def test_late_put_from_an_older_generation_is_ignored():
+    cache = SemanticAnswerCache(maxsize=4, threshold=0.99)
+    cache.put(_unit(1, 0), 2, "new")
+    # A request that started before the hot-swap finishes afterwards
+    cache.put(_unit(0, 1), 1, "stale")
+    assert cache.get(_unit(0, 1), 1) is None
+    assert cache.get(_unit(1, 0), 2)[0] == "new"
+    assert cache.get(_unit(0, 1), 2) is None
+    assert len(cache) == 1 and cache.stats()["invalidations"] == 0
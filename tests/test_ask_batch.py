@@ -0,0 +1,82 @@
+import json
+from types import SimpleNamespace
+
+import numpy as np
+
+from app.api import ask as ask_mod
+from app.core import retrieval
+from app.core.cache import LRUCache
+
+CHUNKS = ["faiss vector search", "bm25 lexical scoring", "server sent events", "token budgets"]
+
+
+def test_batch_retrieval_matches_single_queries(monkeypatch, fake_encoder, publish_index):
+    X = fake_encoder(CHUNKS)
+    monkeypatch.setattr(retrieval, "index_store", publish_index(CHUNKS, X))
+    monkeypatch.setattr(retrieval, "embed_cache", LRUCache(16))
+    encode_calls = []
+    monkeypatch.setattr(retrieval, "_encode_batch", lambda texts: encode_calls.append(texts) or X[: len(texts)])
+    searches = []
+    real_search = retrieval.ann_search
+    monkeypatch.setattr(retrieval, "ann_search", lambda idx, qv, *a, **k: searches.append(qv.shape) or real_search(idx, qv, *a, **k))
+
+    queries = ["vector search", "lexical scoring", "vector search"]
+    batch = retrieval.hybrid_retrieve_batch(queries, top_k=2)
+    assert encode_calls == [["vector search", "lexical scoring"]]  # one call, duplicates embedded once
+    assert searches == [(3, 8)]  # one matrix search
+    single = [retrieval.hybrid_retrieve(q, top_k=2) for q in queries]
+    assert batch == single
+
+
+def test_ask_batch_streams_ndjson_tagged_by_index(client, monkeypatch):
+    def fake_tokens(context, question, *a, **k):
+        yield json.dumps({"event": "token", "data": question})
+        yield json.dumps({"event": "done", "data": {
+            "answer": f"re: {question} [1]",
+            "citations": [{"source_id": "a.txt#0", "snippet": "x"}],
+            "usage": {"prompt_tokens": 5, "completion_tokens": 1, "cost_usd": 0.001, "latency_ms": 1},
+        }}), 1, 0.001, 1
+
+    embeds = []
+    monkeypatch.setattr(ask_mod, "embed_queries", lambda qs: embeds.append(qs) or np.eye(len(qs), 4, dtype="float32"))
+    monkeypatch.setattr(
+        ask_mod, "hybrid_retrieve_batch", lambda qs, *a: [[{"chunk": q, "source": "a.txt"}] for q in qs]
+    )
+    monkeypatch.setattr(ask_mod.index_store, "get", lambda: SimpleNamespace(generation=1))
+    monkeypatch.setattr(ask_mod, "tokens_from_openai", fake_tokens)
+
+    questions = ["alpha?", "beta?", "gamma?"]
+    r = client.post("/ask/batch", headers={"x-api-key": "test"}, json={"questions": questions})
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(l) for l in r.text.splitlines()]
+    assert len(embeds) == 1
+    answers = {l["index"]: l["data"]["answer"] for l in lines if l["event"] == "done"}
+    assert sorted(answers) == [0, 1, 2]
+    assert all(answers[i].startswith(f"re: {q}") for i, q in enumerate(questions))
+    assert lines[-1]["event"] == "batch_done"
+    assert abs(lines[-1]["data"]["cost_usd"] - 0.003) < 1e-9
+
+    r = client.post("/ask/batch", headers={"x-api-key": "test"}, json={"questions": ["alpha?"], "format": "sse"})
+    events = [json.loads(l[6:]) for l in r.text.splitlines() if l.startswith("data: ")]
+    # answered from the semantic cache this time
+    assert events[0]["index"] == 0 and events[0]["data"]["cache"]["hit"]
+
+
+def test_ask_batch_rejects_bad_input(client):
+    r = client.post("/ask/batch", headers={"x-api-key": "test"}, json={"questions": []})
+    assert r.status_code == 400
+
+
+def test_ask_batch_reports_early_done_events(client, monkeypatch):
+    monkeypatch.setattr(ask_mod, "embed_queries", lambda qs: np.eye(len(qs), 4, dtype="float32"))
+    monkeypatch.setattr(
+        ask_mod, "hybrid_retrieve_batch", lambda qs, *a: [[{"chunk": q, "source": "a.txt"}] for q in qs]
+    )
+    monkeypatch.setattr(ask_mod.index_store, "get", lambda: SimpleNamespace(generation=1))
+
+    # The prompt alone is over budget: the real generator stops before any upstream call
+    r = client.post("/ask/batch", headers={"x-api-key": "test"}, json={"questions": ["alpha?"], "budget_usd": 0})
+    lines = [json.loads(l) for l in r.text.splitlines()]
+    assert lines[0]["data"]["answer"].startswith("[Budget Exceeded]")
+    assert len(ask_mod.answer_cache) == 0
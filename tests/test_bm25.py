@@ -0,0 +1,58 @@
+import numpy as np
+
+from app.core.bm25 import BM25Index, tokenize
+
+
+DOCS = [
+    "FAISS is a library for efficient similarity search.",
+    "BM25 ranks documents by term frequency and inverse document frequency.",
+    "The quick brown fox jumps over the lazy dog.",
+    "Similarity search with FAISS and BM25 hybrid retrieval.",
+]
+
+
+def test_tokenize_lowercases_and_strips_punctuation():
+    assert tokenize("Hello, World! GPT-4o") == ["hello", "world", "gpt", "4o"]
+
+
+def test_score_ranks_matching_docs_only():
+    bm25 = BM25Index.build(DOCS)
+    ids, scores = bm25.score("faiss similarity", top_n=10)
+    assert set(ids.tolist()) == {0, 3}
+    assert np.all(np.diff(scores) <= 0)
+
+
+def test_rare_terms_outweigh_common_ones():
+    bm25 = BM25Index.build(DOCS)
+    ids, _ = bm25.score("fox search", top_n=1)
+    # "fox" occurs in one doc, "search" in two
+    assert ids.tolist() == [2]
+
+
+def test_unknown_terms_return_nothing():
+    bm25 = BM25Index.build(DOCS)
+    ids, scores = bm25.score("zzz qqq", top_n=5)
+    assert len(ids) == 0 and len(scores) == 0
+
+
+def test_save_and_load_roundtrip(tmp_path):
+    bm25 = BM25Index.build(DOCS)
+    path = str(tmp_path / "index.bm25.npz")
+    bm25.save(path)
+    loaded = BM25Index.load(path)
+    a = bm25.score("bm25 retrieval", top_n=3)
+    b = loaded.score("bm25 retrieval", top_n=3)
+    assert a[0].tolist() == b[0].tolist()
+    assert np.allclose(a[1], b[1])
+
+
+def test_one_long_token_does_not_pad_the_saved_vocabulary(tmp_path):
+    docs = [f"word{i} common" for i in range(2000)] + ["x" * 5000 + " common"]
+    bm25 = BM25Index.build(docs)
+    path = tmp_path / "index.bm25.npz"
+    bm25.save(str(path))
+    # Fixed-width storage would need 2001 * 5000 * 4 bytes (~40 MB)
+    assert path.stat().st_size < 200_000
+    loaded = BM25Index.load(str(path))
+    assert loaded.terms == bm25.terms
+    assert loaded.score("x" * 5000, top_n=1)[0].tolist() == [2000]
@@ -0,0 +1,55 @@
+import numpy as np
+
+from app.core import retrieval
+from app.core.cache import LRUCache
+
+
+def test_lru_evicts_least_recently_used():
+    cache = LRUCache(maxsize=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1  # "b" is now the oldest
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_ttl_expires_entries(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr("app.core.cache.time.monotonic", lambda: now[0])
+    cache = LRUCache(maxsize=4, ttl_s=10)
+    cache.put("a", 1)
+    now[0] += 11
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_zero_size_disables_cache():
+    cache = LRUCache(maxsize=0)
+    cache.put("a", 1)
+    assert cache.get("a") is None
+
+
+class CountingModel:
+    def __init__(self):
+        self.calls = 0
+
+    def encode(self, texts, normalize_embeddings=True):
+        self.calls += 1
+        return np.ones((len(texts), 4), dtype="float32") * 0.5
+
+
+def test_embed_query_hits_cache_for_equivalent_questions(monkeypatch):
+    model = CountingModel()
+    monkeypatch.setattr(retrieval, "get_embedding_model", lambda: model)
+    monkeypatch.setattr(retrieval, "embed_cache", LRUCache(16))
+
+    a = retrieval.embed_query("What is  FAISS?")
+    b = retrieval.embed_query("  What is FAISS? ")
+    assert model.calls == 1
+    assert np.array_equal(a, b)
+    # callers may normalise in place without corrupting the cached vector
+    a *= 0
+    assert retrieval.embed_query("What is FAISS?")[0, 0] == 0.5
+    assert retrieval.embed_cache.stats()["hits"] == 2
@@ -0,0 +1,35 @@
+import asyncio
+
+from app.core.streaming import coalesce, dumps
+
+
+async def _deltas(items):
+    for item in items:
+        if isinstance(item, float):
+            await asyncio.sleep(item)
+        else:
+            yield item
+
+
+def _run(items, **kw):
+    async def go():
+        return [p async for p in coalesce(_deltas(items), **kw)]
+
+    return asyncio.run(go())
+
+
+def test_passthrough_when_disabled():
+    assert _run(["a", "b", "c"]) == ["a", "b", "c"]
+
+
+def test_flushes_by_size_without_delaying_first_token():
+    assert _run(["a", "bb", "c", "dd", "e"], max_chars=3) == ["a", "bbc", "dde"]
+
+
+def test_window_flushes_partial_piece_when_upstream_stalls():
+    pieces = _run(["a", "b", "c", 0.3, "d"], window_ms=50)
+    assert pieces == ["a", "bc", "d"]
+
+
+def test_dumps_keeps_schema():
+    assert dumps({"event": "token", "data": "é"}).replace(" ", "") == '{"event":"token","data":"é"}'
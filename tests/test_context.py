@@ -0,0 +1,85 @@
+from app.core import context
+from app.core.chunk_manager import iter_chunks
+from app.core.config import settings
+
+
+def _hits(monkeypatch, rows, source="a.txt"):
+    monkeypatch.setattr(settings, "chunk_size", 10)
+    monkeypatch.setattr(settings, "chunk_overlap", 4)
+    # One token per word keeps the budget arithmetic readable
+    monkeypatch.setattr(context, "count_tokens", lambda text, model=None: len(text.split()))
+    words = [f"w{i}" for i in range(40)]
+    chunks = list(iter_chunks(words, 10, 4))
+    return words, [{"chunk": chunks[r], "source": source, "row": r} for r in rows]
+
+
+def test_overlapping_neighbours_are_merged_once(monkeypatch):
+    words, hits = _hits(monkeypatch, [2, 1, 5])
+    packed = context.pack_context(hits)
+    # rows 1+2 cover words 6..21 without repeating the 4 shared words
+    assert packed[0] == {"chunk": " ".join(words[6:22]), "source": "a.txt"}
+    assert packed[1]["chunk"] == " ".join(words[30:40])
+    assert len(packed) == 2
+
+
+def test_budget_is_filled_in_score_order(monkeypatch):
+    words, hits = _hits(monkeypatch, [5, 0, 1])
+    # row 5 (10) + row 0 (10) + row 1, which only adds 6 words beyond row 0
+    packed = context.pack_context(hits, budget_tokens=26)
+    assert [p["chunk"] for p in packed] == [" ".join(words[30:40]), " ".join(words[0:16])]
+
+    logged = []
+    monkeypatch.setattr(context, "log_event", lambda event, data: logged.append((event, data)))
+    packed = context.pack_context(hits, budget_tokens=25)
+    assert [p["chunk"] for p in packed] == [" ".join(words[30:40]), " ".join(words[0:10])]
+    assert logged == [("context_budget", {"budget_tokens": 25, "kept": 2, "dropped": 1})]
+
+
+def test_default_settings_keep_every_retrieved_hit(monkeypatch):
+    # TOP_K=5 hits of CHUNK_SIZE words from different files all reach the prompt
+    hits = [{"chunk": "word " * settings.chunk_size, "source": f"{i}.txt", "row": 2 * i} for i in range(settings.top_k)]
+    packed = context.pack_context(hits, settings.context_token_budget, settings.model_name)
+    assert len(packed) == settings.top_k
+
+
+def test_best_hit_is_truncated_to_fit(monkeypatch):
+    monkeypatch.setattr(context, "get_encoding", lambda model: None)
+    _, hits = _hits(monkeypatch, [0])
+    packed = context.pack_context(hits, budget_tokens=2)
+    assert len(packed) == 1 and len(packed[0]["chunk"]) <= 8
+
+
+def test_other_sources_are_not_merged(monkeypatch):
+    _, hits = _hits(monkeypatch, [1])
+    _, more = _hits(monkeypatch, [2], source="b.txt")
+    assert len(context.pack_context(hits + more)) == 2
+
+
+def test_sentence_snapped_neighbours_are_merged_once(monkeypatch):
+    from app.core.chunk_manager import iter_spans
+
+    monkeypatch.setattr(settings, "chunk_size", 8)
+    monkeypatch.setattr(settings, "chunk_overlap", 3)
+    monkeypatch.setattr(settings, "chunk_boundary", "sentence")
+    monkeypatch.setattr(context, "count_tokens", lambda text, model=None: len(text.split()))
+    text = "One two three. Four five six seven. Eight nine ten eleven. Twelve thirteen fourteen fifteen."
+    chunks = [text[s:e] for _, s, e in iter_spans(text, 8, 3, boundary="sentence")]
+    hits = [{"chunk": c, "source": "a.txt", "row": r} for r, c in enumerate(chunks)]
+    packed = context.pack_context(hits)
+    assert packed == [{"chunk": text, "source": "a.txt"}]
+
+
+def test_span_chunks_keep_their_layout(monkeypatch):
+    from app.core.chunk_manager import iter_spans
+
+    monkeypatch.setattr(settings, "chunk_size", 6)
+    monkeypatch.setattr(settings, "chunk_overlap", 2)
+    monkeypatch.setattr(context, "count_tokens", lambda text, model=None: len(text.split()))
+    text = "def f(x):\n    return x\n\n| a | b |\n|---|---|\n| 1 | 2 |\nend"
+    chunks = [text[s:e] for _, s, e in iter_spans(text, 6, 2)]
+    hits = [{"chunk": c, "source": "a.py", "row": r} for r, c in enumerate(chunks)]
+
+    # Unmerged: exactly the stored text
+    assert context.pack_context(hits[1:2]) == [{"chunk": chunks[1], "source": "a.py"}]
+    # Merged neighbours: the document's own newlines and indentation survive
+    assert context.pack_context(hits) == [{"chunk": text, "source": "a.py"}]
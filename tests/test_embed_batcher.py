@@ -0,0 +1,54 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from app.core.embed_batcher import EmbeddingBatcher
+
+
+def _encoder(calls):
+    def encode(texts):
+        calls.append(list(texts))
+        return np.array([[len(t), i] for i, t in enumerate(texts)], dtype="float32")
+    return encode
+
+
+def test_concurrent_queries_share_one_encode_call():
+    calls = []
+    batcher = EmbeddingBatcher(_encoder(calls), window_ms=20, max_batch=32)
+
+    async def run():
+        return await asyncio.gather(*(batcher.embed("q" * n) for n in range(1, 6)))
+
+    vectors = asyncio.run(run())
+    assert len(calls) == 1
+    # every caller gets its own row back
+    assert [int(v[0, 0]) for v in vectors] == [1, 2, 3, 4, 5]
+    assert all(v.shape == (1, 2) for v in vectors)
+    stats = batcher.stats()
+    assert stats["batches"] == 1 and stats["items"] == 5
+    assert stats["batch_size_hist"]["<=8"] == 1
+
+
+def test_max_batch_flushes_without_waiting_for_window():
+    calls = []
+    batcher = EmbeddingBatcher(_encoder(calls), window_ms=10_000, max_batch=2)
+
+    async def run():
+        return await asyncio.wait_for(asyncio.gather(batcher.embed("a"), batcher.embed("b")), 2)
+
+    asyncio.run(run())
+    assert calls == [["a", "b"]]
+
+
+def test_encode_errors_reach_every_caller():
+    def boom(texts):
+        raise RuntimeError("model unavailable")
+
+    batcher = EmbeddingBatcher(boom, window_ms=5, max_batch=8)
+
+    async def run():
+        return await asyncio.gather(batcher.embed("a"), batcher.embed("b"), return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert all(isinstance(r, RuntimeError) for r in results)
@@ -0,0 +1,109 @@
+import os
+import sys
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from app.core import chunk_manager, embedding
+from app.core.config import settings
+from app.core.embedding import Int8Backend, TorchBackend, create_backend
+
+WORDS = "faiss vector search lexical bm25 token budget server sent events chunk index query answer the a of is what how"
+SENTENCES = ["what is faiss", "bm25 lexical search", "token budget of the answer", "how server sent events chunk"]
+
+
+@pytest.fixture(scope="module")
+def tiny_model_dir(tmp_path_factory):
+    """A tiny random BERT saved as a local sentence-transformers model (no network)."""
+    import torch
+    from sentence_transformers import SentenceTransformer, models
+    from transformers import BertConfig, BertModel, BertTokenizerFast
+
+    d = tmp_path_factory.mktemp("tiny_st")
+    hf = d / "hf"
+    hf.mkdir()
+    (hf / "vocab.txt").write_text("\n".join(["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"] + WORDS.split()))
+    torch.manual_seed(0)
+    config = BertConfig(
+        vocab_size=5 + len(WORDS.split()),
+        hidden_size=64,
+        num_hidden_layers=2,
+        num_attention_heads=2,
+        intermediate_size=128,
+        max_position_embeddings=64,
+    )
+    BertModel(config).save_pretrained(hf)
+    BertTokenizerFast(str(hf / "vocab.txt")).save_pretrained(hf)
+    model = SentenceTransformer(modules=[models.Transformer(str(hf), max_seq_length=64), models.Pooling(64, "mean")])
+    model.save(str(d / "st"))
+    return str(d / "st")
+
+
+def _cosines(a, b):
+    return (a * b).sum(axis=1) / (np.linalg.norm(a, axis=1) * np.linalg.norm(b, axis=1))
+
+
+def test_int8_backend_agrees_with_torch(tiny_model_dir):
+    ref = TorchBackend(tiny_model_dir).encode(SENTENCES)
+    q = Int8Backend(tiny_model_dir).encode(SENTENCES)
+    assert q.dtype == np.float32 and q.shape == ref.shape
+    assert np.allclose(np.linalg.norm(q, axis=1), 1.0, atol=1e-4)
+    assert _cosines(ref, q).min() > 0.99
+
+
+def test_onnx_backend_agrees_with_torch(tiny_model_dir, tmp_path):
+    pytest.importorskip("onnxruntime")
+    import torch
+
+    ref_backend = TorchBackend(tiny_model_dir)
+    onnx_path = tmp_path / "model.onnx"
+    auto = ref_backend.model[0].auto_model
+    enc = ref_backend.model.tokenizer(SENTENCES[:2], padding=True, return_tensors="pt")
+    inputs = (enc["input_ids"], enc["attention_mask"], enc["token_type_ids"])
+    axes = {0: "batch", 1: "seq"}
+    try:
+        torch.onnx.export(
+            auto,
+            inputs,
+            str(onnx_path),
+            input_names=["input_ids", "attention_mask", "token_type_ids"],
+            output_names=["last_hidden_state"],
+            dynamic_axes={"input_ids": axes, "attention_mask": axes, "token_type_ids": axes, "last_hidden_state": axes},
+        )
+    except Exception as e:  # exporter extras (onnx / onnxscript) missing
+        pytest.skip(f"ONNX export unavailable: {e}")
+
+    onnx = create_backend("onnx", "", tiny_model_dir, str(onnx_path))
+    assert _cosines(ref_backend.encode(SENTENCES), onnx.encode(SENTENCES)).min() > 0.999
+
+
+def test_embed_fn_replaces_backend_and_backends_are_cached(monkeypatch):
+    monkeypatch.setattr(settings, "embed_fn", "test_embedding_backends:fake_encode")
+    v = chunk_manager.embed(["ab", "abcd"])
+    assert v.tolist() == [[2.0, 1.0], [4.0, 1.0]]
+    assert chunk_manager.get_embedding_model() is chunk_manager.get_embedding_model()
+
+    with pytest.raises(ValueError, match="EMBEDDING_MODEL_DIR"):
+        create_backend("onnx", "all-MiniLM-L6-v2")
+    with pytest.raises(ValueError, match="Unknown EMBEDDING_BACKEND"):
+        create_backend("tf", os.devnull)
+    assert embedding.BACKENDS == ("torch", "int8", "onnx")
+
+
+def fake_encode(texts):
+    return [[float(len(t)), 1.0] for t in texts]
+
+
+def test_embed_device_defaults_to_auto_and_missing_onnxruntime_is_explained(monkeypatch, tmp_path):
+    devices = []
+    fake_st = SimpleNamespace(SentenceTransformer=lambda path, device=None: devices.append(device))
+    monkeypatch.setitem(sys.modules, "sentence_transformers", fake_st)
+    assert settings.embed_device == "auto"
+    TorchBackend("m")  # auto: sentence-transformers picks the device
+    TorchBackend("m", device="cuda:1")
+    assert devices == [None, "cuda:1"]
+
+    monkeypatch.setitem(sys.modules, "onnxruntime", None)  # not installed
+    with pytest.raises(ImportError, match="requirements-onnx.txt"):
+        create_backend("onnx", "", str(tmp_path))
@@ -0,0 +1,28 @@
+import json
+import os
+import subprocess
+import sys
+
+# Generous enough for a slow CI runner; `import app.main` takes ~0.6 s locally
+IMPORT_BUDGET_S = float(os.environ.get("IMPORT_BUDGET_S", "2.5"))
+HEAVY = ("torch", "sentence_transformers", "transformers", "faiss", "tiktoken", "openai", "onnxruntime")
+
+SCRIPT = f"""
+import json, sys, time
+t = time.perf_counter()
+import app.main
+elapsed = time.perf_counter() - t
+print(json.dumps({{"s": elapsed, "heavy": [m for m in {HEAVY!r} if m in sys.modules]}}))
+"""
+
+
+def test_import_app_main_stays_light():
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, OPENAI_API_KEY=os.environ.get("OPENAI_API_KEY") or "x", PYTHONPATH=root)
+    out = subprocess.run(
+        [sys.executable, "-c", SCRIPT], cwd=root, env=env, capture_output=True, text=True, timeout=120, check=True
+    )
+    result = json.loads(out.stdout.strip().splitlines()[-1])
+    # Heavy libraries must stay deferred until first use (see app/core/lazy.py)
+    assert result["heavy"] == []
+    assert result["s"] < IMPORT_BUDGET_S, f"import app.main took {result['s']:.2f}s"
@@ -0,0 +1,128 @@
+import pytest
+
+from app.core import chunk_manager
+from app.core.config import settings
+from app.core.index_store import IndexStore
+
+
+@pytest.fixture
+def ingest_env(tmp_path, monkeypatch, fake_encoder):
+    embedded = []
+
+    def fake_embed(texts):
+        embedded.extend(texts)
+        return fake_encoder(texts)
+
+    monkeypatch.setattr(chunk_manager, "embed", fake_embed)
+    monkeypatch.setattr(chunk_manager, "index_store", IndexStore())
+    monkeypatch.setattr(settings, "index_path", str(tmp_path / "idx" / "index.faiss"))
+    monkeypatch.setattr(settings, "meta_path", str(tmp_path / "idx" / "index.pkl"))
+    monkeypatch.setattr(settings, "chunk_size", 4)
+    monkeypatch.setattr(settings, "chunk_overlap", 0)
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    return docs, embedded
+
+
+def _paths(docs):
+    return sorted(str(p) for p in docs.iterdir())
+
+
+def test_reingest_unchanged_corpus_embeds_nothing(ingest_env):
+    docs, embedded = ingest_env
+    (docs / "a.txt").write_text("one two three four five six seven eight")
+    (docs / "b.txt").write_text("alpha beta gamma delta")
+
+    first = chunk_manager.build_index(_paths(docs))
+    assert (first.chunks, first.added, first.reused, first.removed) == (3, 3, 0, 0)
+
+    embedded.clear()
+    second = chunk_manager.build_index(_paths(docs))
+    assert (second.chunks, second.added, second.reused, second.removed) == (3, 0, 3, 0)
+    assert embedded == []
+
+
+def test_modified_file_only_embeds_changed_chunks(ingest_env):
+    docs, embedded = ingest_env
+    (docs / "a.txt").write_text("one two three four five six seven eight")
+    chunk_manager.build_index(_paths(docs))
+
+    embedded.clear()
+    (docs / "a.txt").write_text("one two three four FIVE SIX SEVEN EIGHT")
+    result = chunk_manager.build_index(_paths(docs))
+    assert embedded == ["FIVE SIX SEVEN EIGHT"]
+    assert (result.added, result.reused, result.removed) == (1, 1, 1)
+
+
+def test_deleted_file_drops_its_vectors(ingest_env):
+    docs, _ = ingest_env
+    (docs / "a.txt").write_text("one two three four")
+    (docs / "b.txt").write_text("alpha beta gamma delta epsilon")
+    chunk_manager.build_index(_paths(docs))
+
+    (docs / "b.txt").unlink()
+    result = chunk_manager.build_index(_paths(docs))
+    assert (result.chunks, result.removed) == (1, 2)
+
+    snap = chunk_manager.index_store.get()
+    assert snap.index.ntotal == 1
+    assert [snap.store.source(i) for i in range(len(snap.store))] == ["a.txt"]
+
+
+
+@pytest.mark.parametrize("field, value", [
+    ("embedding_backend", "onnx"),
+    ("embedding_model_dir", "/models/minilm"),
+    ("embedding_onnx_file", "onnx/model_qint8.onnx"),
+])
+def test_changing_the_embedding_backend_reembeds_everything(ingest_env, monkeypatch, field, value):
+    docs, embedded = ingest_env
+    (docs / "a.txt").write_text("one two three four five six seven eight")
+    chunk_manager.build_index(_paths(docs))
+
+    embedded.clear()
+    monkeypatch.setattr(settings, field, value)
+    result = chunk_manager.build_index(_paths(docs))
+    assert (result.added, result.reused) == (2, 0)
+    assert len(embedded) == 2
+
+
+@pytest.mark.parametrize("index_type", ["flat", "hnsw"])
+def test_search_labels_map_back_to_rows(ingest_env, monkeypatch, fake_encoder, index_type):
+    monkeypatch.setattr(settings, "index_type", index_type)
+    docs, _ = ingest_env
+    (docs / "a.txt").write_text("one two three four five six seven eight")
+    (docs / "b.txt").write_text("alpha beta gamma delta")
+    chunk_manager.build_index(_paths(docs))
+    (docs / "a.txt").write_text("nine ten eleven twelve five six seven eight")
+    chunk_manager.build_index(_paths(docs))
+
+    snap = chunk_manager.index_store.get()
+    for row, chunk in enumerate(snap.store.texts()):
+        q = fake_encoder([chunk])
+        _, I = snap.index.search(q, 1)
+        assert snap.rows_for(I[0]).tolist() == [row]
+
+
+def test_build_publishes_the_new_snapshot_without_reading_it_back(ingest_env, monkeypatch, fake_encoder):
+    docs, _ = ingest_env
+    (docs / "a.txt").write_text("one two three four five six seven eight")
+    (docs / "b.txt").write_text("alpha beta gamma delta")
+    chunk_manager.build_index(_paths(docs))
+    old = chunk_manager.index_store.get()
+
+    def no_reload(*a, **k):
+        raise AssertionError("build_index re-read the index it just wrote")
+
+    monkeypatch.setattr(chunk_manager.index_store, "reload", no_reload)
+    (docs / "b.txt").write_text("alpha beta gamma epsilon")
+    chunk_manager.build_index(_paths(docs))
+    snap = chunk_manager.index_store.current
+    assert snap.generation == old.generation + 1
+    assert list(snap.store.texts()) == ["one two three four", "five six seven eight", "alpha beta gamma epsilon"]
+
+    # Same answers as a fresh process loading the files from disk
+    disk = IndexStore().get()
+    q = fake_encoder(["alpha beta gamma epsilon"])
+    assert snap.index.search(q, 3)[1].tolist() == disk.index.search(q, 3)[1].tolist()
+    assert [a.tolist() for a in snap.bm25.score("gamma epsilon", 3)] == [a.tolist() for a in disk.bm25.score("gamma epsilon", 3)]
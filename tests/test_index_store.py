@@ -0,0 +1,116 @@
+import os
+import pickle
+
+import faiss
+import numpy as np
+import pytest
+
+from app.core import index_store as index_store_mod
+from app.core.ann import write_index
+from app.core.bm25 import BM25Index
+from app.core.config import settings
+from app.core.index_store import IndexStore
+from app.core.meta_store import LegacyStore, MetaWriter
+
+
+def _write_index(tmp_path, chunks):
+    X = np.random.rand(len(chunks), 8).astype("float32")
+    index = faiss.IndexFlatIP(8)
+    index.add(X)
+    faiss.write_index(index, str(tmp_path / "index.faiss"))
+    with open(tmp_path / "index.pkl", "wb") as f:
+        pickle.dump({"chunks": chunks, "sources": ["a.txt"] * len(chunks)}, f)
+
+
+def _use_tmp_index(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "index_path", str(tmp_path / "index.faiss"))
+    monkeypatch.setattr(settings, "meta_path", str(tmp_path / "index.pkl"))
+    monkeypatch.setattr(settings, "index_check_interval_s", 0.0)
+
+
+def test_index_is_loaded_once(tmp_path, monkeypatch):
+    _use_tmp_index(monkeypatch, tmp_path)
+    _write_index(tmp_path, ["one", "two"])
+    store = IndexStore()
+
+    first = store.get()
+    assert first.generation == 1
+    assert list(first.store.texts()) == ["one", "two"]
+    assert store.get() is first
+
+
+def test_hot_swap_on_file_change_keeps_old_snapshot(tmp_path, monkeypatch):
+    _use_tmp_index(monkeypatch, tmp_path)
+    _write_index(tmp_path, ["one", "two"])
+    store = IndexStore()
+    old = store.get()
+
+    _write_index(tmp_path, ["three"])
+    # make sure mtime moves even on coarse filesystems
+    st = os.stat(tmp_path / "index.pkl")
+    os.utime(tmp_path / "index.pkl", ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+
+    new = store.get()
+    assert new.generation == 2
+    assert list(new.store.texts()) == ["three"]
+    # in-flight readers still hold the previous generation intact
+    assert list(old.store.texts()) == ["one", "two"]
+    assert old.index.ntotal == 2
+
+
+def test_publish_swaps_without_reading_disk(tmp_path, monkeypatch):
+    _use_tmp_index(monkeypatch, tmp_path)
+    store = IndexStore()
+    index = faiss.IndexFlatIP(4)
+    snap = store.publish(index, LegacyStore({"chunks": ["x"], "sources": ["x.txt"]}), BM25Index.build(["x"]))
+    assert snap.generation == 1
+    assert store.generation == 1
+
+
+def test_legacy_pickle_next_to_the_index_is_served_without_a_manifest(tmp_path, monkeypatch):
+    _use_tmp_index(monkeypatch, tmp_path)
+    monkeypatch.setattr(settings, "meta_path", str(tmp_path / "index.meta.json"))
+    _write_index(tmp_path, ["one", "two"])
+
+    snap = IndexStore().get()
+    assert isinstance(snap.store, LegacyStore)
+    assert list(snap.store.texts()) == ["one", "two"]
+
+
+def test_rows_for_drops_labels_missing_from_the_metadata(publish_index):
+    snap = publish_index(["a", "b", "c"], ids=[10, 20, 30]).get()
+    assert snap.rows_for([30, 15, 10, 99]).tolist() == [2, -1, 0, -1]
+
+
+def _write_build(tmp_path, chunks, ids):
+    writer = MetaWriter(str(tmp_path / "index.meta.json"))
+    writer.append(chunks, ["a.txt"] * len(chunks), ids, ["00" * 20] * len(chunks))
+    index = faiss.IndexIDMap2(faiss.IndexFlatIP(8))
+    index.add_with_ids(np.random.rand(len(chunks), 8).astype("float32"), np.asarray(ids, dtype="int64"))
+    write_index(index, str(tmp_path / "index.faiss.tmp"), writer.build)
+    writer.close(next_id=max(ids) + 1)
+    return str(tmp_path / "index.faiss.tmp")
+
+
+def test_index_and_manifest_from_different_builds_are_not_mixed(tmp_path, monkeypatch):
+    _use_tmp_index(monkeypatch, tmp_path)
+    monkeypatch.setattr(settings, "meta_path", str(tmp_path / "index.meta.json"))
+    os.replace(_write_build(tmp_path, ["one", "two"], [0, 1]), tmp_path / "index.faiss")
+    store = IndexStore()
+    old = store.get()
+    assert old.index.ntotal == 2
+
+    # The next build's manifest is live, its index not renamed into place yet
+    pending = _write_build(tmp_path, ["three", "four", "five"], [2, 3, 4])
+    st = os.stat(tmp_path / "index.meta.json")
+    os.utime(tmp_path / "index.meta.json", ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    assert store.get() is old
+    # A fresh process has nothing to fall back on and gives up after retrying
+    monkeypatch.setattr(index_store_mod, "LOAD_ATTEMPTS", 2)
+    with pytest.raises(RuntimeError, match="different builds"):
+        IndexStore().get()
+
+    os.replace(pending, tmp_path / "index.faiss")
+    new = store.get()
+    assert new.generation == 2 and new.index.ntotal == 3
+    assert list(new.store.texts()) == ["three", "four", "five"]
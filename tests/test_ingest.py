@@ -1,3 +1,5 @@
+import threading
+
 import app.api.ingest as ingest_mod
 
 
@@ -18,4 +20,17 @@ def test_ingest_builds_index(client, tmp_path, monkeypatch):
     data = r.json()
     assert data["chunks"] == 3
     assert "docs" in data
-    assert "est_tokens" in data
\ No newline at end of file
+    assert "est_tokens" in data
+
+
+def test_ingest_builds_off_the_event_loop(client, tmp_path, monkeypatch):
+    (tmp_path / "docs").mkdir()
+    (tmp_path / "docs" / "sample.txt").write_text("text")
+    monkeypatch.chdir(tmp_path)
+    threads = []
+    monkeypatch.setattr(ingest_mod, "build_index", lambda paths: threads.append(threading.current_thread()) or (1, 1))
+
+    loop_thread = []
+    monkeypatch.setattr(ingest_mod, "make_request_id", lambda: loop_thread.append(threading.current_thread()) or "rid")
+    assert client.post("/ingest", headers={"x-api-key": "test"}).status_code == 200
+    assert threads and threads[0] is not loop_thread[0]
@@ -0,0 +1,127 @@
+import pickle
+
+import numpy as np
+import pytest
+
+from app.core import chunk_manager
+from app.core.chunk_manager import (
+    count_chunks,
+    iter_chunks,
+    iter_file_words,
+    iter_spans,
+    simple_chunk,
+    span_offsets,
+    utf8_offsets,
+)
+from app.core.config import settings
+from app.core.index_store import IndexStore
+from app.core.meta_store import read_meta
+
+
+def legacy_chunk(text, size, overlap):
+    tokens = text.split()
+    chunks, i = [], 0
+    while i < len(tokens):
+        chunks.append(" ".join(tokens[i:i + size]))
+        i += size - overlap
+    return chunks
+
+
+@pytest.mark.parametrize("n_words,size,overlap", [(0, 4, 1), (3, 4, 1), (4, 4, 1), (10, 4, 0), (37, 8, 3), (20, 4, 3)])
+def test_streaming_chunker_matches_legacy_output(n_words, size, overlap):
+    text = " ".join(f"w{i}" for i in range(n_words))
+    assert simple_chunk(text, size, overlap) == legacy_chunk(text, size, overlap)
+    assert count_chunks(n_words, size, overlap) == len(legacy_chunk(text, size, overlap))
+
+
+def test_file_words_survive_block_boundaries(tmp_path):
+    text = "alpha  beta\ngamma\tdelta epsilon " * 5
+    fp = tmp_path / "doc.txt"
+    fp.write_text(text)
+    assert list(iter_file_words(str(fp), block_size=3)) == text.split()
+
+
+def test_build_embeds_in_bounded_batches(tmp_path, monkeypatch):
+    batches = []
+
+    def fake_embed(texts):
+        batches.append(len(texts))
+        return np.random.default_rng(len(batches)).standard_normal((len(texts), 8)).astype("float32")
+
+    monkeypatch.setattr(chunk_manager, "embed", fake_embed)
+    monkeypatch.setattr(chunk_manager, "index_store", IndexStore())
+    monkeypatch.setattr(settings, "index_path", str(tmp_path / "index.faiss"))
+    monkeypatch.setattr(settings, "meta_path", str(tmp_path / "index.pkl"))
+    monkeypatch.setattr(settings, "chunk_size", 2)
+    monkeypatch.setattr(settings, "chunk_overlap", 0)
+    monkeypatch.setattr(settings, "ingest_batch_size", 3)
+    monkeypatch.setattr(settings, "index_type", "ivf_flat")
+    monkeypatch.setattr(settings, "index_train_size", 4)
+
+    doc = tmp_path / "a.txt"
+    doc.write_text(" ".join(f"w{i}" for i in range(20)))
+    seen = []
+    result = chunk_manager.build_index([str(doc)], progress=seen.append)
+
+    assert result.chunks == 10
+    assert max(batches) <= 3 and sum(batches) == 10
+    assert [p["chunks_done"] for p in seen] == [3, 6, 9, 10]
+    assert all(p["chunks_total"] == 10 for p in seen)
+
+    meta = read_meta(settings.meta_path)
+    assert meta["chunks"][0] == "w0 w1"
+    assert len(meta["ids"]) == 10 and meta["next_id"] == 10
+    assert chunk_manager.index_store.get().index.ntotal == 10
+
+
+def test_read_meta_accepts_original_pickle(tmp_path):
+    path = tmp_path / "index.pkl"
+    with open(path, "wb") as f:
+        pickle.dump({"chunks": ["a"], "sources": ["a.txt"]}, f)
+    assert read_meta(str(path)) == {"chunks": ["a"], "sources": ["a.txt"]}
+
+
+@pytest.mark.parametrize("n_words,size,overlap", [(0, 4, 1), (3, 4, 1), (4, 4, 1), (10, 4, 0), (37, 8, 3), (20, 4, 3)])
+def test_span_chunker_matches_word_windows(n_words, size, overlap):
+    # Mixed whitespace and multi-byte text; spans keep the original spacing
+    text = "\n".join(f"wörd{i}　 x" if i % 5 == 0 else f"w{i} " for i in range(n_words))
+    spans = list(iter_spans(text, size, overlap, doc_id=7))
+    assert [" ".join(text[s:e].split()) for _, s, e in spans] == simple_chunk(text, size, overlap)
+    assert all(d == 7 for d, _, _ in spans)
+
+    starts, ends = span_offsets(text, size, overlap)
+    data = text.encode("utf-8")
+    for s, e, bs, be in zip(starts, ends, utf8_offsets(text, starts), utf8_offsets(text, ends)):
+        assert data[bs:be].decode("utf-8") == text[s:e]
+
+
+def test_span_chunker_ends_on_sentences_and_paragraphs():
+    text = "One two three. Four five six seven! Eight nine.\n\nTen eleven twelve thirteen."
+    sentence = [text[s:e] for _, s, e in iter_spans(text, 8, 2, boundary="sentence")]
+    assert sentence[0] == "One two three. Four five six seven!"
+    paragraph = [text[s:e] for _, s, e in iter_spans(text, 10, 0, boundary="paragraph")]
+    assert paragraph == ["One two three. Four five six seven! Eight nine.", "Ten eleven twelve thirteen."]
+    with pytest.raises(ValueError, match="chunk boundary"):
+        span_offsets(text, boundary="word")
+
+
+def test_spans_mode_stores_each_document_once(tmp_path, monkeypatch):
+    monkeypatch.setattr(chunk_manager, "embed", lambda texts: np.ones((len(texts), 4), dtype="float32"))
+    monkeypatch.setattr(chunk_manager, "index_store", IndexStore())
+    monkeypatch.setattr(settings, "chunk_size", 8)
+    monkeypatch.setattr(settings, "chunk_overlap", 4)
+    doc = tmp_path / "a.txt"
+    doc.write_text(" ".join(f"wörd{i}" for i in range(100)), encoding="utf-8")
+
+    sizes = {}
+    for mode in ("words", "spans"):
+        monkeypatch.setattr(settings, "chunk_mode", mode)
+        monkeypatch.setattr(settings, "index_path", str(tmp_path / mode / "index.faiss"))
+        monkeypatch.setattr(settings, "meta_path", str(tmp_path / mode / "index.meta.json"))
+        result = chunk_manager.build_index([str(doc)])
+        sizes[mode] = sum(p.stat().st_size for p in (tmp_path / mode).glob("index.meta.*.text"))
+        assert read_meta(settings.meta_path)["chunks"] == simple_chunk(doc.read_text(encoding="utf-8"), 8, 4)
+    assert result.chunks == 25
+    assert sizes["spans"] == doc.stat().st_size < sizes["words"] / 1.9
+    # Unchanged text keeps its vectors on re-ingest
+    assert chunk_manager.build_index([str(doc)]).reused == 25
@@ -0,0 +1,104 @@
+import asyncio
+from types import SimpleNamespace
+
+import httpx
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api import ask as ask_mod
+from app.core import llm_client
+from app.core.config import settings
+from app.main import app
+from bench.loadgen import run_load
+from bench.mock_openai import MockConfig, create_app
+
+CONTEXT = [{"chunk": "Synthetic context about the topic.", "source": "bench.txt"}]
+
+
+@pytest.fixture
+def app_on_mock(monkeypatch):
+    async def no_embed(question):
+        return None
+
+    monkeypatch.setattr(settings, "rate_limit_rpm", 10**9)
+    monkeypatch.setattr(ask_mod, "embed_query_async", no_embed)
+    monkeypatch.setattr(ask_mod, "hybrid_retrieve", lambda *a, **k: CONTEXT)
+    monkeypatch.setattr(ask_mod, "index_store", SimpleNamespace(get=lambda: SimpleNamespace(generation=0)))
+    monkeypatch.setattr(ask_mod.answer_cache, "maxsize", 0)
+
+    def use(cfg):
+        mock = create_app(cfg)
+        monkeypatch.setattr(llm_client, "transport", httpx.ASGITransport(app=mock))
+        return mock
+
+    return use
+
+
+def _load(**kwargs):
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            return await run_load(client, ["what is this?", "and that?"], api_key="test", **kwargs)
+
+    return asyncio.run(run())
+
+
+def test_closed_loop_reports_ttft_gaps_and_tails(app_on_mock):
+    app_on_mock(MockConfig(ttft_ms=5, token_rate=0, tokens=6, seed=0))
+    report = _load(concurrency=3, requests=9)
+    assert report["mode"] == "closed" and report["requests"] == 9
+    assert report["ok"] == 9 and report["error_rate"] == 0 and report["errors"] == {}
+    assert report["frames_per_answer"] == 6 and report["cache_hits"] == 0
+    for key in ("ttft_ms", "inter_token_ms", "total_ms"):
+        assert set(report[key]) == {"p50", "p90", "p95", "p99", "max"}
+    assert report["ttft_ms"]["p50"] >= 5
+
+
+def test_cache_replays_are_counted_apart_from_streamed_answers(app_on_mock, monkeypatch):
+    async def same_vector(question):
+        return np.ones((1, 4), dtype="float32") / 2
+
+    monkeypatch.setattr(ask_mod, "embed_query_async", same_vector)
+    monkeypatch.setattr(ask_mod.answer_cache, "maxsize", 16)
+    ask_mod.answer_cache.clear()
+    app_on_mock(MockConfig(ttft_ms=0, token_rate=0, tokens=4, seed=0))
+    report = _load(concurrency=1, requests=4)
+    # Unique questions still embed alike here, so the semantic cache answers them
+    assert report["ok"] == 4 and report["cache_hits"] == 3
+    assert report["frames_per_answer"] == 4
+
+
+def test_open_loop_counts_injected_errors_and_429_bursts(app_on_mock, monkeypatch):
+    monkeypatch.setattr(settings, "openai_max_retries", 0)
+    app_on_mock(MockConfig(ttft_ms=0, token_rate=0, tokens=3, error_rate=1.0, error_status=503))
+    report = _load(rps=200, requests=4)
+    assert report["mode"] == "open" and report["requests"] == 4
+    assert report["errors"] == {"upstream_error": 4} and report["error_rate"] == 1.0
+    assert report["ttft_ms"] is None
+
+    # Inside a 429 burst window every request is rate limited
+    mock = app_on_mock(MockConfig(ttft_ms=0, token_rate=0, tokens=3, burst_every_s=3600, burst_s=3600))
+    report = _load(concurrency=2, requests=4)
+    assert report["errors"] == {"upstream_error": 4}
+    stats = TestClient(mock).get("/stats").json()
+    assert stats["rate_limited"] == 4 and stats["completed"] == 0
+
+    with pytest.raises(ValueError, match="exactly one"):
+        _load(concurrency=2, rps=5, requests=1)
+
+
+def test_openai_base_url_points_the_client_at_the_mock(monkeypatch):
+    seen = []
+
+    def handler(request):
+        seen.append(str(request.url))
+        return httpx.Response(200, headers={"content-type": "text/event-stream"}, content=b"data: [DONE]\n\n")
+
+    monkeypatch.setattr(settings, "openai_base_url", "http://127.0.0.1:9000/v1")
+    monkeypatch.setattr(llm_client, "transport", httpx.MockTransport(handler))
+
+    async def run():
+        return [r async for r in ask_mod.tokens_from_openai(CONTEXT, "hi", 10, "gpt-4o-mini", "k", 1.0)]
+
+    asyncio.run(run())
+    assert seen == ["http://127.0.0.1:9000/v1/chat/completions"]
@@ -0,0 +1,56 @@
+import io
+import json
+import threading
+import time
+
+from app.core import logger as logger_mod
+from app.core.logger import BatchLogger
+
+
+class _SlowStream(io.StringIO):
+    def __init__(self):
+        super().__init__()
+        self.release = threading.Event()
+        self.writes = 0
+
+    def write(self, s):
+        self.release.wait(5)
+        self.writes += 1
+        return super().write(s)
+
+
+def test_records_are_written_in_batches_off_thread():
+    stream = _SlowStream()
+    log = BatchLogger(stream=stream, maxsize=1000, batch_size=256)
+    for i in range(100):
+        assert log.emit({"event_type": "x", "i": i})
+    stream.release.set()
+    assert log.flush()
+    lines = stream.getvalue().splitlines()
+    assert [json.loads(line)["i"] for line in lines] == list(range(100))
+    assert stream.writes < 100  # queued records share writes
+
+
+def test_full_queue_drops_instead_of_blocking():
+    stream = _SlowStream()
+    log = BatchLogger(stream=stream, maxsize=2, batch_size=1)
+    start = time.perf_counter()
+    accepted = sum(log.emit({"event_type": "x", "i": i}) for i in range(50))
+    assert time.perf_counter() - start < 1.0  # stdout is stuck, callers are not
+    assert log.dropped == 50 - accepted and log.dropped > 0
+    stream.release.set()
+    assert log.flush()
+    assert log.written == accepted == len(stream.getvalue().splitlines())
+
+
+def test_sampling_keeps_failures(monkeypatch):
+    stream = io.StringIO()
+    log = BatchLogger(stream=stream, sample_rates={"request_log": 0.0})
+    monkeypatch.setattr(logger_mod, "logger", log)
+    logger_mod.log_request("r1", route="/ask", status="ok", latency=3)
+    logger_mod.log_request("r2", route="/ask", status="error")
+    logger_mod.log_event("ingest_progress", {"chunks_done": 1})
+    assert log.flush()
+    records = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert [r.get("request_id") for r in records] == ["r2", None]
+    assert log.sampled_out == 1
@@ -0,0 +1,88 @@
+import glob
+
+import numpy as np
+
+from app.core.meta_store import ChunkStore, MetaWriter, open_store, read_meta
+
+HASH_A = "00" * 19 + "ff"
+HASH_B = "ab" * 19 + "00"  # trailing NUL byte must survive
+
+
+def _write(path, rows, **manifest):
+    writer = MetaWriter(path)
+    for batch in rows:
+        writer.append(*batch)
+    writer.close(next_id=3, **manifest)
+    return writer
+
+
+def test_columnar_roundtrip_and_lazy_lookup(tmp_path):
+    path = str(tmp_path / "index.meta.json")
+    _write(path, [
+        (["héllo wörld", "two"], ["a.txt", "b.txt"], [7, 9], [HASH_A, HASH_B]),
+        ([], [], [], []),
+        (["three"], ["a.txt"], [11], [HASH_A]),
+    ], params={"chunk_size": 4})
+
+    store = open_store(path)
+    assert isinstance(store, ChunkStore)
+    assert len(store) == 3
+    assert store.chunk(0) == "héllo wörld"
+    assert store.source(2) == "a.txt"
+    assert isinstance(store.ids, np.memmap)
+    assert store.ids.tolist() == [7, 9, 11]
+    assert store.source_names == ["a.txt", "b.txt"]
+    assert list(store.keys())[1] == ("b.txt", HASH_B, 9)
+    assert store.manifest["params"] == {"chunk_size": 4}
+
+
+def test_new_build_replaces_old_files(tmp_path):
+    path = str(tmp_path / "index.meta.json")
+    first = _write(path, [(["one"], ["a.txt"], [1], [HASH_A])])
+    old_store = open_store(path)
+    second = _write(path, [(["uno"], ["a.txt"], [2], [HASH_B])])
+
+    assert not glob.glob(str(tmp_path / f"index.meta.{first.build}.*"))
+    assert len(glob.glob(str(tmp_path / f"index.meta.{second.build}.*"))) == 5
+    assert read_meta(path)["chunks"] == ["uno"]
+    # a reader that mapped the previous build still sees it intact
+    assert old_store.chunk(0) == "one"
+
+
+def test_aborted_build_leaves_nothing_behind(tmp_path):
+    path = str(tmp_path / "index.meta.json")
+    writer = MetaWriter(path)
+    writer.append(["x"], ["a.txt"], [1], [HASH_A])
+    writer.abort()
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_chunks_can_be_spans_into_a_stored_document(tmp_path):
+    path = str(tmp_path / "index.meta.json")
+    doc = "héllo wörld, bye"
+    writer = MetaWriter(path)
+    base = writer.add_document(doc)
+    writer.append(["héllo wörld", "wörld, bye"], ["a.txt", "a.txt"], [1, 2], [HASH_A, HASH_B], spans=[(base, base + 13), (base + 7, base + 18)])
+    writer.append(["own"], ["b.txt"], [3], [HASH_A])
+    writer.close(next_id=4)
+
+    store = open_store(path)
+    assert list(store.texts()) == ["héllo wörld", "wörld, bye", "own"]
+    assert (tmp_path / f"index.meta.{writer.build}.text").read_bytes() == (doc + "own").encode("utf-8")
+
+
+def test_reads_columnar_v1_builds(tmp_path):
+    path = str(tmp_path / "index.meta.json")
+    base = str(tmp_path / "index.meta.0123456789ab")
+    with open(base + ".text", "wb") as f:
+        f.write(b"onetwo")
+    np.array([0, 3, 6], dtype="<i8").tofile(base + ".offsets")
+    np.array([0, 0], dtype="<i4").tofile(base + ".src")
+    np.array([5, 6], dtype="<i8").tofile(base + ".ids")
+    with open(base + ".hashes", "wb") as f:
+        f.write(bytes.fromhex(HASH_A + HASH_B))
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('{"format": "columnar-v1", "build": "0123456789ab", "rows": 2, "sources": ["a.txt"]}')
+
+    store = open_store(path)
+    assert list(store.texts()) == ["one", "two"] and store.ids.tolist() == [5, 6]
@@ -0,0 +1,78 @@
+import asyncio
+import re
+
+import httpx
+
+from app.api import ask as ask_mod
+from app.core import llm_client, metrics
+from app.core.metrics import Registry
+
+
+def _value(text, sample):
+    m = re.search(rf"^{re.escape(sample)} (\S+)$", text, re.M)
+    return float(m.group(1)) if m else None
+
+
+def test_registry_renders_prometheus_text():
+    reg = Registry()
+    hist = reg.histogram("t_seconds", "Test latency", buckets=(0.1, 1.0))
+    hits = reg.counter("t_hits_total", "Test hits", ["cache"])
+    reg.gauge("t_size", "Test size", fn=lambda: 42)
+    for v in (0.05, 0.5, 0.5, 3.0):
+        hist.observe(v)
+    hits.labels("answer").inc()
+    hits.labels("answer").inc(2)
+
+    text = reg.render()
+    assert "# TYPE t_seconds histogram" in text
+    # buckets are cumulative and end with +Inf == count
+    assert _value(text, 't_seconds_bucket{le="0.1"}') == 1
+    assert _value(text, 't_seconds_bucket{le="1"}') == 3
+    assert _value(text, 't_seconds_bucket{le="+Inf"}') == 4
+    assert _value(text, "t_seconds_count") == 4
+    assert _value(text, "t_seconds_sum") == 4.05
+    assert _value(text, 't_hits_total{cache="answer"}') == 3
+    assert _value(text, "t_size") == 42
+
+
+def test_metrics_endpoint_counts_upstream_stages(client, monkeypatch):
+    def sample(name):
+        return _value(client.get("/metrics").text, name) or 0.0
+
+    before = {
+        n: sample(n)
+        for n in (
+            'minirag_rate_limited_total{source="upstream"}',
+            'minirag_upstream_retries_total{reason="429"}',
+            "minirag_upstream_ttft_seconds_count",
+            "minirag_stream_seconds_count",
+            "minirag_prompt_build_seconds_count",
+        )
+    }
+    responses = [httpx.Response(429, json={"error": {"message": "slow down"}})]
+
+    def handler(request):
+        if responses:
+            return responses.pop()
+        body = b'data: {"choices": [{"delta": {"content": "ok"}}]}\n\ndata: [DONE]\n\n'
+        return httpx.Response(200, headers={"content-type": "text/event-stream"}, content=body)
+
+    async def no_sleep(s, *a):
+        pass
+
+    monkeypatch.setattr(llm_client, "transport", httpx.MockTransport(handler))
+    monkeypatch.setattr(ask_mod.asyncio, "sleep", no_sleep)
+
+    async def run():
+        ctx = [{"chunk": "Hello world", "source": "sample.txt"}]
+        return [r async for r in ask_mod.tokens_from_openai(ctx, "hi", 10, "gpt-4o-mini", "k", 1.0)]
+
+    out = asyncio.run(run())
+    assert out[-1][0]["data"]["answer"] == "ok [1]"
+
+    resp = client.get("/metrics")
+    assert resp.headers["content-type"].startswith("text/plain; version=0.0.4")
+    for name, old in before.items():
+        assert sample(name) == old + 1, name
+    assert "minirag_inflight_streams 0" in resp.text
+    assert re.search(r'^minirag_cache_hits_total\{cache="answer"\} \d+$', resp.text, re.M)
@@ -0,0 +1,123 @@
+import asyncio
+import json
+
+import httpx
+
+from app.api import ask as ask_mod
+from app.core import llm_client
+
+CONTEXT = [{"chunk": "Hello world", "source": "sample.txt"}]
+
+
+def _sse(tokens):
+    for t in tokens:
+        chunk = {
+            "id": "c1",
+            "object": "chat.completion.chunk",
+            "created": 0,
+            "model": "gpt-4o-mini",
+            "choices": [{"index": 0, "delta": {"content": t}, "finish_reason": None}],
+        }
+        yield f"data: {json.dumps(chunk)}\n\n".encode()
+    yield b"data: [DONE]\n\n"
+
+
+class _Body(httpx.AsyncByteStream):
+    def __init__(self, tokens, delay=0.0):
+        self.tokens = tokens
+        self.delay = delay
+        self.closed = False
+
+    async def __aiter__(self):
+        for part in _sse(self.tokens):
+            await asyncio.sleep(self.delay)
+            yield part
+
+    async def aclose(self):
+        self.closed = True
+
+
+def _collect(gen):
+    async def run():
+        return [item async for item in gen]
+
+    return asyncio.run(run())
+
+
+def test_streams_tokens_over_shared_client(monkeypatch):
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(200, headers={"content-type": "text/event-stream"}, stream=_Body(["Hel", "lo"]))
+
+    monkeypatch.setattr(llm_client, "transport", httpx.MockTransport(handler))
+
+    async def run():
+        out = [r async for r in ask_mod.tokens_from_openai(CONTEXT, "hi", 10, "gpt-4o-mini", "k", 1.0)]
+        out += [r async for r in ask_mod.tokens_from_openai(CONTEXT, "hi", 10, "gpt-4o-mini", "k", 1.0)]
+        return out, llm_client.get_openai_client("k"), llm_client.get_openai_client("k")
+
+    out, c1, c2 = asyncio.run(run())
+    assert [json.loads(r)["data"] for r in out[:2]] == ["Hel", "lo"]
+    final, tokens, _, _ = out[2]
+    assert tokens == 2 and final["data"]["answer"] == "Hello [1]"
+    assert len(calls) == 2
+    assert c1._client is c2._client  # one pooled httpx client per loop
+
+
+def test_rate_limit_backoff_does_not_block(monkeypatch):
+    responses = [httpx.Response(429, json={"error": {"message": "slow down"}})]
+    sleeps = []
+
+    def handler(request):
+        if responses:
+            return responses.pop()
+        return httpx.Response(200, headers={"content-type": "text/event-stream"}, stream=_Body(["ok"]))
+
+    async def fake_sleep(s, *a):
+        if s:  # ignore the event loop's own sleep(0) yields
+            sleeps.append(s)
+
+    monkeypatch.setattr(llm_client, "transport", httpx.MockTransport(handler))
+    monkeypatch.setattr(ask_mod.asyncio, "sleep", fake_sleep)
+    monkeypatch.setattr(ask_mod.time, "sleep", lambda s: (_ for _ in ()).throw(AssertionError("blocking sleep")))
+
+    out = _collect(ask_mod.tokens_from_openai(CONTEXT, "hi", 10, "gpt-4o-mini", "k", 1.0))
+    assert len(sleeps) == 1
+    assert json.loads(out[0])["data"] == "ok"
+
+
+def test_closing_generator_releases_upstream(monkeypatch):
+    body = _Body(["a", "b", "c", "d"], delay=0.01)
+    monkeypatch.setattr(
+        llm_client,
+        "transport",
+        httpx.MockTransport(lambda r: httpx.Response(200, headers={"content-type": "text/event-stream"}, stream=body)),
+    )
+
+    async def run():
+        gen = ask_mod.tokens_from_openai(CONTEXT, "hi", 10, "gpt-4o-mini", "k", 1.0)
+        first = await gen.__anext__()
+        await gen.aclose()  # what a client disconnect does
+        return first
+
+    assert json.loads(asyncio.run(run()))["data"] == "a"
+    assert body.closed
+
+
+def test_coalesced_frames_carry_the_same_text(monkeypatch):
+    from app.core.config import settings
+
+    tokens = ["The", " quick", " brown", " fox", " jumps"]
+    monkeypatch.setattr(settings, "sse_coalesce_chars", 10)
+    monkeypatch.setattr(
+        llm_client,
+        "transport",
+        httpx.MockTransport(lambda r: httpx.Response(200, headers={"content-type": "text/event-stream"}, stream=_Body(tokens))),
+    )
+    out = _collect(ask_mod.tokens_from_openai(CONTEXT, "hi", 10, "gpt-4o-mini", "k", 1.0))
+    frames = [json.loads(r)["data"] for r in out[:-1]]
+    assert len(frames) < len(tokens)
+    assert "".join(frames) == "".join(tokens)
+    assert out[-1][1] == len(tokens)  # completion tokens still count upstream deltas
@@ -0,0 +1,74 @@
+import os
+import time
+
+import faiss
+import numpy as np
+
+from app.core import chunk_manager
+from app.core.config import settings
+from app.core.index_store import IndexStore
+from app.core.meta_store import read_meta
+
+
+def _build(tmp_path, monkeypatch, workers, name):
+    monkeypatch.setattr(chunk_manager, "index_store", IndexStore())
+    monkeypatch.setattr(settings, "embed_fn", "conftest:fake_encode")
+    monkeypatch.setattr(settings, "index_path", str(tmp_path / name / "index.faiss"))
+    monkeypatch.setattr(settings, "meta_path", str(tmp_path / name / "index.pkl"))
+    monkeypatch.setattr(settings, "chunk_size", 5)
+    monkeypatch.setattr(settings, "chunk_overlap", 1)
+    monkeypatch.setattr(settings, "ingest_batch_size", 4)
+    monkeypatch.setattr(settings, "ingest_workers", workers)
+    paths = sorted(str(p) for p in (tmp_path / "docs").iterdir())
+    result = chunk_manager.build_index(paths)
+    index = faiss.read_index(settings.index_path)
+    return result, read_meta(settings.meta_path), index
+
+
+def test_parallel_build_matches_serial_build(tmp_path, monkeypatch):
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    for i in range(6):
+        (docs / f"doc{i}.txt").write_text(" ".join(f"d{i}w{j}" for j in range(7 + 3 * i)))
+
+    serial, serial_meta, serial_index = _build(tmp_path, monkeypatch, 1, "serial")
+    parallel, parallel_meta, parallel_index = _build(tmp_path, monkeypatch, 2, "parallel")
+
+    assert parallel == serial
+    for key in ("chunks", "sources", "ids", "hashes"):
+        assert parallel_meta[key] == serial_meta[key]
+    ids = np.asarray(serial_meta["ids"], dtype="int64")
+    assert np.allclose(parallel_index.reconstruct_batch(ids), serial_index.reconstruct_batch(ids))
+
+
+def test_worker_spills_a_file_in_bounded_batches(tmp_path, monkeypatch):
+    from app.core.parallel_ingest import _chunk_file, _read_spill
+
+    monkeypatch.setattr(settings, "chunk_size", 5)
+    monkeypatch.setattr(settings, "chunk_overlap", 1)
+    monkeypatch.setattr(settings, "ingest_batch_size", 4)
+    doc = tmp_path / "big.txt"
+    doc.write_text(" ".join(f"w{j}" for j in range(100)))
+
+    src, spill = _chunk_file((str(doc), str(tmp_path)))
+    batches = list(_read_spill(spill))
+    assert src == "big.txt"
+    assert [len(b) for b in batches] == [4] * 6 + [1]
+    assert sum(batches, []) == chunk_manager.simple_chunk(doc.read_text(), 5, 1)
+
+
+def pid_encode(texts):
+    # Slow enough that both shards of a batch are in flight at once
+    time.sleep(0.3)
+    return [[float(os.getpid()), 1.0] for _ in texts]
+
+
+def test_pool_embeds_shards_in_separate_worker_processes(monkeypatch):
+    from app.core.parallel_ingest import IngestPool
+
+    monkeypatch.setattr(settings, "embed_fn", "test_parallel_ingest:pid_encode")
+    with IngestPool(2) as pool:
+        X = pool.embed(["a", "b", "c", "d"])
+    pids = set(X[:, 0].tolist())
+    assert X.shape == (4, 2)
+    assert len(pids) == 2 and float(os.getpid()) not in pids
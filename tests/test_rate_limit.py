@@ -0,0 +1,90 @@
+import asyncio
+import multiprocessing as mp
+import sqlite3
+import time
+
+import pytest
+from fastapi import HTTPException
+
+from app.core import rate_limit
+from app.core.config import settings
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(rate_limit.time, "time", lambda: now[0])
+    return now
+
+
+def test_bucket_limits_and_refills(monkeypatch, clock):
+    monkeypatch.setattr(rate_limit, "_backend", rate_limit.MemoryBackend())
+    headers = [rate_limit.rate_limiter("k", 3) for _ in range(3)]
+    assert [h["X-RateLimit-Remaining"] for h in headers] == ["2", "1", "0"]
+
+    with pytest.raises(HTTPException) as exc:
+        rate_limit.rate_limiter("k", 3)
+    assert exc.value.status_code == 429
+    assert exc.value.headers["Retry-After"] == "20"  # 3/min = one token every 20s
+
+    clock[0] += 20
+    assert rate_limit.rate_limiter("k", 3)["X-RateLimit-Remaining"] == "0"
+    assert rate_limit.rate_limiter("other", 3)["X-RateLimit-Remaining"] == "2"
+
+
+def _take_many(args):
+    path, n = args
+    backend = rate_limit.SQLiteBackend(path)
+    return sum(backend.take("shared", 0.0001, 15.0, 1000.0)[0] for _ in range(n))
+
+
+def test_sqlite_backend_enforces_one_limit_across_processes(tmp_path):
+    path = str(tmp_path / "rl.sqlite3")
+    with mp.get_context("spawn").Pool(2) as pool:
+        allowed = pool.map(_take_many, [(path, 10), (path, 10)])
+    assert sum(allowed) == 15
+
+
+def test_ask_returns_429_with_retry_after(client, monkeypatch):
+    monkeypatch.setattr(rate_limit, "_backend", rate_limit.MemoryBackend())
+    monkeypatch.setattr(settings, "rate_limit_rpm", 1)
+    rate_limit.rate_limiter("service", 1)
+    r = client.post("/ask", headers={"x-api-key": "test"}, json={"question": "hi"})
+    assert r.status_code == 429
+    assert int(r.headers["retry-after"]) >= 1
+    assert r.headers["x-ratelimit-remaining"] == "0"
+
+
+def test_batch_takes_one_token_per_question_or_none(client, monkeypatch, clock):
+    monkeypatch.setattr(rate_limit, "_backend", rate_limit.MemoryBackend())
+    monkeypatch.setattr(settings, "rate_limit_rpm", 5)
+    rate_limit.rate_limiter("service", 5, cost=3)
+
+    r = client.post("/ask/batch", headers={"x-api-key": "test"}, json={"questions": ["a?", "b?", "c?"]})
+    assert r.status_code == 429
+    assert r.headers["retry-after"] == "12"  # one more token at 5/min
+    # Nothing was taken by the rejected batch
+    assert rate_limit.rate_limiter("service", 5, cost=2)["X-RateLimit-Remaining"] == "0"
+
+    r = client.post("/ask/batch", headers={"x-api-key": "test"}, json={"questions": ["q?"] * 6})
+    assert r.status_code == 400
+
+
+def test_locked_sqlite_store_fails_open_or_closed_quickly(tmp_path, monkeypatch):
+    path = str(tmp_path / "rl.sqlite3")
+    monkeypatch.setattr(rate_limit, "_backend", rate_limit.SQLiteBackend(path, busy_timeout_s=0.05))
+    holder = sqlite3.connect(path, isolation_level=None)
+    holder.execute("BEGIN IMMEDIATE")  # another worker stuck holding the write lock
+    try:
+        monkeypatch.setattr(settings, "rate_limit_fail_open", True)
+        t0 = time.perf_counter()
+        assert asyncio.run(rate_limit.rate_limiter_async("k", 5)) == {}
+        assert time.perf_counter() - t0 < 1.0
+
+        monkeypatch.setattr(settings, "rate_limit_fail_open", False)
+        with pytest.raises(HTTPException) as exc:
+            rate_limit.rate_limiter("k", 5)
+        assert exc.value.status_code == 503
+    finally:
+        holder.execute("ROLLBACK")
+    assert rate_limit.rate_limiter("k", 5)["X-RateLimit-Remaining"] == "4"
@@ -0,0 +1,85 @@
+import faiss
+import numpy as np
+
+from app.core import chunk_manager, rerank, retrieval
+from app.core.cache import LRUCache
+from app.core.config import settings
+from app.core.index_store import IndexStore
+
+CALLS = []
+
+
+def fake_scores(pairs):
+    # Query-word overlap: a deterministic stand-in for the cross-encoder
+    CALLS.append(len(pairs))
+    return [len(set(q.split()) & set(p.split())) for q, p in pairs]
+
+
+def _use_fake(monkeypatch):
+    CALLS.clear()
+    monkeypatch.setattr(settings, "rerank_fn", "test_rerank:fake_scores")
+    monkeypatch.setattr(rerank, "score_cache", LRUCache(64))
+
+
+def test_rerank_orders_by_cross_score_and_caches_by_passage(monkeypatch):
+    _use_fake(monkeypatch)
+    hits = [
+        {"chunk": "unrelated text", "id": 1, "score": 0.9},
+        {"chunk": "red fox jumps", "id": 2, "score": 0.5},
+        {"chunk": "red apples", "id": 3, "score": 0.7},
+    ]
+    out = rerank.rerank_batch(["red fox"], [hits], top_k=2)[0]
+    assert [h["id"] for h in out] == [2, 3]
+    assert out[0]["retrieval_score"] == 0.5
+    assert CALLS == [3]
+
+    # same question (modulo whitespace), overlapping candidates: only the new pair is scored
+    more = hits[1:] + [{"chunk": "fox", "id": 4, "score": 0.1}]
+    out = rerank.rerank_batch(["red  fox"], [more], top_k=2)[0]
+    assert CALLS == [3, 1]
+    assert [h["id"] for h in out] == [2, 3]
+
+
+def test_retrieval_widens_candidates_then_keeps_top_k(monkeypatch, publish_index):
+    _use_fake(monkeypatch)
+    chunks = [f"filler {i}" for i in range(30)] + ["the quick brown fox"]
+    rng = np.random.default_rng(0)
+    X = rng.standard_normal((len(chunks), 8)).astype("float32")
+    faiss.normalize_L2(X)
+    monkeypatch.setattr(retrieval, "index_store", publish_index(chunks, X))
+    monkeypatch.setattr(settings, "rerank_candidates", 10)
+
+    qv = X[:1].copy()  # nearest vector is "filler 0"
+    hits = retrieval.hybrid_retrieve("quick brown fox", top_k=2, query_vector=qv)
+    assert len(hits) == 2
+    assert hits[0]["chunk"] == "the quick brown fox"
+    assert CALLS and CALLS[0] > 2  # scored a wider candidate pool than top_k
+
+
+def test_cached_scores_do_not_follow_ids_across_a_rebuild(tmp_path, monkeypatch, fake_encoder):
+    _use_fake(monkeypatch)
+    store = IndexStore()
+    monkeypatch.setattr(chunk_manager, "embed", fake_encoder)
+    monkeypatch.setattr(chunk_manager, "index_store", store)
+    monkeypatch.setattr(retrieval, "index_store", store)
+    monkeypatch.setattr(settings, "index_path", str(tmp_path / "idx" / "index.faiss"))
+    monkeypatch.setattr(settings, "meta_path", str(tmp_path / "idx" / "index.meta.json"))
+    monkeypatch.setattr(settings, "chunk_overlap", 0)
+    doc = tmp_path / "a.txt"
+    doc.write_text("red fox jumps high over the lazy dog")
+
+    def top(question):
+        qv = fake_encoder([question])
+        return retrieval.hybrid_retrieve(question, top_k=1, query_vector=qv)[0]
+
+    monkeypatch.setattr(settings, "chunk_size", 2)
+    chunk_manager.build_index([str(doc)])
+    assert (top("jumps high")["chunk"], top("jumps high")["id"]) == ("jumps high", 1)
+
+    # New params: a full rebuild whose ids restart at 0 over different passages
+    monkeypatch.setattr(settings, "chunk_size", 4)
+    chunk_manager.build_index([str(doc)])
+    scored = len(CALLS)
+    hit = top("jumps high")
+    assert hit["chunk"] == "red fox jumps high" and hit["score"] == 2
+    assert len(CALLS) == scored + 1  # rescored, not the old passages' cache entries
@@ -0,0 +1,52 @@
+import pytest
+
+from app.core.config import settings
+from eval.retrieval import load_golden, score_query, sweep
+
+DOCS = {
+    "fruit.txt": "apples oranges bananas and pears grow in the orchard every summer",
+    "search.txt": "faiss builds a vector index for nearest neighbour search over embeddings",
+    "stream.txt": "server sent events stream tokens to the browser as they are generated",
+}
+
+
+def test_score_query_counts_each_source_once():
+    hits = [{"source": s} for s in ["a.txt", "a.txt", "b.txt", "c.txt"]]
+    one = score_query(hits, {"b.txt"}, 3)
+    # Ranks are hit positions: the duplicate a.txt chunk still takes a slot
+    assert one["recall"] == 1.0 and one["mrr"] == pytest.approx(1 / 3)
+    assert one["ndcg"] == pytest.approx(0.5)
+    assert score_query(hits, {"b.txt"}, 1) == {"recall": 0.0, "hit_rate": 0.0, "mrr": 0.0, "ndcg": 0.0}
+    both = score_query(hits, {"a.txt", "c.txt"}, 4)
+    assert both["recall"] == 1.0 and both["mrr"] == 1.0 and both["ndcg"] < 1.0
+
+
+def test_sweep_scores_every_configuration_in_process(tmp_path, monkeypatch):
+    for name, text in DOCS.items():
+        (tmp_path / name).write_text(text, encoding="utf-8")
+    golden = tmp_path / "golden.jsonl"
+    golden.write_text(
+        '{"q": "which fruit grows in the orchard", "sources": ["fruit.txt"]}\n'
+        '{"q": "vector index for neighbour search", "sources": ["search.txt"]}\n'
+        '{"q": "stream tokens to the browser", "source": "stream.txt"}\n'
+        '{"q": "unlabelled question", "ref": "skipped"}\n',
+        encoding="utf-8",
+    )
+    monkeypatch.setattr(settings, "embed_fn", "bench.synthetic:fake_encode")
+    monkeypatch.setattr(settings, "ingest_workers", 1)
+    before = (settings.chunk_size, settings.index_path, settings.hybrid_lexical_weight)
+
+    gold = load_golden(golden)
+    assert len(gold) == 3
+    files = sorted(str(p) for p in tmp_path.glob("*.txt"))
+    rows = sweep(files, gold, chunk_sizes=[4, 64], top_ks=[1, 3], lexical_weights=[0.0, 1.0], chunk_overlap=1)
+
+    assert len(rows) == 2 * 2 * 2
+    assert {(r["chunk_size"], r["lexical_weight"], r["top_k"]) for r in rows} == {
+        (c, w, k) for c in (4, 64) for w in (0.0, 1.0) for k in (1, 3)
+    }
+    assert [r["chunks"] for r in rows if r["chunk_size"] == 64][0] == 3
+    # The fake encoder knows nothing about meaning; BM25 finds every answer at rank 1
+    lexical = [r for r in rows if r["lexical_weight"] == 1.0 and r["chunk_size"] == 64]
+    assert all(r["recall"] == r["mrr"] == r["ndcg"] == 1.0 for r in lexical)
+    assert (settings.chunk_size, settings.index_path, settings.hybrid_lexical_weight) == before
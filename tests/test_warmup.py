@@ -0,0 +1,69 @@
+import time
+
+from fastapi.testclient import TestClient
+
+from app import main as main_mod
+from app.core.warmup import Warmup
+
+
+def test_warmup_times_each_step_and_reports_failures():
+    def broken():
+        raise OSError("model not found")
+
+    w = Warmup(steps=[("index", lambda: "3 chunks"), ("embedding_model", broken), ("tokenizer", lambda: None)])
+    assert w.status()["ready"] is False
+    assert w.run() is False
+    status = w.status()
+    assert status["done"] and not status["ready"]
+    assert status["steps"]["index"] == {"ok": True, "detail": "3 chunks", "ms": status["steps"]["index"]["ms"]}
+    assert status["steps"]["embedding_model"]["error"] == "OSError: model not found"
+    assert status["steps"]["tokenizer"]["ok"]  # later steps still run
+    assert status["total_ms"] >= 0
+
+
+def test_ready_flips_after_lifespan_warmup(monkeypatch):
+    calls = []
+    w = Warmup(steps=[("slow", lambda: time.sleep(0.2) or calls.append(1))])
+    monkeypatch.setattr(main_mod, "warmup", w)
+    monkeypatch.setattr(main_mod.settings, "warmup_on_startup", True)
+
+    with TestClient(main_mod.app) as c:
+        assert c.get("/health").json() == {"status": "ok"}  # liveness does not wait for warm-up
+        assert c.get("/ready").status_code == 503
+        deadline = time.time() + 5
+        while c.get("/ready").status_code != 200 and time.time() < deadline:
+            time.sleep(0.02)
+        body = c.get("/ready").json()
+    assert body["ready"] and body["steps"]["slow"]["ms"] >= 200
+    assert calls == [1]
+
+
+def test_failed_steps_are_retried_until_ready(monkeypatch):
+    monkeypatch.setattr("app.core.warmup.settings.warmup_retry_s", 0.01)
+    calls = {"index": 0, "embedding_model": 0}
+
+    def index():
+        calls["index"] += 1
+
+    def flaky():
+        calls["embedding_model"] += 1
+        if calls["embedding_model"] < 3:
+            raise OSError("connection reset")
+
+    w = Warmup(steps=[("index", index), ("embedding_model", flaky)])
+    assert w.run_until_ready() is True
+    status = w.status()
+    assert status["ready"] and status["attempts"] == 3
+    assert calls == {"index": 1, "embedding_model": 3}  # only the failed step runs again
+
+
+def test_stop_ends_the_retry_loop(monkeypatch):
+    monkeypatch.setattr("app.core.warmup.settings.warmup_retry_s", 0.01)
+
+    def broken():
+        raise OSError("model not found")
+
+    w = Warmup(steps=[("embedding_model", broken)])
+    w.stop()
+    assert w.run_until_ready() is False
+    assert w.status()["attempts"] == 1